@@ -3,6 +3,12 @@ ASGI config for WorkForce project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live change stream at /api/events/ is a long-lived async response, so the
+site should be served through ASGI, e.g.
+``gunicorn WorkForce.asgi:application -k uvicorn.workers.UvicornWorker``
+(see start.sh). On Postgres events reach every worker process through
+LISTEN/NOTIFY, so any number of workers can serve the stream.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
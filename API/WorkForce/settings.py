@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
@@ -70,6 +71,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'WorkForceTrained.middleware.AuditMiddleware',
+    'WorkForceTrained.middleware.DatabaseTimeMiddleware',
 ]
 
 ROOT_URLCONF = 'WorkForce.urls'
@@ -104,8 +107,30 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
+    "TOKEN_OBTAIN_SERIALIZER": "users.authentication.ClaimsTokenObtainPairSerializer",
 }
 
+# Seconds a user's active and staff flags are cached for token
+# authentication: in the shared cache, or per process without one.
+AUTH_USER_CACHE_SECONDS = 300
+AUTH_USER_LOCAL_CACHE_SECONDS = 30
+
+# Set REDIS_URL to share the cache between the web and job processes.
+# Without it each process has its own memory cache.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -125,13 +150,37 @@ AUTH_USER_MODEL = "auth.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "WorkForceTrained.throttling.CostBudgetThrottle",
+    ],
 }
 
+# DB-time budgets for CostBudgetThrottle, per WINDOW_SECONDS.
+COST_THROTTLE = {
+    "FREE_BELOW_MS": 50,
+    "WINDOW_SECONDS": 60,
+    "USER_BUDGET_MS": 20000,
+    "GLOBAL_BUDGET_MS": 120000,
+}
+
+# Per-fingerprint query statistics, see `manage.py slowqueries`.
+QUERY_STATS = {
+    "ENABLED": True,
+    "SLOW_MS": 200,
+    "EXPLAIN": True,
+    "EXPLAIN_EVERY_SECONDS": 3600,
+    "FLUSH_SECONDS": 60,
+}
+
+# Local phone numbers (0XXXXXXXXX) are normalized to +265XXXXXXXXX.
+PHONE_DEFAULT_COUNTRY_CODE = "265"
+PHONE_NATIONAL_DIGITS = 9
+
 
 
 # Password validation
@@ -170,8 +219,14 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
+# Files the job worker writes for the web process to serve (export
+# downloads, roster snapshots). Both must see the same storage.
+MEDIA_ROOT = BASE_DIR / "media"
+
 STORAGES = {
-    
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
@@ -1,8 +1,9 @@
 from django.contrib import admin
+from .pagination import EstimatedCountPaginator
 from .models import (
     District, Organization, Facility, Competency,
     HealthcareWorker, Training, AvailabilityRecord,
-    Deployment
+    Deployment, Job, DuplicateCandidate, QueryStat
 )
 
 @admin.register(District)
@@ -42,6 +43,9 @@ class HealthcareWorkerAdmin(admin.ModelAdmin):
     search_fields = ("first_name", "last_name", "phone", "national_id")
     ordering = ("last_name", "first_name")
     autocomplete_fields = ("facility", "organization")
+    # Large tables get planner estimates instead of COUNT(*) per page.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
 @admin.register(Training)
 class TrainingAdmin(admin.ModelAdmin):
@@ -73,4 +77,25 @@ class DeploymentAdmin(admin.ModelAdmin):
     date_hierarchy = "start_date"
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress", "attempts", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("locked_by", "locked_at", "created_at", "finished_at")
+    date_hierarchy = "created_at"
 
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ("worker_a", "worker_b", "score", "status", "reviewed_at")
+    list_filter = ("status",)
+    raw_id_fields = ("worker_a", "worker_b")
+    ordering = ("-score",)
+
+
+@admin.register(QueryStat)
+class QueryStatAdmin(admin.ModelAdmin):
+    list_display = ("view", "calls", "total_ms", "max_ms", "slow_calls", "explained_at", "last_seen")
+    search_fields = ("view", "fingerprint")
+    readonly_fields = ("fingerprint_hash", "first_seen", "last_seen")
+    ordering = ("-total_ms",)
@@ -1,94 +1,141 @@
-from django.db.models import Count, Q, F
-from WorkForceTrained.models import District, Facility, HealthcareWorker, Organization, Training, Competency
+from django.db.models import Q, Sum
+from WorkForceTrained import counters, rollups
+from WorkForceTrained.models import District, Organization, Competency, WorkerCube, TrainingCube
 
-def get_healthcare_data_summary(filters=None):
+def build_worker_filters(filters, prefix=""):
     """
-    SIMPLIFIED VERSION - Basic filtering that works
+    Turn dashboard filters into a Q on HealthcareWorker.
+    `prefix` lets related models reuse it, e.g. prefix="hcw__" for Training.
     """
-    if filters is None:
-        filters = {}
-    
-    print(f"Applying filters: {filters}")
-    
-    # Build simple worker filters
     worker_filters = Q()
-    
+
     if filters.get('district') and filters['district'] != 'all':
-        worker_filters &= Q(facility__district__name=filters['district'])
+        worker_filters &= Q(**{f"{prefix}facility__district__name": filters['district']})
     if filters.get('gender') and filters['gender'] != 'all':
-        worker_filters &= Q(gender=filters['gender'])
+        worker_filters &= Q(**{f"{prefix}gender": filters['gender']})
     if filters.get('organization') and filters['organization'] != 'all':
-        worker_filters &= Q(organization__name=filters['organization'])
+        worker_filters &= Q(**{f"{prefix}organization__name": filters['organization']})
     if filters.get('facility_type') and filters['facility_type'] != 'all':
-        worker_filters &= Q(facility__facility_type=filters['facility_type'])
-    
-    # Apply filters to main counts
-    total_workers = HealthcareWorker.objects.filter(worker_filters).count()
-    active_workers = HealthcareWorker.objects.filter(worker_filters & Q(is_active=True)).count()
-    
-    # Simplified counts without complex filtering
-    total_facilities = Facility.objects.count()
-    total_organizations = Organization.objects.count()
-    total_competencies = Competency.objects.count()
-    total_trainings = Training.objects.count()
-    
-    # Basic data without complex filtered counts
-    gender_data = (
-        HealthcareWorker.objects
-        .filter(worker_filters)
-        .values('gender')
-        .annotate(count=Count('id'))
-        .order_by('gender')
+        worker_filters &= Q(**{f"{prefix}facility__facility_type": filters['facility_type']})
+
+    return worker_filters
+
+
+def build_cube_filters(filters):
+    """The same dashboard filters applied to the WorkerCube rollup."""
+    cube_filters = Q()
+
+    if filters.get('district') and filters['district'] != 'all':
+        cube_filters &= Q(district_name=filters['district'])
+    if filters.get('gender') and filters['gender'] != 'all':
+        cube_filters &= Q(gender=filters['gender'])
+    if filters.get('organization') and filters['organization'] != 'all':
+        cube_filters &= Q(organization_name=filters['organization'])
+    if filters.get('facility_type') and filters['facility_type'] != 'all':
+        cube_filters &= Q(facility_type=filters['facility_type'])
+
+    return cube_filters
+
+
+def get_healthcare_data_summary(filters=None):
+    """
+    Dashboard figures. Every worker and training number comes from the
+    rollup cubes, so totals and breakdowns agree with each other and with
+    rollups_refreshed_at. Writes queue a cube refresh, see signals.
+    Filters narrow the worker totals, gender and disability only, the other
+    breakdowns always cover the whole workforce.
+    """
+    if filters is None:
+        filters = {}
+
+    worker_cube = WorkerCube.objects.all()
+    filtered_cube = worker_cube.filter(build_cube_filters(filters))
+    training_cube = TrainingCube.objects.all()
+
+    cube_totals = filtered_cube.aggregate(
+        workers=Sum('workers'), active=Sum('active_workers'), disabled=Sum('disabled_workers')
     )
+    total_workers = cube_totals['workers'] or 0
+    active_workers = cube_totals['active'] or 0
+    by_gender = {
+        row['gender'] or None: row['count']
+        for row in filtered_cube.values('gender').annotate(count=Sum('workers')).order_by()
+    }
 
-    # Simplified district data
-    district_data = (
-        District.objects
-        .annotate(
-            total_facilities=Count('facilities'),
-            total_workers=Count('facilities__healthcare_workers'),
-        )
-        .values('name', 'code', 'total_facilities', 'total_workers')
-        .order_by('name')
+    gender_data = [
+        {'gender': gender, 'count': count}
+        for gender, count in sorted(by_gender.items(), key=lambda item: (item[0] is None, item[0] or ''))
+        if count
+    ]
+
+    # Reference tables are counted, not rolled up, they never sum against the cubes.
+    totals = counters.totals()
+    total_facilities = totals.get('facilities', 0)
+    total_organizations = totals.get('organizations', 0)
+    total_competencies = totals.get('competencies', 0)
+    total_trainings = training_cube.aggregate(n=Sum('trainings'))['n'] or 0
+
+    workers_by_district = dict(
+        worker_cube.values_list('district_id').annotate(n=Sum('workers')).order_by()
     )
+    facilities_by_district = counters.values('facilities', 'district')
+    district_data = [
+        {
+            'name': district['name'],
+            'code': district['code'],
+            'total_facilities': facilities_by_district.get(str(district['id']), 0),
+            'total_workers': workers_by_district.get(district['id'], 0),
+        }
+        for district in District.objects.values('id', 'name', 'code').order_by('name')
+    ]
 
-    # Other basic data
-    facility_data = (
-        Facility.objects
-        .values('facility_type')
-        .annotate(count=Count('id'))
-        .order_by('-count')
+    facility_data = sorted(
+        (
+            {'facility_type': facility_type, 'count': count}
+            for facility_type, count in counters.values('facilities', 'facility_type').items()
+            if count
+        ),
+        key=lambda row: -row['count'],
     )
 
-    org_data = (
-        Organization.objects
-        .annotate(total_workers=Count('healthcare_workers'))
-        .values('name', 'total_workers')
-        .order_by('-total_workers')
+    workers_by_org = dict(
+        worker_cube.values_list('organization_id').annotate(n=Sum('workers')).order_by()
+    )
+    org_data = sorted(
+        (
+            {'name': org['name'], 'total_workers': workers_by_org.get(org['id'], 0)}
+            for org in Organization.objects.values('id', 'name')
+        ),
+        key=lambda row: -row['total_workers'],
     )
 
-    competency_data = (
-        Competency.objects
-        .annotate(total_trainings=Count('training'))
-        .values('code', 'name', 'total_trainings')
-        .order_by('-total_trainings')
+    trainings_by_competency = dict(
+        training_cube.values_list('competency_id').annotate(n=Sum('trainings')).order_by()
+    )
+    competency_data = sorted(
+        (
+            {'code': comp['code'], 'name': comp['name'],
+             'total_trainings': trainings_by_competency.get(comp['id'], 0)}
+            for comp in Competency.objects.values('id', 'code', 'name')
+        ),
+        key=lambda row: -row['total_trainings'],
     )
 
     training_years = (
-        Training.objects
-        .annotate(year=F('date_completed__year'))
+        training_cube
         .values('year')
-        .annotate(count=Count('id'))
+        .annotate(count=Sum('trainings'))
         .order_by('year')
     )
 
-    disability_data = (
-        HealthcareWorker.objects
-        .filter(worker_filters)
-        .values('disability')
-        .annotate(count=Count('id'))
-        .order_by('disability')
-    )
+    disability_data = [
+        {'disability': value, 'count': count}
+        for value, count in (
+            (False, total_workers - (cube_totals['disabled'] or 0)),
+            (True, cube_totals['disabled'] or 0),
+        )
+        if count
+    ]
 
     return {
         "summary": {
@@ -106,5 +153,6 @@ def get_healthcare_data_summary(filters=None):
         "competency_popularity": list(competency_data),
         "training_timeline": list(training_years),
         "disability_stats": list(disability_data),
-        "applied_filters": filters
+        "applied_filters": filters,
+        "rollups_refreshed_at": rollups.refreshed_at(),
     }
\ No newline at end of file
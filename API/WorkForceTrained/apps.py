@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WorkforcetrainedConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'WorkForceTrained'
+
+    def ready(self):
+        from WorkForceTrained import signals, tasks  # noqa: F401
@@ -0,0 +1,271 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import OuterRef, Q, Subquery
+
+from WorkForceTrained.geo import distance_band, get_distance_matrix
+from WorkForceTrained.models import AvailabilityRecord, Deployment, HealthcareWorker, Training
+from WorkForceTrained.scheduling import overlapping_deployments
+
+# Each component scores 0..1, the weights bring the total to 0..100 like match_score.
+WEIGHTS = {"competency": 50, "availability": 25, "district": 15, "position": 10}
+# The district score falls off linearly to zero at this distance.
+MAX_USEFUL_DISTANCE_KM = 400.0
+
+
+class CandidatePool:
+    """Active workers as column arrays, loaded once per planning run."""
+
+    def __init__(self, start, end):
+        latest_status = (
+            AvailabilityRecord.objects
+            .filter(hcw=OuterRef("pk"))
+            .order_by("-timestamp")
+            .values("status")[:1]
+        )
+        rows = list(
+            HealthcareWorker.objects
+            .filter(is_active=True)
+            .annotate(latest_status=Subquery(latest_status))
+            .order_by("id")
+            .values_list("id", "first_name", "last_name", "facility__district_id",
+                         "position", "latest_status")
+            .iterator(chunk_size=5000)
+        )
+
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        self.names = [f"{r[1]} {r[2]}" for r in rows]
+        self.district = np.fromiter((r[3] or 0 for r in rows), dtype=np.int64, count=len(rows))
+        self.positions, self.position_index = np.unique(
+            np.array([(r[4] or "").lower() for r in rows], dtype=object), return_inverse=True
+        )
+        self.available = np.fromiter(
+            (r[5] == "available" for r in rows), dtype=bool, count=len(rows)
+        )
+
+        # Valid certifications as a workers x competencies boolean matrix.
+        trainings = np.array(
+            list(
+                Training.objects
+                .filter(hcw__is_active=True)
+                .filter(Q(valid_until__isnull=True) | Q(valid_until__gte=start))
+                .values_list("hcw_id", "competency_id")
+                .iterator(chunk_size=10000)
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        self.competencies, competency_index = np.unique(trainings[:, 1], return_inverse=True)
+        self.holds = np.zeros((len(self.ids), len(self.competencies)), dtype=bool)
+        worker_index = np.searchsorted(self.ids, trainings[:, 0])
+        self.holds[worker_index, competency_index] = True
+
+        # Blocking deployments in the planning window, as day ordinals.
+        deployments = list(
+            overlapping_deployments(start, end, Deployment.objects.filter(hcw__is_active=True))
+            .values_list("hcw_id", "start_date", "end_date")
+        )
+        open_end = date.max.toordinal()
+        self.busy_worker = np.searchsorted(
+            self.ids, np.fromiter((d[0] for d in deployments), dtype=np.int64, count=len(deployments))
+        )
+        self.busy_start = np.fromiter(
+            (d[1].toordinal() for d in deployments), dtype=np.int64, count=len(deployments)
+        )
+        self.busy_end = np.fromiter(
+            (d[2].toordinal() if d[2] else open_end for d in deployments),
+            dtype=np.int64, count=len(deployments),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distance_from(self, district_id):
+        """Km from a district to each worker's district, NaN if unknown."""
+        return get_distance_matrix().kilometres_from(district_id, self.district)
+
+    def score(self, request):
+        """Scores for every worker against one request, -inf where they cannot go."""
+        competency_ids = [c.pk for c in request.get("required_competencies") or []]
+        if competency_ids:
+            columns = np.searchsorted(self.competencies, competency_ids)
+            known = (columns < len(self.competencies))
+            known[known] &= self.competencies[columns[known]] == np.array(competency_ids)[known]
+            held = self.holds[:, columns[known]].sum(axis=1) if known.any() else 0
+            competency = held / len(competency_ids)
+        else:
+            competency = np.ones(len(self), dtype=float)
+
+        positions = [p.lower() for p in request.get("required_positions") or [] if p]
+        if positions:
+            matches = np.array(
+                [any(p in position for p in positions) for position in self.positions], dtype=bool
+            )
+            position = matches[self.position_index].astype(float)
+        else:
+            position = np.ones(len(self), dtype=float)
+
+        distance = self.distance_from(request["district_id"].pk)
+        district = np.nan_to_num(np.clip(1 - distance / MAX_USEFUL_DISTANCE_KM, 0, 1), nan=0.0)
+
+        score = (
+            WEIGHTS["competency"] * competency
+            + WEIGHTS["availability"] * self.available
+            + WEIGHTS["district"] * district
+            + WEIGHTS["position"] * position
+        )
+
+        start = request["start_date"]
+        end = start + timedelta(days=request.get("estimated_duration_days", 30))
+        overlap = (self.busy_start <= end.toordinal()) & (self.busy_end >= start.toordinal())
+        score[self.busy_worker[overlap]] = -np.inf
+        return score
+
+
+def solve_assignment(scores, quotas):
+    """
+    Maximise the total score of assigning workers to requests, at most one
+    request per worker and at most quotas[r] workers per request.
+
+    `scores` is a workers x requests matrix, -inf marks forbidden pairs. This is
+    min-cost flow by successive shortest paths: each step adds one worker either
+    directly or through a chain of reassignments between requests, so early
+    requests cannot grab workers that a later request needs more. With few
+    requests the shortest path is a Bellman-Ford over the request nodes only.
+    Returns an array with the request index per worker, -1 for unassigned.
+    """
+    n_workers, n_requests = scores.shape
+    quotas = np.asarray(quotas, dtype=np.int64)
+    assigned_to = np.full(n_workers, -1, dtype=np.int64)
+    if n_workers == 0 or n_requests == 0:
+        return assigned_to
+
+    # Only the best sum(quotas) workers per request can appear in an optimal
+    # plan, everyone else is dropped before solving.
+    keep = min(int(quotas.sum()), n_workers)
+    if keep < n_workers:
+        top = np.argpartition(-scores, keep - 1, axis=0)[:keep]
+        pool = np.unique(top)
+    else:
+        pool = np.arange(n_workers)
+
+    cost = -scores[pool]
+    order = np.argsort(cost, axis=0, kind="stable")
+    pointer = np.zeros(n_requests, dtype=np.int64)
+    remaining = quotas.copy()
+    members = [[] for _ in range(n_requests)]
+    local_assigned = np.full(len(pool), -1, dtype=np.int64)
+
+    move_cost = np.full((n_requests, n_requests), np.inf)
+    move_worker = np.full((n_requests, n_requests), -1, dtype=np.int64)
+    dirty = set()
+
+    while remaining.sum() > 0:
+        # Cheapest free worker entering each request.
+        entry_cost = np.full(n_requests, np.inf)
+        entry_worker = np.full(n_requests, -1, dtype=np.int64)
+        for r in range(n_requests):
+            while pointer[r] < len(pool) and local_assigned[order[pointer[r], r]] != -1:
+                pointer[r] += 1
+            if pointer[r] < len(pool):
+                worker = order[pointer[r], r]
+                entry_cost[r], entry_worker[r] = cost[worker, r], worker
+
+        # Cheapest move of a worker already in request a over to request b,
+        # recomputed only for requests whose members changed.
+        for a in dirty:
+            if not members[a]:
+                move_cost[a] = np.inf
+                continue
+            idx = np.array(members[a])
+            delta = cost[idx] - cost[idx, a][:, None]
+            delta[:, a] = np.inf
+            best = delta.argmin(axis=0)
+            move_cost[a] = delta[best, np.arange(n_requests)]
+            move_worker[a] = idx[best]
+        dirty.clear()
+
+        # Bellman-Ford over request nodes.
+        dist = entry_cost.copy()
+        parent = np.full(n_requests, -1, dtype=np.int64)
+        for _ in range(n_requests - 1):
+            relaxed = dist[:, None] + move_cost
+            best_from = relaxed.argmin(axis=0)
+            candidate = relaxed[best_from, np.arange(n_requests)]
+            improved = candidate < dist - 1e-12
+            if not improved.any():
+                break
+            dist[improved] = candidate[improved]
+            parent[improved] = best_from[improved]
+
+        open_requests = np.where(remaining > 0)[0]
+        target = open_requests[np.argmin(dist[open_requests])]
+        if not np.isfinite(dist[target]):
+            break
+
+        # Walk the path back, shifting each worker one request along.
+        r = target
+        seen = set()
+        while parent[r] != -1 and r not in seen:
+            seen.add(r)
+            source = parent[r]
+            worker = move_worker[source, r]
+            members[source].remove(worker)
+            members[r].append(worker)
+            local_assigned[worker] = r
+            dirty.update((source, r))
+            r = source
+        worker = entry_worker[r]
+        members[r].append(worker)
+        local_assigned[worker] = r
+        dirty.add(r)
+        remaining[target] -= 1
+
+    assigned_to[pool] = local_assigned
+    return assigned_to
+
+
+def plan_deployments(requests):
+    """
+    Propose workers for several validated DeploymentWizardRequestSerializer
+    payloads at once. Nothing is saved, the result is meant for confirmation.
+    """
+    if not requests:
+        return []
+
+    start = min(r["start_date"] for r in requests)
+    end = max(r["start_date"] + timedelta(days=r.get("estimated_duration_days", 30)) for r in requests)
+    pool = CandidatePool(start, end)
+
+    scores = np.column_stack([pool.score(r) for r in requests]) if len(pool) else np.empty((0, len(requests)))
+    assigned_to = solve_assignment(scores, [r["number_of_workers"] for r in requests])
+
+    plans = []
+    for index, request in enumerate(requests):
+        chosen = np.where(assigned_to == index)[0]
+        chosen = chosen[np.argsort(-scores[chosen, index], kind="stable")]
+        end_date = request["start_date"] + timedelta(days=request.get("estimated_duration_days", 30))
+        distance = pool.distance_from(request["district_id"].pk)
+        proposals = [
+            {
+                "hcw": int(pool.ids[i]),
+                "hcw_name": pool.names[i],
+                "district": request["district_id"].pk,
+                "outbreak_type": request["outbreak_type"],
+                "start_date": request["start_date"],
+                "end_date": end_date,
+                "score": round(float(scores[i, index]), 1),
+                "distance_km": None if np.isnan(distance[i]) else round(float(distance[i]), 1),
+                "distance_band": distance_band(None if np.isnan(distance[i]) else distance[i]),
+            }
+            for i in chosen
+        ]
+        plans.append({
+            "request": index,
+            "district": request["district_id"].pk,
+            "district_name": request["district_id"].name,
+            "outbreak_type": request["outbreak_type"],
+            "requested": request["number_of_workers"],
+            "filled": len(proposals),
+            "proposals": proposals,
+        })
+    return plans
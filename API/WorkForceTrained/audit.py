@@ -0,0 +1,128 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from WorkForceTrained.models import AuditEntry, Deployment, HealthcareWorker, Training
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns that change on every save and say nothing about the change.
+SKIPPED_FIELDS = {"id", "created_at", "updated_at", "phone_e164"}
+AUDITED_FIELDS = {
+    model: tuple(
+        f.attname for f in model._meta.concrete_fields if f.attname not in SKIPPED_FIELDS
+    )
+    for model in (HealthcareWorker, Training, Deployment)
+}
+WRITE_BATCH = 1000
+
+_buffer = ContextVar("audit_buffer", default=None)
+
+
+def _plain(value):
+    return value.name or None if isinstance(value, FieldFile) else value
+
+
+def snapshot(instance):
+    """Audited field values currently loaded on the instance (deferred ones are skipped)."""
+    return {
+        f: _plain(instance.__dict__[f])
+        for f in AUDITED_FIELDS[type(instance)] if f in instance.__dict__
+    }
+
+
+def diff(old, new):
+    """{field: [old, new]} for fields whose value changed."""
+    return {f: [old.get(f), value] for f, value in new.items() if old.get(f) != value}
+
+
+def _entry(instance, action, changes):
+    return AuditEntry(
+        entity=instance._meta.model_name, object_id=instance.pk,
+        action=action, changes=changes, timestamp=timezone.now(),
+    )
+
+
+def capture(entries):
+    """
+    Keep entries for writing once the current transaction commits, entries
+    of a rolled back transaction are never written. Inside buffered() they
+    are written together at the end, otherwise straight after the commit.
+    """
+    entries = [e for e in entries if e.changes or e.action != "updated"]
+    if entries:
+        transaction.on_commit(lambda: _committed(entries))
+
+
+def _committed(entries):
+    buffer = _buffer.get()
+    if buffer is None:
+        _write(entries)
+    else:
+        buffer["entries"].extend(entries)
+
+
+def _write(entries, user=None):
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    for entry in entries:
+        entry.user_id = entry.user_id or user_id
+    try:
+        AuditEntry.objects.bulk_create(entries, batch_size=WRITE_BATCH)
+    except Exception:
+        # The audited change has already committed, losing its audit row
+        # is logged rather than turned into an error for the caller.
+        logger.exception("Failed to write %s audit entries", len(entries))
+
+
+@contextmanager
+def buffered(request=None):
+    """
+    Collect audit entries and write them in one bulk_create on exit.
+    `request.user` is read at the end, once authentication has run.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    buffer = {"entries": []}
+    token = _buffer.set(buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        if buffer["entries"]:
+            _write(buffer["entries"], getattr(request, "user", None))
+
+
+def record_saved(instance, created):
+    new = snapshot(instance)
+    if created:
+        changes = {f: value for f, value in new.items() if value not in (None, "")}
+        capture([_entry(instance, "created", changes)])
+    else:
+        capture([_entry(instance, "updated", diff(instance._audit_state or {}, new))])
+    instance._audit_state = new
+
+
+def record_deleted(instance):
+    capture([_entry(instance, "deleted", {**(instance._audit_state or {}), **snapshot(instance)})])
+
+
+def record_bulk_created(instances):
+    """Audit rows inserted with bulk_create, which sends no post_save."""
+    capture([
+        _entry(instance, "created", {f: v for f, v in snapshot(instance).items() if v not in (None, "")})
+        for instance in instances if instance.pk
+    ])
+
+
+def record_bulk_updated(model, ids, changes):
+    """Audit a queryset.update() that bypassed the save signals."""
+    now = timezone.now()
+    capture([
+        AuditEntry(entity=model._meta.model_name, object_id=pk, action="updated", changes=changes, timestamp=now)
+        for pk in ids
+    ])
@@ -0,0 +1,188 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Count, Max
+
+from WorkForceTrained.models import Competency, District, Facility, Organization
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+# How often a process checks the database for changes made by other processes.
+RECHECK_SECONDS = 30
+MIN_TRIGRAM_SCORE = 0.3
+# Trigram fallback only gathers candidates from grams at most this common.
+MAX_POSTING = 2000
+
+
+def _facility_rows():
+    for row in Facility.objects.values(
+        "id", "name", "code", "facility_type", "district_id", "district__name"
+    ).order_by():
+        yield row["id"], row["name"], row["code"], row["district_id"], {
+            "code": row["code"],
+            "facility_type": row["facility_type"],
+            "district": row["district_id"],
+            "district_name": row["district__name"],
+        }
+
+
+def _organization_rows():
+    for row in Organization.objects.values("id", "name").order_by():
+        yield row["id"], row["name"], None, None, {}
+
+
+def _competency_rows():
+    for row in Competency.objects.values("id", "code", "name").order_by():
+        yield row["id"], row["name"], row["code"], None, {"code": row["code"]}
+
+
+# kind -> (models it reads, rows). Each row is (id, label, code, district_id, extra fields).
+SOURCES = {
+    "facilities": ((Facility, District), _facility_rows),
+    "organizations": ((Organization,), _organization_rows),
+    "competencies": ((Competency,), _competency_rows),
+}
+
+
+def normalize(text):
+    """Lowercase ASCII words, accents and punctuation dropped."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixIndex:
+    """
+    Sorted (token, entry) pairs for prefix lookups by bisection, plus a
+    trigram map for typo-tolerant fallback when no prefix matches.
+    """
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.entries = []
+        self.entry_grams = []
+        pairs = []
+        self.grams = defaultdict(list)
+        for index, (pk, label, code, district_id, extra) in enumerate(rows):
+            tokens = normalize(label) + normalize(code)
+            self.entries.append((pk, label, district_id, extra, tokens))
+            grams = set().union(*(trigrams(t) for t in tokens)) if tokens else set()
+            self.entry_grams.append(grams)
+            for gram in grams:
+                self.grams[gram].append(index)
+            pairs.extend((token, index) for token in set(tokens))
+        pairs.sort()
+        self.tokens = [token for token, _ in pairs]
+        self.token_entries = [index for _, index in pairs]
+        # Ties are broken by shorter, then alphabetical labels, ranked once here.
+        order = sorted(range(len(self.entries)), key=lambda i: (len(self.entries[i][1]), self.entries[i][1]))
+        self.rank = [0] * len(order)
+        for position, index in enumerate(order):
+            self.rank[index] = position
+
+    def _prefixed(self, word):
+        start = bisect_left(self.tokens, word)
+        matches = set()
+        for position in range(start, len(self.tokens)):
+            if not self.tokens[position].startswith(word):
+                break
+            matches.add(self.token_entries[position])
+        return matches
+
+    def _similar(self, words):
+        query = set().union(*(trigrams(w) for w in words))
+        postings = sorted((self.grams[g] for g in query if g in self.grams), key=len)
+        # Rare grams find the candidates, very common ones would add nothing but work.
+        selective = [p for p in postings if len(p) <= MAX_POSTING] or postings[:2]
+        candidates = set().union(*selective) if selective else set()
+        scores = {}
+        for index in candidates:
+            score = len(query & self.entry_grams[index]) / len(query)
+            if score >= MIN_TRIGRAM_SCORE:
+                scores[index] = score
+        return scores
+
+    def search(self, query, limit=DEFAULT_LIMIT, district_id=None):
+        words = normalize(query)
+        if not words:
+            return []
+
+        # Every query word must start some word of the label (or the code).
+        candidates = None
+        for word in sorted(words, key=len, reverse=True):
+            found = self._prefixed(word)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                break
+        scores = {index: 2.0 for index in candidates or ()}
+        if not scores:
+            scores = self._similar(words)
+
+        def key(index):
+            score = scores[index]
+            tokens = self.entries[index][4]
+            # Labels that start with the query beat ones matching a later word.
+            if score >= 2 and tokens and tokens[0].startswith(words[0]):
+                score += 1
+            return -score, self.rank[index]
+
+        if district_id is not None:
+            scores = {i: s for i, s in scores.items() if self.entries[i][2] == district_id}
+        results = []
+        for index in heapq.nsmallest(limit, scores, key=key):
+            pk, label, _, extra, _ = self.entries[index]
+            results.append({"id": pk, "label": label, **extra, "match": "prefix" if scores[index] >= 2 else "similar"})
+        return results
+
+
+_indexes = {}
+_checked = {}
+_lock = threading.Lock()
+
+
+def data_version(kind):
+    parts = []
+    for model in SOURCES[kind][0]:
+        state = model.objects.aggregate(n=Count("pk"), last=Max("updated_at"))
+        parts.append(f"{state['n']}:{state['last'].timestamp() if state['last'] else 0}")
+    return "|".join(parts)
+
+
+def get_index(kind):
+    """
+    Process-local index for `kind`, rebuilt when its table changes. Local
+    writes drop it at once (see signals), other processes' writes are
+    noticed within RECHECK_SECONDS.
+    """
+    index = _indexes.get(kind)
+    now = time.monotonic()
+    if index is not None and now - _checked.get(kind, 0) < RECHECK_SECONDS:
+        return index
+    with _lock:
+        version = data_version(kind)
+        _checked[kind] = now
+        index = _indexes.get(kind)
+        if index is None or index.version != version:
+            index = _indexes[kind] = PrefixIndex(list(SOURCES[kind][1]()), version)
+        return index
+
+
+def forget(model):
+    """Drop this process's indexes that read `model`."""
+    for kind, (models, _) in SOURCES.items():
+        if model in models:
+            _indexes.pop(kind, None)
+
+
+def suggest(kind, query, limit=DEFAULT_LIMIT, district_id=None):
+    index = get_index(kind)
+    return index.search(query, min(max(limit, 1), MAX_LIMIT), district_id), index.version
@@ -0,0 +1,121 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+from WorkForceTrained import querystats
+from WorkForceTrained.throttling import endpoint_key, record_endpoint_cost
+
+MAX_BATCH_REQUESTS = 20
+MAX_PARALLEL = 4
+# Sub-requests may only read from these prefixes, and never re-enter batch
+# or open a stream.
+ALLOWED_PREFIX = "/api/"
+BLOCKED_PATHS = ("/api/batch/", "/api/events/")
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_items(items):
+    """Validate the `requests` list, returns [(id, path, query string)]."""
+    if not isinstance(items, list) or not items:
+        raise BatchError("requests must be a non-empty list")
+    if len(items) > MAX_BATCH_REQUESTS:
+        raise BatchError(f"At most {MAX_BATCH_REQUESTS} requests per batch")
+
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"path": item}
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise BatchError(f"requests[{index}] needs a path")
+        if item.get("method", "GET").upper() != "GET":
+            raise BatchError(f"requests[{index}]: only GET sub-requests are allowed")
+
+        url = urlsplit(item["path"])
+        if not url.path.startswith(ALLOWED_PREFIX) or url.path.startswith(BLOCKED_PATHS):
+            raise BatchError(f"requests[{index}]: {url.path} cannot be batched")
+        query = QueryDict(url.query, mutable=True)
+        for key, value in (item.get("params") or {}).items():
+            query.setlist(key, value if isinstance(value, list) else [value])
+        parsed.append((item.get("id", index), url.path, query.urlencode()))
+    return parsed
+
+
+def _sub_request(request, path, query_string):
+    """A GET HttpRequest that reuses the outer request's headers and user."""
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = path
+    sub.META = {
+        k: v for k, v in request.META.items()
+        if k not in ("CONTENT_LENGTH", "CONTENT_TYPE", "HTTP_IF_NONE_MATCH", "HTTP_RANGE")
+    }
+    sub.META.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query_string)
+    sub.GET = QueryDict(query_string)
+    sub.COOKIES = request.COOKIES
+    return sub
+
+
+def _run_one(request, user, auth, item):
+    item_id, path, query_string = item
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {"id": item_id, "status": 404, "body": {"error": f"No endpoint at {path}"}}
+
+    sub = _sub_request(request, path, query_string)
+    # Keyed by route like a direct call, so the cost throttle sees it.
+    sub.resolver_match = match
+    # DRF skips authentication for forced users, the token was already
+    # validated once for the batch itself.
+    sub._force_auth_user = user
+    sub._force_auth_token = auth
+    try:
+        # Measured here rather than by DatabaseTimeMiddleware, which only
+        # sees the batch, and on this thread's connections when parallel.
+        with querystats.recording() as recorder:
+            recorder.view = endpoint_key(sub)
+            response = match.func(sub, *match.args, **match.kwargs)
+    except Exception as e:
+        return {"id": item_id, "status": 500, "body": {"error": str(e)}}
+    if response.status_code != 429:
+        record_endpoint_cost(recorder.view, recorder.elapsed_ms)
+
+    if getattr(response, "streaming", False):
+        return {"id": item_id, "status": 400, "body": {"error": "Streaming responses cannot be batched"}}
+    if hasattr(response, "data"):
+        body = response.data
+    else:
+        try:
+            body = json.loads(response.content or b"null")
+        except ValueError:
+            body = response.content.decode(response.charset or "utf-8", errors="replace")
+    return {"id": item_id, "status": response.status_code, "body": body}
+
+
+def _run_in_thread(request, user, auth, item):
+    try:
+        return _run_one(request, user, auth, item)
+    finally:
+        # Worker threads open their own connections, don't leave them behind.
+        connections.close_all()
+
+
+def run_batch(request, user, auth, items, parallel=False):
+    """
+    Run parsed GET sub-requests without re-authenticating each one.
+
+    Sequential runs share the outer request's database connection. Parallel
+    runs use a small thread pool, each thread with its own connection.
+    """
+    if not parallel or len(items) == 1:
+        return [_run_one(request, user, auth, item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(items))) as pool:
+        return list(pool.map(lambda item: _run_in_thread(request, user, auth, item), items))
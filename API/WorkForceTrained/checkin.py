@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from WorkForceTrained import events, profiles, snapshots
+from WorkForceTrained.models import AvailabilityRecord, HealthcareWorker
+
+VALID_STATUSES = {choice for choice, _ in AvailabilityRecord.STATUS_CHOICES}
+MAX_BULK_ENTRIES = 5000
+
+
+def _clean_entry(entry):
+    """Validate one raw entry, returns (cleaned, errors)."""
+    if not isinstance(entry, dict):
+        return None, ["Entry must be an object."]
+
+    errors = []
+    try:
+        hcw_id = int(entry.get("hcw"))
+    except (TypeError, ValueError):
+        hcw_id = None
+        errors.append("hcw must be a worker id.")
+
+    status = entry.get("status")
+    if status not in VALID_STATUSES:
+        errors.append(f"status must be one of {sorted(VALID_STATUSES)}.")
+
+    location = entry.get("location") or None
+    note = entry.get("note") or None
+    if location is not None and len(str(location)) > 255:
+        errors.append("location must be at most 255 characters.")
+
+    cleaned = {"hcw": hcw_id, "status": status, "location": location, "note": note}
+    return cleaned, errors
+
+
+def _current_state(hcw_ids):
+    """Latest (status, location, note) per existing worker in a single query."""
+    latest = AvailabilityRecord.objects.filter(hcw=OuterRef("pk")).order_by("-timestamp")
+    rows = (
+        HealthcareWorker.objects
+        .filter(id__in=hcw_ids)
+        .annotate(
+            current_status=Subquery(latest.values("status")[:1]),
+            current_location=Subquery(latest.values("location")[:1]),
+            current_note=Subquery(latest.values("note")[:1]),
+        )
+        .values_list("id", "current_status", "current_location", "current_note")
+    )
+    return {hcw_id: (status, location, note) for hcw_id, status, location, note in rows}
+
+
+def bulk_check_in(entries):
+    """
+    Record availability for many workers at once.
+
+    Worker ids are checked with one IN query, entries matching the worker's
+    current status/location/note are skipped, and everything new is written
+    with a single bulk_create inside one transaction.
+    Returns (outcomes, summary) where outcomes line up with `entries`.
+    """
+    outcomes = []
+    cleaned_entries = []
+    for index, entry in enumerate(entries):
+        cleaned, errors = _clean_entry(entry)
+        if errors:
+            hcw = entry.get("hcw") if isinstance(entry, dict) else None
+            outcomes.append({"index": index, "hcw": hcw, "outcome": "invalid", "errors": errors})
+        else:
+            outcomes.append(None)
+            cleaned_entries.append((index, cleaned))
+
+    with transaction.atomic():
+        hcw_ids = {cleaned["hcw"] for _, cleaned in cleaned_entries}
+        current = _current_state(hcw_ids)
+
+        to_create = []
+        for index, cleaned in cleaned_entries:
+            hcw_id = cleaned["hcw"]
+            if hcw_id not in current:
+                outcomes[index] = {"index": index, "hcw": hcw_id, "outcome": "invalid",
+                                   "errors": ["Healthcare worker not found."]}
+                continue
+
+            state = (cleaned["status"], cleaned["location"], cleaned["note"])
+            if current[hcw_id] == state:
+                outcomes[index] = {"index": index, "hcw": hcw_id, "outcome": "unchanged"}
+                continue
+
+            # Later entries for the same worker compare against this one.
+            current[hcw_id] = state
+            to_create.append(AvailabilityRecord(
+                hcw_id=hcw_id,
+                status=cleaned["status"],
+                location=cleaned["location"],
+                note=cleaned["note"],
+            ))
+            outcomes[index] = {"index": index, "hcw": hcw_id, "outcome": "created"}
+
+        created = AvailabilityRecord.objects.bulk_create(to_create, batch_size=1000)
+        # bulk_create skips post_save, so live streams and profiles are told here.
+        events.publish_after_commit(events.availability_events(created))
+        profiles.forget(record.hcw_id for record in created)
+        snapshots.mark_stale()
+
+    # bulk_create only returns primary keys on backends that support it.
+    created_ids = iter([record.pk for record in created])
+    for outcome in outcomes:
+        if outcome["outcome"] == "created":
+            outcome["id"] = next(created_ids)
+
+    summary = {"received": len(entries)}
+    for outcome in outcomes:
+        summary[outcome["outcome"]] = summary.get(outcome["outcome"], 0) + 1
+    return outcomes, summary
@@ -0,0 +1,85 @@
+from collections import Counter
+
+from django.db.models import Count, F
+
+from WorkForceTrained.models import Competency, Facility, Organization, WorkforceCounter
+
+ALL = ("all", "")
+# Only the reference tables are counted here. Worker and training totals come
+# from the rollup cubes, so saving a worker or a training writes no counter.
+
+
+def facility_keys(district_id, facility_type):
+    return [
+        ("facilities", *ALL),
+        ("facilities", "district", str(district_id)),
+        ("facilities", "facility_type", facility_type or ""),
+    ]
+
+
+def diff(old_keys, new_keys):
+    deltas = Counter(new_keys)
+    deltas.subtract(Counter(old_keys))
+    return deltas
+
+
+def apply(deltas):
+    """Add deltas to their counters, creating missing rows first."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    WorkforceCounter.objects.bulk_create(
+        [WorkforceCounter(metric=m, dimension=d, key=k) for m, d, k in deltas],
+        ignore_conflicts=True,
+    )
+    for (metric, dimension, key), delta in deltas.items():
+        WorkforceCounter.objects.filter(metric=metric, dimension=dimension, key=key).update(
+            value=F("value") + delta
+        )
+
+
+def values(metric, dimension):
+    """{key: value} for one metric broken down by one dimension."""
+    return dict(
+        WorkforceCounter.objects.filter(metric=metric, dimension=dimension).values_list("key", "value")
+    )
+
+
+def totals():
+    """Every "all" counter in one query, e.g. {"facilities": 120, "organizations": 14}."""
+    return dict(
+        WorkforceCounter.objects.filter(dimension=ALL[0], key=ALL[1]).values_list("metric", "value")
+    )
+
+
+def expected_counts():
+    """Exact counts computed from the source tables, for reconciling."""
+    expected = Counter()
+
+    for row in Facility.objects.values("district_id", "facility_type").annotate(n=Count("id")).order_by():
+        for key in facility_keys(row["district_id"], row["facility_type"]):
+            expected[key] += row["n"]
+
+    expected[("organizations", *ALL)] = Organization.objects.count()
+    expected[("competencies", *ALL)] = Competency.objects.count()
+    return expected
+
+
+def reconcile(repair=True):
+    """
+    Compare stored counters with exact counts and optionally fix them.
+    Returns {(metric, dimension, key): (stored, expected)} for every drifted counter.
+    """
+    expected = expected_counts()
+    stored = {
+        (c.metric, c.dimension, c.key): c.value for c in WorkforceCounter.objects.all()
+    }
+
+    drift = {}
+    for key in set(expected) | set(stored):
+        if stored.get(key, 0) != expected.get(key, 0):
+            drift[key] = (stored.get(key, 0), expected.get(key, 0))
+
+    if repair and drift:
+        apply({key: exp - have for key, (have, exp) in drift.items()})
+    return drift
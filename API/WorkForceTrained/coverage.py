@@ -0,0 +1,186 @@
+import hashlib
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from WorkForceTrained.models import Competency, District, HealthcareWorker, Training
+
+# Rows fetched per round trip while streaming, and rows turned into arrays at once.
+FETCH_SIZE = 20000
+TRAINING_BATCH = 200000
+CACHE_SECONDS = 60 * 60
+UNSPECIFIED = "Unspecified"
+DIMENSIONS = ("position", "gender")
+
+
+def data_version(today=None):
+    """
+    Changes whenever workers, trainings or competencies change, and daily
+    since certifications expire by date.
+    """
+    parts = [str(today or date.today())]
+    for model in (HealthcareWorker, Training, Competency):
+        state = model.objects.aggregate(n=Count("pk"), last=Max("updated_at"))
+        parts.append(f"{state['n']}:{state['last'].isoformat() if state['last'] else ''}")
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+class _Codes:
+    """Maps labels to small integer codes while streaming."""
+
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, value):
+        return self.index.setdefault(value, len(self.index))
+
+    def labels(self):
+        return np.array(list(self.index), dtype=object)
+
+
+def _load_workers():
+    positions, genders = _Codes(), _Codes()
+    rows = (
+        HealthcareWorker.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("id", "facility__district_id", "position", "gender")
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+    ids, districts, position_codes, gender_codes = [], [], [], []
+    for hcw_id, district_id, position, gender in rows:
+        ids.append(hcw_id)
+        districts.append(district_id or 0)
+        position_codes.append(positions((position or "").strip().title() or UNSPECIFIED))
+        gender_codes.append(genders(gender or UNSPECIFIED))
+    return (
+        np.array(ids, dtype=np.int64),
+        np.array(districts, dtype=np.int64),
+        np.array(position_codes, dtype=np.int32), positions.labels(),
+        np.array(gender_codes, dtype=np.int32), genders.labels(),
+    )
+
+
+def _certification_bits(worker_ids, competency_ids, today):
+    """
+    Per-worker bitmap of valid certifications, workers x ceil(competencies/8)
+    bytes, filled from the training table in bounded batches.
+    """
+    bits = np.zeros((len(worker_ids), (len(competency_ids) + 7) // 8), dtype=np.uint8)
+    if not len(worker_ids) or not len(competency_ids):
+        return bits
+
+    rows = (
+        Training.objects
+        .filter(hcw__is_active=True)
+        .filter(Q(valid_until__isnull=True) | Q(valid_until__gte=today))
+        .values_list("hcw_id", "competency_id")
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+
+    def apply(batch):
+        pairs = np.array(batch, dtype=np.int64)
+        workers = np.searchsorted(worker_ids, pairs[:, 0])
+        columns = np.searchsorted(competency_ids, pairs[:, 1])
+        workers = np.minimum(workers, len(worker_ids) - 1)
+        columns = np.minimum(columns, len(competency_ids) - 1)
+        known = (worker_ids[workers] == pairs[:, 0]) & (competency_ids[columns] == pairs[:, 1])
+        workers, columns = workers[known], columns[known]
+        np.bitwise_or.at(bits, (workers, columns // 8), (1 << (columns % 8)).astype(np.uint8))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == TRAINING_BATCH:
+            apply(batch)
+            batch = []
+    if batch:
+        apply(batch)
+    return bits
+
+
+def compute_coverage(today=None):
+    """
+    Worker and certified counts for every (district, position, gender)
+    group and competency, from one streaming pass over each table.
+    """
+    today = today or date.today()
+    worker_ids, districts, positions, position_labels, genders, gender_labels = _load_workers()
+    competencies = list(Competency.objects.order_by("id").values("id", "code", "name"))
+    competency_ids = np.array([c["id"] for c in competencies], dtype=np.int64)
+    bits = _certification_bits(worker_ids, competency_ids, today)
+
+    keys = np.stack([districts, positions, genders], axis=1)
+    groups, group_index = np.unique(keys, axis=0, return_inverse=True)
+    group_index = group_index.reshape(-1)
+    workers = np.bincount(group_index, minlength=len(groups))
+    certified = np.zeros((len(groups), len(competencies)), dtype=np.int64)
+    for column in range(len(competencies)):
+        held = (bits[:, column // 8] >> (column % 8)) & 1
+        certified[:, column] = np.bincount(group_index, weights=held, minlength=len(groups))
+
+    return {
+        "competencies": competencies,
+        "groups": [
+            {
+                "district": int(district),
+                "position": position_labels[position] if len(position_labels) else UNSPECIFIED,
+                "gender": gender_labels[gender] if len(gender_labels) else UNSPECIFIED,
+                "workers": int(count),
+                "certified": row.tolist(),
+            }
+            for (district, position, gender), count, row in zip(groups, workers, certified)
+        ],
+        "computed_at": timezone.now().isoformat(),
+    }
+
+
+def get_coverage():
+    version = data_version()
+    result = cache.get_or_set(f"training-coverage:{version}", compute_coverage, CACHE_SECONDS)
+    return result, version
+
+
+def coverage_matrix(by=(), district_ids=None, competency_ids=None):
+    """
+    District x competency coverage, optionally split further by position
+    and/or gender. Shares are certified workers over active workers.
+    """
+    data, version = get_coverage()
+    by = [d for d in DIMENSIONS if d in by]
+
+    columns = [
+        i for i, c in enumerate(data["competencies"])
+        if not competency_ids or c["id"] in competency_ids
+    ]
+    rows = {}
+    for group in data["groups"]:
+        if district_ids and group["district"] not in district_ids:
+            continue
+        key = (group["district"], *(group[d] for d in by))
+        row = rows.setdefault(key, {"workers": 0, "certified": np.zeros(len(columns), dtype=np.int64)})
+        row["workers"] += group["workers"]
+        row["certified"] += np.array(group["certified"], dtype=np.int64)[columns]
+
+    names = dict(District.objects.values_list("id", "name"))
+    matrix = []
+    for key, row in sorted(rows.items(), key=lambda item: (names.get(item[0][0], ""), item[0][1:])):
+        shares = row["certified"] / row["workers"] if row["workers"] else np.zeros(len(columns))
+        entry = {"district": key[0] or None, "district_name": names.get(key[0], "Unassigned")}
+        entry.update(zip(by, key[1:]))
+        entry.update({
+            "workers": row["workers"],
+            "certified": row["certified"].tolist(),
+            "coverage": np.round(shares, 4).tolist(),
+        })
+        matrix.append(entry)
+
+    return {
+        "competencies": [data["competencies"][i] for i in columns],
+        "by": by,
+        "rows": matrix,
+        "data_version": version,
+        "computed_at": data["computed_at"],
+    }
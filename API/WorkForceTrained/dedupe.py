@@ -0,0 +1,309 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations, groupby, islice
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from WorkForceTrained import audit, forecast, profiles
+from WorkForceTrained.models import (
+    AvailabilityRecord, DedupeKey, Deployment, DuplicateCandidate, HealthcareWorker, Training
+)
+from WorkForceTrained.phones import normalize_phone
+from WorkForceTrained.scheduling import BLOCKING, find_conflicts
+
+FETCH_SIZE = 20000
+WRITE_BATCH = 5000
+# Blocks bigger than this (very common names) are not compared pairwise,
+# their members still meet through their phone and national ID keys.
+MAX_BLOCK = 200
+MIN_SCORE = 0.6
+# Fields that feed the blocking keys and the score.
+MATCH_FIELDS = ("first_name", "last_name", "phone", "national_id", "email")
+# Blank fields on the kept worker are filled from the merged one.
+FILL_FIELDS = ("national_id", "email", "gender", "position", "facility_id", "organization_id")
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"), **dict.fromkeys("CGJKQSXZ", "2"),
+    **dict.fromkeys("DT", "3"), "L": "4", **dict.fromkeys("MN", "5"), "R": "6",
+}
+
+
+class MergeError(Exception):
+    pass
+
+
+def soundex(name):
+    """American Soundex, '' for names without letters."""
+    letters = [c for c in (name or "").upper() if "A" <= c <= "Z"]
+    if not letters:
+        return ""
+    code, previous = letters[0], SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = SOUNDEX_CODES.get(c, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "HW":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def phone_key(phone):
+    return normalize_phone(phone) or ""
+
+
+def national_id_key(national_id):
+    return re.sub(r"[^0-9A-Z]", "", (national_id or "").upper())
+
+
+def blocking_keys(first_name, last_name, phone, national_id, email=None):
+    keys = set()
+    first, last = soundex(first_name), soundex(last_name)
+    if first and last:
+        # Sorted so swapped first and last names land in the same block.
+        keys.add("name:" + "-".join(sorted((first, last))))
+    if phone_key(phone):
+        keys.add("phone:" + phone_key(phone))
+    nid = national_id_key(national_id)
+    if len(nid) >= 6:
+        keys.add("nid:" + nid[:8])
+    return keys
+
+
+def _similarity(a, b):
+    a, b = (a or "").strip().lower(), (b or "").strip().lower()
+    return SequenceMatcher(None, a, b).ratio() if a and b else 0.0
+
+
+def score_pair(a, b):
+    """(score in 0..1, reasons) for two workers given as MATCH_FIELDS tuples."""
+    first_a, last_a, phone_a, nid_a, email_a = a
+    first_b, last_b, phone_b, nid_b, email_b = b
+    name = max(
+        _similarity(first_a, first_b) + _similarity(last_a, last_b),
+        _similarity(first_a, last_b) + _similarity(last_a, first_b),
+    ) / 2
+    score, reasons = 0.5 * name, [f"name {name:.0%} similar"]
+
+    if phone_key(phone_a) and phone_key(phone_a) == phone_key(phone_b):
+        score += 0.3
+        reasons.append("same phone")
+    nid_a, nid_b = national_id_key(nid_a), national_id_key(nid_b)
+    if nid_a and nid_b:
+        if nid_a == nid_b:
+            score += 0.3
+            reasons.append("same national ID")
+        elif nid_a[:8] == nid_b[:8]:
+            score += 0.15
+            reasons.append("similar national ID")
+        else:
+            score -= 0.3
+            reasons.append("different national IDs")
+    if email_a and (email_a or "").lower() == (email_b or "").lower():
+        score += 0.1
+        reasons.append("same email")
+    return round(max(0.0, min(1.0, score)), 3), reasons
+
+
+def _records(hcw_ids):
+    """MATCH_FIELDS per worker, fetched FETCH_SIZE ids at a time."""
+    hcw_ids, records = sorted(hcw_ids), {}
+    for start in range(0, len(hcw_ids), FETCH_SIZE):
+        workers = HealthcareWorker.objects.filter(pk__in=hcw_ids[start:start + FETCH_SIZE])
+        records.update((row[0], row[1:]) for row in workers.values_list("id", *MATCH_FIELDS))
+    return records
+
+
+def _write_keys(workers):
+    """
+    Store blocking keys for (id, MATCH_FIELDS) rows, WRITE_BATCH keys per
+    insert. Returns the number of workers keyed.
+    """
+    batch, count = [], 0
+    for hcw_id, *fields in workers:
+        count += 1
+        batch.extend(DedupeKey(hcw_id=hcw_id, key=key) for key in blocking_keys(*fields))
+        if len(batch) >= WRITE_BATCH:
+            DedupeKey.objects.bulk_create(batch)
+            batch = []
+    DedupeKey.objects.bulk_create(batch)
+    return count
+
+
+def _pairs_in_blocks(blocks):
+    """Pairs within each block of worker ids, blocks over MAX_BLOCK are skipped."""
+    pairs, skipped = set(), 0
+    for members in blocks:
+        members = list(islice(members, MAX_BLOCK + 1))
+        if len(members) > MAX_BLOCK:
+            skipped += 1
+            continue
+        pairs.update(combinations(sorted(members), 2))
+    return pairs, skipped
+
+
+def _save_candidates(scored, scope):
+    """
+    Store pairs that scored at least MIN_SCORE. Pending pairs within `scope`
+    that no longer qualify are dropped, reviewed pairs are left alone.
+    """
+    existing = {
+        (c.worker_a_id, c.worker_b_id): c
+        for c in DuplicateCandidate.objects.filter(scope)
+    }
+    new, changed = [], []
+    for pair, (score, reasons) in scored.items():
+        if score < MIN_SCORE:
+            continue
+        candidate = existing.pop(pair, None)
+        if candidate is None:
+            new.append(DuplicateCandidate(worker_a_id=pair[0], worker_b_id=pair[1], score=score, reasons=reasons))
+        elif candidate.status == "pending" and (candidate.score, candidate.reasons) != (score, reasons):
+            candidate.score, candidate.reasons = score, reasons
+            changed.append(candidate)
+
+    DuplicateCandidate.objects.bulk_create(new, batch_size=WRITE_BATCH, ignore_conflicts=True)
+    DuplicateCandidate.objects.bulk_update(changed, ["score", "reasons"], batch_size=WRITE_BATCH)
+    dropped = [c.pk for c in existing.values() if c.status == "pending"]
+    DuplicateCandidate.objects.filter(pk__in=dropped).delete()
+    return {"new": len(new), "updated": len(changed), "dropped": len(dropped)}
+
+
+def find_duplicates(hcw_ids=None, progress=None):
+    """
+    Refresh blocking keys and duplicate candidates. With hcw_ids only those
+    workers are re-keyed and compared against the members of their blocks,
+    otherwise every worker is.
+    """
+    progress = progress or (lambda *args, **kwargs: None)
+    if hcw_ids is None:
+        # Streamed end to end, only the candidate pairs and their workers are held.
+        workers = HealthcareWorker.objects.order_by("id").values_list("id", *MATCH_FIELDS)
+        with transaction.atomic():
+            DedupeKey.objects.all().delete()
+            scanned = _write_keys(workers.iterator(chunk_size=FETCH_SIZE))
+        progress(20, message=f"Keyed {scanned} workers")
+        keys = DedupeKey.objects.order_by("key").values_list("key", "hcw_id").iterator(chunk_size=FETCH_SIZE)
+        pairs, skipped = _pairs_in_blocks(
+            (hcw_id for _, hcw_id in members) for _, members in groupby(keys, key=itemgetter(0))
+        )
+        records = _records({hcw_id for pair in pairs for hcw_id in pair})
+        scope = Q()
+    else:
+        hcw_ids = set(hcw_ids)
+        records = _records(hcw_ids)
+        with transaction.atomic():
+            DedupeKey.objects.filter(hcw_id__in=hcw_ids).delete()
+            _write_keys((hcw_id, *fields) for hcw_id, fields in records.items())
+        keys = {key for fields in records.values() for key in blocking_keys(*fields)}
+        sizes = dict(
+            DedupeKey.objects.filter(key__in=keys).values_list("key").annotate(n=Count("id"))
+        )
+        small = [key for key in keys if sizes.get(key, 0) <= MAX_BLOCK]
+        skipped = len(keys) - len(small)
+        blocks = defaultdict(set)
+        for key, hcw_id in DedupeKey.objects.filter(key__in=small).values_list("key", "hcw_id"):
+            blocks[key].add(hcw_id)
+        pairs = {
+            pair for pair in _pairs_in_blocks(blocks.values())[0]
+            if pair[0] in records or pair[1] in records
+        }
+        partners = {hcw_id for pair in pairs for hcw_id in pair} - set(records)
+        records.update(_records(partners))
+        scanned = len(records)
+        scope = Q(worker_a_id__in=hcw_ids) | Q(worker_b_id__in=hcw_ids)
+
+    progress(60, message=f"Scoring {len(pairs)} pairs")
+    scored = {pair: score_pair(records[pair[0]], records[pair[1]]) for pair in pairs}
+    with transaction.atomic():
+        saved = _save_candidates(scored, scope)
+    return {"workers": scanned, "pairs_scored": len(pairs), "blocks_skipped": skipped, **saved}
+
+
+def mark_dirty(hcw_ids):
+    """Re-check these workers once the current transaction commits."""
+    hcw_ids = set(hcw_ids)
+    if hcw_ids:
+        transaction.on_commit(lambda: _queue_check(hcw_ids))
+
+
+def _queue_check(hcw_ids):
+    from WorkForceTrained.jobs import enqueue_merged
+
+    enqueue_merged("find_duplicates", "workers", hcw_ids)
+
+
+def forget_pending(hcw_id):
+    DuplicateCandidate.objects.filter(
+        Q(worker_a_id=hcw_id) | Q(worker_b_id=hcw_id), status="pending"
+    ).delete()
+
+
+def merge_workers(keep_id, remove_id, candidate=None, user=None):
+    """
+    Fold worker `remove_id` into `keep_id`: trainings, availability records
+    and deployments are re-pointed, blank fields filled in, and the merged
+    worker deleted. Raises MergeError if their deployments overlap.
+    """
+    if keep_id == remove_id:
+        raise MergeError("Cannot merge a worker into itself")
+    now = timezone.now()
+    with transaction.atomic():
+        workers = HealthcareWorker.objects.select_for_update().in_bulk([keep_id, remove_id])
+        if len(workers) != 2:
+            raise MergeError("Both workers must exist")
+        keep, remove = workers[keep_id], workers[remove_id]
+
+        moving = list(
+            Deployment.objects.filter(BLOCKING, hcw_id=remove_id).values("start_date", "end_date")
+        )
+        if find_conflicts([{"hcw": keep_id, **d} for d in moving]):
+            raise MergeError("The workers have overlapping deployments")
+
+        # Same competency on the same day is the same certificate recorded twice.
+        held = set(Training.objects.filter(hcw_id=keep_id).values_list("competency_id", "date_completed"))
+        repeated = [
+            t_id for t_id, competency_id, completed in
+            Training.objects.filter(hcw_id=remove_id).values_list("id", "competency_id", "date_completed")
+            if (competency_id, completed) in held
+        ]
+        Training.objects.filter(pk__in=repeated).delete()
+        for model in (Training, Deployment):
+            ids = model.objects.filter(hcw_id=remove_id).values_list("id", flat=True)
+            audit.record_bulk_updated(model, list(ids), {"hcw_id": [remove_id, keep_id]})
+        moved = {
+            model._meta.model_name: model.objects.filter(hcw_id=remove_id).update(hcw_id=keep_id, updated_at=now)
+            for model in (Training, AvailabilityRecord, Deployment)
+        }
+        forecast.mark_dirty(forecast.worker_districts([keep_id, remove_id]))
+        profiles.forget([keep_id, remove_id])
+
+        filled = [f for f in FILL_FIELDS if not getattr(keep, f) and getattr(remove, f)]
+        values = {f: getattr(remove, f) for f in filled}
+
+        if candidate is not None:
+            candidate.status, candidate.reviewed_at, candidate.reviewed_by = "merged", now, user
+            candidate.removed_worker_id = remove_id
+            candidate.removed_worker_name = f"{remove.first_name} {remove.last_name}"[:200]
+            candidate.save(update_fields=[
+                "status", "reviewed_at", "reviewed_by", "removed_worker_id", "removed_worker_name"
+            ])
+        remove.delete()
+
+        for field, value in values.items():
+            setattr(keep, field, value)
+        keep.save()
+    mark_dirty([keep_id])
+
+    return {
+        "kept": keep_id,
+        "removed": remove_id,
+        "moved": moved,
+        "duplicate_trainings_dropped": len(repeated),
+        "filled": filled,
+    }
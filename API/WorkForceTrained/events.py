@@ -0,0 +1,305 @@
+import asyncio
+import itertools
+import json
+import logging
+import secrets
+import select
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from WorkForceTrained.models import HealthcareWorker, StreamTicket
+
+logger = logging.getLogger(__name__)
+
+# Events kept for clients that reconnect with Last-Event-ID.
+HISTORY_SIZE = 2000
+# Per-connection backlog before a slow client is told to resync.
+QUEUE_SIZE = 500
+
+# On Postgres events travel between processes (web workers, run_jobs) as
+# NOTIFY payloads, numbered by one sequence so ids agree everywhere.
+CHANNEL = "workforce_events"
+EVENT_SEQUENCE = "workforce_event_id"
+# pg_notify payloads must stay under 8000 bytes.
+MAX_NOTIFY_BYTES = 7000
+LISTEN_POLL_SECONDS = 5
+RECONNECT_SECONDS = 5
+
+# Stream tickets stand in for the JWT in the EventSource URL.
+TICKET_SECONDS = 30
+
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, loop, districts):
+        self.loop = loop
+        self.districts = districts  # set of district ids, None for all
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.districts is None or event.get("district") in self.districts
+
+    def offer(self, event):
+        """Runs on the subscriber's loop."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Dropping events silently would leave the client wrong, so it
+            # gets one resync marker and is expected to refetch.
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+def uses_notify():
+    return connections["default"].vendor == "postgresql"
+
+
+class Broker:
+    """
+    Fan-out of change events to the streams connected to this process.
+
+    Writers publish from any thread, each subscriber receives events on its
+    own event loop. On Postgres a listener thread feeds the broker from
+    NOTIFY, so events written by any process reach every web process,
+    elsewhere only writes made in this process are seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._first_replayable = 1
+        self._listener = None
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def _ensure_listener(self):
+        if self._listener is not None or not uses_notify():
+            return
+        with self._lock:
+            if self._listener is None:
+                # Nothing is replayable until the listener knows where it starts.
+                self._first_replayable = float("inf")
+                self._listener = Listener(self)
+                self._listener.start()
+
+    def restart(self, last_id, resync):
+        """The listener (re)connected after event `last_id`, older history is unreliable."""
+        with self._lock:
+            self._history.clear()
+            self._first_replayable = last_id + 1
+            targets = list(self._subscribers) if resync else []
+        for subscription in targets:
+            self._offer(subscription, RESYNC)
+
+    def subscribe(self, districts=None, last_event_id=None):
+        """Register a stream, returns (subscription, events to replay or None for resync)."""
+        self._ensure_listener()
+        subscription = Subscription(asyncio.get_running_loop(), districts)
+        with self._lock:
+            self._subscribers.add(subscription)
+            replay = []
+            if last_event_id is not None:
+                if last_event_id + 1 < self._first_replayable:
+                    replay = None
+                else:
+                    replay = [e for e in self._history if e["id"] > last_event_id and subscription.wants(e)]
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def skip(self):
+        """Note that changes happened while nobody listened, so history has a gap."""
+        with self._lock:
+            self._history.clear()
+            self._first_replayable = next(self._ids) + 1
+
+    def _offer(self, subscription, event):
+        try:
+            subscription.loop.call_soon_threadsafe(subscription.offer, event)
+        except RuntimeError:
+            # Loop already closed, the stream is gone.
+            self.unsubscribe(subscription)
+
+    def publish(self, event):
+        """Deliver an event, numbering it unless it already has its global id."""
+        with self._lock:
+            if "id" not in event:
+                event = {"id": next(self._ids), **event}
+            if len(self._history) == self._history.maxlen:
+                self._first_replayable = self._history[0]["id"] + 1
+            self._history.append(event)
+            targets = [s for s in self._subscribers if s.wants(event)]
+        for subscription in targets:
+            self._offer(subscription, event)
+        return event
+
+
+class Listener(threading.Thread):
+    """LISTENs on its own connection and hands every notified event to the broker."""
+
+    def __init__(self, broker):
+        super().__init__(name="event-listener", daemon=True)
+        self.broker = broker
+
+    def run(self):
+        resync = False
+        while True:
+            try:
+                self._listen(resync)
+            except Exception:
+                logger.warning("Event listener lost its connection, reconnecting", exc_info=True)
+            # Events sent while reconnecting are lost, streams must refetch.
+            resync = True
+            time.sleep(RECONNECT_SECONDS)
+
+    def _listen(self, resync):
+        wrapper = connections["default"]
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.execute(f"SELECT last_value, is_called FROM {EVENT_SEQUENCE}")
+                last_value, is_called = cursor.fetchone()
+            self.broker.restart(last_value if is_called else last_value - 1, resync)
+            while True:
+                for payload in _notifications(conn):
+                    for event in json.loads(payload):
+                        self.broker.publish(event)
+        finally:
+            conn.close()
+
+
+def _notifications(conn):
+    """Payloads received within LISTEN_POLL_SECONDS, for psycopg2 and psycopg 3."""
+    if hasattr(conn, "poll"):
+        if select.select([conn], [], [], LISTEN_POLL_SECONDS)[0]:
+            conn.poll()
+            while conn.notifies:
+                yield conn.notifies.pop(0).payload
+    else:
+        for notify in conn.notifies(timeout=LISTEN_POLL_SECONDS):
+            yield notify.payload
+
+
+broker = Broker()
+
+
+def notify(events):
+    """
+    Number events from the shared sequence and NOTIFY them in payloads
+    under the size limit. Runs after commit, in autocommit.
+    """
+    if not events:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [EVENT_SEQUENCE, len(events)])
+        ids = sorted(row[0] for row in cursor.fetchall())
+        batch, size = [], 2
+        for event_id, event in zip(ids, events):
+            text = json.dumps({"id": event_id, **event}, cls=DjangoJSONEncoder, separators=(",", ":"))
+            if batch and size + len(text) + 1 > MAX_NOTIFY_BYTES:
+                cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, f"[{','.join(batch)}]"])
+                batch, size = [], 2
+            batch.append(text)
+            size += len(text) + 1
+        cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, f"[{','.join(batch)}]"])
+
+
+def _worker_districts(hcw_ids):
+    return dict(
+        HealthcareWorker.objects.filter(pk__in=hcw_ids).values_list("pk", "facility__district_id")
+    )
+
+
+def publish_after_commit(events):
+    """
+    Send events once the surrounding transaction commits. `events` is a
+    callable returning the list, so without NOTIFY nothing is built when
+    nobody in this process listens.
+    """
+    def send():
+        if uses_notify():
+            # Listeners live in other processes, so always send.
+            notify(events())
+            return
+        if not broker.has_subscribers():
+            broker.skip()
+            return
+        for event in events():
+            broker.publish(event)
+
+    transaction.on_commit(send)
+
+
+def issue_ticket(user):
+    """Single-use ticket that opens one event stream for `user`."""
+    now = timezone.now()
+    StreamTicket.objects.filter(expires_at__lt=now).delete()
+    return StreamTicket.objects.create(
+        key=secrets.token_urlsafe(32), user=user, expires_at=now + timedelta(seconds=TICKET_SECONDS)
+    )
+
+
+def redeem_ticket(key):
+    """The ticket's user, None if it is unknown, expired or already used."""
+    ticket = StreamTicket.objects.select_related("user").filter(key=key, expires_at__gt=timezone.now()).first()
+    # Only the request that deletes the row gets the user.
+    if ticket is None or not StreamTicket.objects.filter(pk=ticket.pk).delete()[0]:
+        return None
+    return ticket.user
+
+
+def availability_events(records, op="created"):
+    rows = [(r.pk, r.hcw_id, r.status, r.location) for r in records]
+
+    def build():
+        districts = _worker_districts({hcw for _, hcw, _, _ in rows})
+        now = timezone.now().isoformat()
+        return [
+            {"type": "availability", "op": op, "pk": pk, "hcw": hcw, "district": districts.get(hcw),
+             "status": status, "location": location, "at": now}
+            for pk, hcw, status, location in rows
+        ]
+    return build
+
+
+def deployment_events(deployments, op):
+    now = timezone.now().isoformat()
+    events = [
+        {"type": "deployment", "op": op, "pk": d.pk, "hcw": d.hcw_id, "district": d.district_id,
+         "status": d.status, "start_date": str(d.start_date),
+         "end_date": str(d.end_date) if d.end_date else None, "at": now}
+        for d in deployments
+    ]
+    return lambda: events
+
+
+def worker_events(workers, op, districts=None):
+    """`districts` maps worker id to district id when the rows can no longer be read."""
+    rows = [(w.pk, w.is_active) for w in workers]
+
+    def build():
+        known = districts if districts is not None else _worker_districts({pk for pk, _ in rows})
+        now = timezone.now().isoformat()
+        return [
+            {"type": "worker", "op": op, "pk": pk, "district": known.get(pk), "is_active": active, "at": now}
+            for pk, active in rows
+        ]
+    return build
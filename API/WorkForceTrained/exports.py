@@ -0,0 +1,278 @@
+import os
+import re
+import tempfile
+import uuid
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from WorkForceTrained.models import Deployment, DeploymentHistory, HealthcareWorker, Training
+
+# Rows per Parquet row group / Arrow record batch, also the DB fetch size.
+ROW_GROUP = 50000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+CONTENT_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+# Finished downloads live in default storage under this prefix until they expire.
+DOWNLOAD_DIR = "exports"
+DOWNLOAD_RETENTION = timedelta(days=1)
+
+STRING, INT, BOOL = pa.string(), pa.int64(), pa.bool_()
+DATE, TIMESTAMP = pa.date32(), pa.timestamp("us", tz="UTC")
+
+# name -> (queryset, [(column, ORM lookup, type)], partition lookup)
+TABLES = {
+    "workers": (
+        HealthcareWorker.objects.all(),
+        [
+            ("id", "id", INT),
+            ("national_id", "national_id", STRING),
+            ("first_name", "first_name", STRING),
+            ("last_name", "last_name", STRING),
+            ("phone", "phone", STRING),
+            ("email", "email", STRING),
+            ("gender", "gender", STRING),
+            ("disability", "disability", BOOL),
+            ("language", "language", STRING),
+            ("position", "position", STRING),
+            ("is_active", "is_active", BOOL),
+            ("facility_id", "facility_id", INT),
+            ("facility_name", "facility__name", STRING),
+            ("facility_type", "facility__facility_type", STRING),
+            ("district_id", "facility__district_id", INT),
+            ("district_name", "facility__district__name", STRING),
+            ("organization_id", "organization_id", INT),
+            ("organization_name", "organization__name", STRING),
+            ("created_at", "created_at", TIMESTAMP),
+            ("updated_at", "updated_at", TIMESTAMP),
+        ],
+        "facility__district__name",
+    ),
+    "trainings": (
+        Training.objects.all(),
+        [
+            ("id", "id", INT),
+            ("hcw_id", "hcw_id", INT),
+            ("hcw_first_name", "hcw__first_name", STRING),
+            ("hcw_last_name", "hcw__last_name", STRING),
+            ("competency_id", "competency_id", INT),
+            ("competency_code", "competency__code", STRING),
+            ("competency_name", "competency__name", STRING),
+            ("provider", "provider", STRING),
+            ("date_completed", "date_completed", DATE),
+            ("valid_until", "valid_until", DATE),
+            ("facility_name", "hcw__facility__name", STRING),
+            ("district_id", "hcw__facility__district_id", INT),
+            ("district_name", "hcw__facility__district__name", STRING),
+            ("organization_name", "hcw__organization__name", STRING),
+            ("updated_at", "updated_at", TIMESTAMP),
+        ],
+        "hcw__facility__district__name",
+    ),
+    "deployments": (
+        Deployment.objects.all(),
+        [
+            ("id", "id", INT),
+            ("hcw_id", "hcw_id", INT),
+            ("hcw_first_name", "hcw__first_name", STRING),
+            ("hcw_last_name", "hcw__last_name", STRING),
+            ("district_id", "district_id", INT),
+            ("district_name", "district__name", STRING),
+            ("home_district_name", "hcw__facility__district__name", STRING),
+            ("facility_name", "hcw__facility__name", STRING),
+            ("organization_name", "hcw__organization__name", STRING),
+            ("outbreak_type", "outbreak_type", STRING),
+            ("start_date", "start_date", DATE),
+            ("end_date", "end_date", DATE),
+            ("role", "role", STRING),
+            ("status", "status", STRING),
+            ("updated_at", "updated_at", TIMESTAMP),
+        ],
+        "district__name",
+    ),
+    "deployment_history": (
+        DeploymentHistory.objects.all(),
+        [
+            ("id", "id", INT),
+            ("hcw_name", "hcw_name", STRING),
+            ("hcw_phone", "hcw_phone", STRING),
+            ("hcw_position", "hcw_position", STRING),
+            ("district_name", "district_name", STRING),
+            ("outbreak_type", "outbreak_type", STRING),
+            ("start_date", "start_date", DATE),
+            ("end_date", "end_date", DATE),
+            ("role", "role", STRING),
+            ("deployment_name", "deployment_name", STRING),
+            ("urgency", "urgency", STRING),
+            ("original_deployment_id", "original_deployment_id", INT),
+            ("archived_at", "archived_at", TIMESTAMP),
+            ("archived_by_id", "archived_by_id", INT),
+            ("completion_notes", "completion_notes", STRING),
+        ],
+        "district_name",
+    ),
+}
+
+
+def schema_for(table):
+    _, columns, _ = TABLES[table]
+    return pa.schema([pa.field(name, kind) for name, _, kind in columns])
+
+
+def _open_writer(sink, schema, fmt):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+
+def _write_batch(writer, schema, rows, fmt):
+    arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+    batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+    if fmt == "parquet":
+        writer.write_batch(batch, row_group_size=len(rows))
+    else:
+        writer.write_batch(batch)
+
+
+def _rows(table, partition):
+    """Stream (partition value, row) pairs, grouped by partition when asked."""
+    queryset, columns, partition_lookup = TABLES[table]
+    lookups = [lookup for _, lookup, _ in columns]
+    if partition:
+        queryset = queryset.order_by(partition_lookup, "pk")
+        lookups = [partition_lookup] + lookups
+    else:
+        queryset = queryset.order_by("pk")
+    for row in queryset.values_list(*lookups).iterator(chunk_size=ROW_GROUP):
+        yield (row[0], row[1:]) if partition else (None, row)
+
+
+def partition_name(value):
+    """Hive-style directory name, e.g. district=Blantyre."""
+    label = re.sub(r"[^\w\-]+", "_", value) if value else "__unassigned__"
+    return f"district={label}"
+
+
+def write_export(table, fmt, open_part, partition=False):
+    """
+    Write `table` as Parquet or Arrow IPC, one row group per ROW_GROUP rows.
+    `open_part(partition or None)` returns a binary file object for each
+    output file, a new one every time the district changes.
+    Returns {partition: row count}.
+    """
+    schema = schema_for(table)
+    counts = {}
+    writer = sink = None
+    current = object()
+    buffer = []
+
+    def flush():
+        if buffer:
+            _write_batch(writer, schema, buffer, fmt)
+            counts[current] = counts.get(current, 0) + len(buffer)
+            buffer.clear()
+
+    def close():
+        flush()
+        if writer is not None:
+            writer.close()
+            sink.close()
+
+    for key, row in _rows(table, partition):
+        if key != current or writer is None:
+            close()
+            current = key
+            sink = open_part(partition_name(key) if partition else None)
+            writer = _open_writer(sink, schema, fmt)
+        buffer.append(row)
+        if len(buffer) == ROW_GROUP:
+            flush()
+
+    if writer is None:
+        # Empty table, still produce a readable file with the schema.
+        current = None
+        sink = open_part(None if not partition else partition_name(None))
+        writer = _open_writer(sink, schema, fmt)
+    close()
+    return {(partition_name(k) if partition else "all"): v for k, v in counts.items()}
+
+
+def export_to_directory(table, fmt, directory, partition=False):
+    """Write to `directory/<table>.parquet`, or `directory/<table>/district=.../part-0.parquet`."""
+    directory = Path(directory)
+    suffix = FORMATS[fmt]
+
+    def open_part(part):
+        if part is None:
+            path = directory / f"{table}{suffix}"
+        else:
+            path = directory / table / part / f"part-0{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "wb")
+
+    return write_export(table, fmt, open_part, partition)
+
+
+def export_to_file(table, fmt, path):
+    """Single-file export, used for downloads."""
+    return write_export(table, fmt, lambda part: open(path, "wb"))
+
+
+def export_to_zip(table, fmt, fileobj):
+    """Partitioned export as a zip of district=<name>/part-0 files."""
+    suffix = FORMATS[fmt]
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+        return write_export(
+            table, fmt,
+            lambda part: archive.open(f"{table}/{part}/part-0{suffix}", "w", force_zip64=True),
+            partition=True,
+        )
+
+
+def prune_downloads():
+    """Delete downloads older than DOWNLOAD_RETENTION, returns how many."""
+    if not default_storage.exists(DOWNLOAD_DIR):
+        return 0
+    cutoff = timezone.now() - DOWNLOAD_RETENTION
+    pruned = 0
+    for directory in default_storage.listdir(DOWNLOAD_DIR)[0]:
+        for name in default_storage.listdir(f"{DOWNLOAD_DIR}/{directory}")[1]:
+            path = f"{DOWNLOAD_DIR}/{directory}/{name}"
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                pruned += 1
+    return pruned
+
+
+def build_download(table, fmt, partition=False):
+    """
+    Export `table` into default storage for a later download, a zip of
+    district files when partitioned. Returns what the download needs.
+    """
+    filename = f"{table}.zip" if partition else f"{table}{FORMATS[fmt]}"
+    handle, path = tempfile.mkstemp(suffix=Path(filename).suffix)
+    os.close(handle)
+    try:
+        if partition:
+            with open(path, "wb") as f:
+                counts = export_to_zip(table, fmt, f)
+        else:
+            counts = export_to_file(table, fmt, path)
+        with open(path, "rb") as f:
+            stored = default_storage.save(f"{DOWNLOAD_DIR}/{uuid.uuid4().hex}/{filename}", File(f))
+        size = os.path.getsize(path)
+    finally:
+        os.unlink(path)
+    return {
+        "file": stored,
+        "filename": filename,
+        "content_type": "application/zip" if partition else CONTENT_TYPES[fmt],
+        "rows": sum(counts.values()),
+        "size": size,
+    }
@@ -0,0 +1,229 @@
+from datetime import date
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from WorkForceTrained.models import (
+    Competency, Deployment, ForecastSnapshot, HealthcareWorker, Training
+)
+from WorkForceTrained.scheduling import BLOCKING
+
+HORIZON_MONTHS = 12
+FETCH_SIZE = 20000
+NEVER = date.max.toordinal()
+# Workers without a facility are forecast under district 0, stored as NULL.
+UNASSIGNED = 0
+
+
+def month_starts(first=None, months=HORIZON_MONTHS):
+    """First day of this month and the following ones, as dates."""
+    first = (first or date.today()).replace(day=1)
+    starts = []
+    for offset in range(months + 1):
+        year, month = divmod(first.month - 1 + offset, 12)
+        starts.append(date(first.year + year, month + 1, 1))
+    return starts
+
+
+def _district_filter(field, district_ids):
+    if district_ids is None:
+        return Q()
+    ids = [d for d in district_ids if d != UNASSIGNED]
+    condition = Q(**{f"{field}__in": ids})
+    if UNASSIGNED in district_ids:
+        condition |= Q(**{f"{field}__isnull": True})
+    return condition
+
+
+def _certification_chunks(district_ids, bounds):
+    """
+    (worker, competency, district, covered) arrays per fetched chunk, where
+    covered[i, b] says certification i is valid on bounds[b].
+    """
+    certifications = (
+        Training.objects
+        .filter(hcw__is_active=True)
+        .filter(_district_filter("hcw__facility__district", district_ids))
+        .values_list("hcw_id", "competency_id", "hcw__facility__district_id", "date_completed", "valid_until")
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+    while True:
+        rows = list(islice(certifications, FETCH_SIZE))
+        if not rows:
+            return
+        n = len(rows)
+        completed = np.fromiter((r[3].toordinal() for r in rows), dtype=np.int64, count=n)
+        expires = np.fromiter((r[4].toordinal() if r[4] else NEVER for r in rows), dtype=np.int64, count=n)
+        yield (
+            np.fromiter((r[0] for r in rows), dtype=np.int64, count=n),
+            np.fromiter((r[1] for r in rows), dtype=np.int64, count=n),
+            np.fromiter((r[2] or UNASSIGNED for r in rows), dtype=np.int64, count=n),
+            (completed[:, None] <= bounds) & (expires[:, None] >= bounds),
+        )
+
+
+def compute_forecast(district_ids=None, first_month=None):
+    """
+    Qualified, lapsing and deployed worker counts per (district, competency,
+    month) for the forecast horizon.
+
+    Every certification is tested against every month start at once as a
+    certifications x months boolean matrix, then OR-ed per (worker,
+    competency), so a gap between one certificate expiring and the next being
+    earned counts as unqualified. A worker is qualified in a month if valid
+    on its first day, and lapsing if not valid on the first day of the next.
+    Counts are summed per group with bincount.
+    """
+    bounds = np.array([d.toordinal() for d in month_starts(first_month)], dtype=np.int64)
+    starts, ends = bounds[:-1], bounds[1:] - 1
+
+    chunks = list(_certification_chunks(district_ids, bounds))
+    if chunks:
+        cert_worker, cert_competency, cert_district, covered = (np.concatenate(c) for c in zip(*chunks))
+    else:
+        cert_worker = cert_competency = cert_district = np.zeros(0, dtype=np.int64)
+        covered = np.zeros((0, len(bounds)), dtype=bool)
+    del chunks
+
+    pairs, first, pair_index = np.unique(
+        np.stack([cert_worker, cert_competency], axis=1), axis=0, return_index=True, return_inverse=True
+    )
+    n = len(pairs)
+    worker, competency, district = pairs[:, 0], pairs[:, 1], cert_district[first]
+    valid = np.zeros((n, len(bounds)), dtype=bool)
+    np.logical_or.at(valid, pair_index.reshape(-1), covered)
+
+    qualified = valid[:, :-1]
+    lapsing = qualified & ~valid[:, 1:]
+
+    # Months in which each worker is committed to a deployment.
+    deployments = list(
+        Deployment.objects.filter(BLOCKING, hcw__is_active=True)
+        .filter(_district_filter("hcw__facility__district", district_ids))
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=date.fromordinal(int(starts[0]))))
+        .filter(start_date__lte=date.fromordinal(int(ends[-1])))
+        .values_list("hcw_id", "start_date", "end_date")
+    )
+    busy_workers = np.fromiter((d[0] for d in deployments), dtype=np.int64, count=len(deployments))
+    busy_start = np.fromiter((d[1].toordinal() for d in deployments), dtype=np.int64, count=len(deployments))
+    busy_end = np.fromiter(
+        (d[2].toordinal() if d[2] else NEVER for d in deployments), dtype=np.int64, count=len(deployments)
+    )
+    busy_months = (busy_start[:, None] <= ends) & (busy_end[:, None] >= starts)
+    busy_ids, busy_index = np.unique(busy_workers, return_inverse=True)
+    busy = np.zeros((len(busy_ids), len(starts)), dtype=bool)
+    np.logical_or.at(busy, busy_index.reshape(-1), busy_months)
+
+    position = np.searchsorted(busy_ids, worker)
+    position = np.minimum(position, max(len(busy_ids) - 1, 0))
+    has_busy = (busy_ids[position] == worker) if len(busy_ids) else np.zeros(n, dtype=bool)
+    deployed = np.zeros_like(qualified)
+    deployed[has_busy] = qualified[has_busy] & busy[position[has_busy]]
+
+    groups, group_index = np.unique(np.stack([district, competency], axis=1), axis=0, return_inverse=True)
+    group_index = group_index.reshape(-1)
+    totals = {}
+    for name, matrix in (("qualified", qualified), ("lapsing", lapsing), ("deployed", deployed)):
+        totals[name] = np.stack(
+            [np.bincount(group_index, weights=matrix[:, m], minlength=len(groups)) for m in range(len(starts))],
+            axis=1,
+        ).astype(np.int64) if n else np.zeros((0, len(starts)), dtype=np.int64)
+
+    months = [date.fromordinal(int(s)) for s in starts]
+    return months, groups, totals
+
+
+def refresh_forecast(district_ids=None):
+    """
+    Recompute and store the forecast. With district_ids only those districts'
+    rows are replaced, everything else is left as is. A new month always
+    triggers a full refresh since the horizon moved.
+    """
+    current_first = month_starts()[0]
+    stored_first = ForecastSnapshot.objects.order_by("month").values_list("month", flat=True).first()
+    if stored_first != current_first:
+        district_ids = None
+
+    months, groups, totals = compute_forecast(district_ids)
+    now = timezone.now()
+    valid_competencies = set(Competency.objects.values_list("id", flat=True))
+    snapshots = [
+        ForecastSnapshot(
+            district_id=int(district) or None,
+            competency_id=int(competency_id),
+            month=month,
+            qualified=int(totals["qualified"][g, m]),
+            lapsing=int(totals["lapsing"][g, m]),
+            deployed=int(totals["deployed"][g, m]),
+            computed_at=now,
+        )
+        for g, (district, competency_id) in enumerate(groups)
+        if int(competency_id) in valid_competencies
+        for m, month in enumerate(months)
+    ]
+
+    with transaction.atomic():
+        stale = ForecastSnapshot.objects.all()
+        if district_ids is not None:
+            stale = stale.filter(_district_filter("district", district_ids))
+        stale.delete()
+        ForecastSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+    return {"rows": len(snapshots), "districts": "all" if district_ids is None else sorted(district_ids)}
+
+
+def worker_districts(hcw_ids):
+    """District per worker for marking forecasts dirty, UNASSIGNED if none."""
+    rows = HealthcareWorker.objects.filter(pk__in=hcw_ids).values_list("facility__district_id", flat=True)
+    return {d or UNASSIGNED for d in rows}
+
+
+def mark_dirty(district_ids):
+    """Refresh these districts once the current transaction commits."""
+    district_ids = {d if d else UNASSIGNED for d in district_ids}
+    if district_ids:
+        transaction.on_commit(lambda: _queue_refresh(district_ids))
+
+
+def _queue_refresh(district_ids):
+    from WorkForceTrained.jobs import enqueue_merged
+
+    enqueue_merged("refresh_forecast", "districts", district_ids)
+
+
+def forecast_series(district_ids=None, competency_ids=None):
+    """Stored forecast as one monthly series per (district, competency)."""
+    rows = ForecastSnapshot.objects.select_related("district", "competency").order_by(
+        "district__name", "competency__name", "month"
+    )
+    if district_ids:
+        rows = rows.filter(district_id__in=district_ids)
+    if competency_ids:
+        rows = rows.filter(competency_id__in=competency_ids)
+
+    series = {}
+    months = []
+    for row in rows:
+        if row.month not in months:
+            months.append(row.month)
+        entry = series.setdefault((row.district_id, row.competency_id), {
+            "district": row.district_id,
+            "district_name": row.district.name if row.district else "Unassigned",
+            "competency": row.competency_id,
+            "competency_name": row.competency.name,
+            "qualified": [], "lapsing": [], "deployed": [], "available": [],
+        })
+        entry["qualified"].append(row.qualified)
+        entry["lapsing"].append(row.lapsing)
+        entry["deployed"].append(row.deployed)
+        entry["available"].append(row.available)
+
+    computed_at = ForecastSnapshot.objects.aggregate(last=Max("computed_at"))["last"]
+    return {
+        "months": sorted(months),
+        "series": list(series.values()),
+        "computed_at": computed_at,
+        "stale": not months or min(months) != month_starts()[0],
+    }
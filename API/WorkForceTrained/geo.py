@@ -0,0 +1,320 @@
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+
+from WorkForceTrained.analytics import build_worker_filters
+from WorkForceTrained.models import (
+    AvailabilityRecord, Deployment, District, HealthcareWorker, Training
+)
+
+GEOJSON_PATH = Path(__file__).resolve().parent / "data" / "malawi.geo.json"
+
+# Douglas-Peucker tolerance (degrees) and coordinate precision per zoom level.
+ZOOM_LEVELS = {
+    "low": {"tolerance": 0.02, "precision": 3},
+    "medium": {"tolerance": 0.005, "precision": 4},
+    "high": {"tolerance": 0.0, "precision": 5},
+}
+DEFAULT_ZOOM = "low"
+
+# Approximate district centroids (lon, lat), used where the GeoJSON has no shape.
+DISTRICT_CENTROIDS = {
+    "CT": (33.27, -9.70), "KR": (33.93, -9.93), "RP": (33.86, -11.02),
+    "MZ": (33.60, -11.90), "NB": (34.30, -11.61), "LK": (34.73, -12.06),
+    "KS": (33.48, -13.03), "NK": (34.30, -12.93), "NT": (33.92, -13.38),
+    "DW": (33.94, -13.65), "SA": (34.46, -13.78), "LL": (33.78, -13.98),
+    "MC": (32.88, -13.80), "DZ": (34.33, -14.38), "NE": (34.64, -14.82),
+    "MG": (35.26, -14.48), "MH": (35.52, -14.97), "ZB": (35.32, -15.39),
+    "CZ": (35.18, -15.70), "BL": (35.01, -15.79), "MW": (34.52, -15.60),
+    "TH": (35.14, -16.07), "MU": (35.50, -16.03), "PH": (35.65, -15.81),
+    "CK": (34.80, -16.03), "NS": (35.26, -16.92), "BA": (34.96, -14.99),
+    "NN": (34.65, -15.40),
+}
+
+EARTH_RADIUS_KM = 6371.0
+# Roads wind, and travel between districts averages well under highway speed.
+ROAD_FACTOR = 1.3
+AVERAGE_SPEED_KMH = 50.0
+
+DISTANCE_BANDS = [
+    (0, "Same District"),
+    (50, "Under 50 km"),
+    (150, "50-150 km"),
+    (300, "150-300 km"),
+]
+FAR_BAND = "Over 300 km"
+
+
+def _perpendicular_distance(point, start, end):
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (dx * dx + dy * dy) ** 0.5
+
+
+def _simplify_line(points, tolerance):
+    """Iterative Douglas-Peucker, keeps the first and last point."""
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            dist = _perpendicular_distance(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _simplify_ring(ring, tolerance, precision):
+    simplified = _simplify_line(ring, tolerance)
+    # A closed ring needs at least 4 positions, fall back to the original.
+    if len(simplified) < 4:
+        simplified = ring
+    return [[round(x, precision), round(y, precision)] for x, y in simplified]
+
+
+def _simplify_geometry(geometry, tolerance, precision):
+    if geometry["type"] == "Polygon":
+        coordinates = [_simplify_ring(r, tolerance, precision) for r in geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        coordinates = [
+            [_simplify_ring(r, tolerance, precision) for r in polygon]
+            for polygon in geometry["coordinates"]
+        ]
+    else:
+        coordinates = geometry["coordinates"]
+    return {"type": geometry["type"], "coordinates": coordinates}
+
+
+@lru_cache(maxsize=1)
+def load_district_shapes():
+    """Raw district features from the GeoJSON file, keyed by district name."""
+    path = getattr(settings, "MALAWI_GEOJSON_PATH", GEOJSON_PATH)
+    with open(path, encoding="utf-8") as fh:
+        collection = json.load(fh)
+    return {f["properties"]["name"]: f["geometry"] for f in collection["features"]}
+
+
+@lru_cache(maxsize=len(ZOOM_LEVELS))
+def simplified_geometry(zoom):
+    """
+    Geometry for one zoom level, simplified once per process.
+    Returns (geometries keyed by district name, content hash).
+    """
+    level = ZOOM_LEVELS[zoom]
+    shapes = {
+        name: _simplify_geometry(geometry, level["tolerance"], level["precision"])
+        for name, geometry in load_district_shapes().items()
+    }
+    digest = hashlib.md5(json.dumps(shapes, sort_keys=True).encode()).hexdigest()
+    return shapes, digest
+
+
+def district_metrics(filters=None):
+    """
+    Per-district worker metrics honouring the dashboard filters, keyed by district code.
+    """
+    filters = filters or {}
+    worker_filters = build_worker_filters(filters)
+
+    latest_status = (
+        AvailabilityRecord.objects
+        .filter(hcw=OuterRef("pk"))
+        .order_by("-timestamp")
+        .values("status")[:1]
+    )
+    active_deployment = Deployment.objects.filter(hcw=OuterRef("pk"), status="active")
+
+    rows = (
+        HealthcareWorker.objects
+        .filter(worker_filters, facility__isnull=False)
+        .annotate(
+            latest_status=Subquery(latest_status),
+            is_deployed=Exists(active_deployment),
+        )
+        .values("facility__district__code")
+        .annotate(
+            workers=Count("id"),
+            active=Count("id", filter=Q(is_active=True)),
+            available=Count("id", filter=Q(latest_status="available")),
+            deployed=Count("id", filter=Q(is_deployed=True)),
+        )
+        .order_by()
+    )
+
+    metrics = {}
+    for row in rows:
+        code = row.pop("facility__district__code")
+        metrics[code] = {**row, "trained": {}}
+
+    trained = (
+        Training.objects
+        .filter(build_worker_filters(filters, prefix="hcw__"), hcw__facility__isnull=False)
+        .values("hcw__facility__district__code", "competency__code")
+        .annotate(workers=Count("hcw", distinct=True))
+        .order_by()
+    )
+    for row in trained:
+        code = row["hcw__facility__district__code"]
+        district = metrics.setdefault(
+            code, {"workers": 0, "active": 0, "available": 0, "deployed": 0, "trained": {}}
+        )
+        district["trained"][row["competency__code"]] = row["workers"]
+
+    return metrics
+
+
+def district_map(filters=None, zoom=DEFAULT_ZOOM, include_geometry=True):
+    """
+    District features with metrics already joined on, ready for the map.
+    Returns (payload, etag).
+    """
+    empty = {"workers": 0, "active": 0, "available": 0, "deployed": 0, "trained": {}}
+    filters = filters or {}
+    cache_key = "district-map-metrics:" + hashlib.md5(
+        json.dumps(filters, sort_keys=True).encode()
+    ).hexdigest()
+    metrics = cache.get_or_set(
+        cache_key,
+        lambda: district_metrics(filters),
+        getattr(settings, "MAP_METRICS_CACHE_SECONDS", 60),
+    )
+    districts = list(District.objects.values("code", "name"))
+
+    if include_geometry:
+        shapes, geometry_hash = simplified_geometry(zoom)
+    else:
+        shapes, geometry_hash = {}, "none"
+
+    features = []
+    for district in districts:
+        if include_geometry and district["name"] not in shapes:
+            continue
+        properties = {**district, **metrics.get(district["code"], empty)}
+        features.append({
+            "type": "Feature",
+            "properties": properties,
+            "geometry": shapes.get(district["name"]),
+        })
+
+    metrics_hash = hashlib.md5(
+        json.dumps([f["properties"] for f in features], sort_keys=True).encode()
+    ).hexdigest()
+    etag = f'"{zoom}-{geometry_hash[:12]}-{metrics_hash[:12]}"'
+
+    payload = {"type": "FeatureCollection", "zoom": zoom, "features": features}
+    return payload, etag
+
+
+def _ring_centroid(ring):
+    """Area-weighted centroid of a closed ring (shoelace formula)."""
+    area = cx = cy = 0.0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        cross = x1 * y2 - x2 * y1
+        area += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    if area == 0:
+        xs, ys = zip(*ring)
+        return sum(xs) / len(xs), sum(ys) / len(ys), 0.0
+    return cx / (3 * area), cy / (3 * area), abs(area) / 2
+
+
+def geometry_centroid(geometry):
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    parts = [_ring_centroid(polygon[0]) for polygon in polygons]
+    total = sum(a for _, _, a in parts)
+    if total == 0:
+        return parts[0][0], parts[0][1]
+    return (
+        sum(x * a for x, _, a in parts) / total,
+        sum(y * a for _, y, a in parts) / total,
+    )
+
+
+def distance_band(km):
+    if km is None:
+        return "Unknown"
+    for limit, label in DISTANCE_BANDS:
+        if km <= limit:
+            return label
+    return FAR_BAND
+
+
+class DistanceMatrix:
+    """
+    District-to-district great-circle distance and estimated travel time,
+    indexed by District primary key.
+    """
+
+    def __init__(self, districts):
+        shapes = load_district_shapes()
+        self.ids = np.array([d["id"] for d in districts], dtype=np.int64)
+        self.codes = [d["code"] for d in districts]
+
+        centroids = []
+        for d in districts:
+            if d["name"] in shapes:
+                centroids.append(geometry_centroid(shapes[d["name"]]))
+            else:
+                centroids.append(DISTRICT_CENTROIDS.get(d["code"], (np.nan, np.nan)))
+        lon, lat = np.radians(np.array(centroids, dtype=float).reshape(-1, 2)).T
+
+        # Haversine for every pair at once.
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+        self.km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        np.fill_diagonal(self.km, 0.0)
+        self.hours = self.km * ROAD_FACTOR / AVERAGE_SPEED_KMH
+
+        # District id -> row, -1 for unknown ids (e.g. workers without a facility).
+        self._lookup = np.full(int(self.ids.max()) + 1 if len(self.ids) else 1, -1, dtype=np.int64)
+        self._lookup[self.ids] = np.arange(len(self.ids))
+
+    def index(self, district_ids):
+        district_ids = np.asarray(district_ids, dtype=np.int64)
+        inside = (district_ids >= 0) & (district_ids < len(self._lookup))
+        result = np.full(district_ids.shape, -1, dtype=np.int64)
+        result[inside] = self._lookup[district_ids[inside]]
+        return result
+
+    def kilometres_from(self, district_id, district_ids):
+        """Distances from one district to many, NaN where either side is unknown."""
+        origin = self.index([district_id])[0]
+        targets = self.index(district_ids)
+        result = np.full(targets.shape, np.nan)
+        if origin >= 0:
+            known = targets >= 0
+            result[known] = self.km[origin, targets[known]]
+        return result
+
+    def between(self, from_id, to_id):
+        """(km, hours) between two districts or (None, None)."""
+        i, j = self.index([from_id, to_id])
+        if i < 0 or j < 0 or np.isnan(self.km[i, j]):
+            return None, None
+        return round(float(self.km[i, j]), 1), round(float(self.hours[i, j]), 1)
+
+
+@lru_cache(maxsize=1)
+def get_distance_matrix():
+    """Built once per process, cleared when districts change."""
+    return DistanceMatrix(list(District.objects.order_by("id").values("id", "code", "name")))
@@ -0,0 +1,150 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from WorkForceTrained import querystats
+from WorkForceTrained.models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# Running jobs whose worker stopped reporting are handed out again after this.
+STALE_AFTER = timedelta(minutes=30)
+
+
+def job_handler(kind):
+    """Register `func(payload, progress)` as the handler for a job kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=3):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def enqueue_merged(kind, field, ids):
+    """
+    Queue `kind` for `payload[field] = ids`, or fold the ids into a job of
+    that kind which has not started yet. A queued job whose field is None
+    already covers everything.
+    """
+    ids = set(ids)
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update()
+            .filter(kind=kind, status="queued")
+            .order_by("id").first()
+        )
+        if job is None:
+            return enqueue(kind, {field: sorted(ids)})
+        if job.payload.get(field) is not None:
+            job.payload[field] = sorted(set(job.payload[field]) | ids)
+            job.save(update_fields=["payload"])
+        return job
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def claim_next(worker_name):
+    """
+    Take the oldest runnable job for this worker, or None.
+    Postgres uses SELECT ... FOR UPDATE SKIP LOCKED so workers never wait on
+    each other. SQLite has no row locks, so a conditional UPDATE acts as the
+    compare-and-swap and only one worker wins each job.
+    """
+    now = timezone.now()
+    runnable = Job.objects.filter(status="queued", run_after__lte=now).order_by("run_after", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = runnable.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = "running"
+            job.attempts += 1
+            job.locked_by = worker_name
+            job.locked_at = now
+            job.save(update_fields=["status", "attempts", "locked_by", "locked_at"])
+            return job
+
+    for job_id in runnable.values_list("id", flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status="queued").update(
+            status="running", attempts=F("attempts") + 1, locked_by=worker_name, locked_at=now
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale():
+    """Put jobs back in the queue if their worker died mid-run."""
+    return Job.objects.filter(
+        status="running", locked_at__lt=timezone.now() - STALE_AFTER
+    ).update(status="queued", locked_by="", locked_at=None)
+
+
+class Progress:
+    """Passed to handlers, writes progress at most once a second."""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def __call__(self, done, total=None, message=""):
+        percent = done if total is None else int(done * 100 / total) if total else 100
+        percent = max(0, min(100, percent))
+        now = time.monotonic()
+        if now - self._last_write < 1 and percent < 100:
+            return
+        self._last_write = now
+        # Also refreshes locked_at so long jobs are not treated as stale.
+        Job.objects.filter(id=self.job.id).update(
+            progress=percent, progress_message=message[:255], locked_at=timezone.now()
+        )
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for {job.kind}")
+        with querystats.recording() as recorder:
+            result = handler(job.payload, Progress(job))
+            recorder.view = f"job {job.kind}"
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s failed on attempt %s:\n%s", job.pk, job.attempts, error)
+        if handler is not None and job.attempts < job.max_attempts:
+            Job.objects.filter(id=job.id).update(
+                status="queued", error=error, locked_by="", locked_at=None,
+                run_after=timezone.now() + retry_delay(job.attempts),
+            )
+        else:
+            Job.objects.filter(id=job.id).update(
+                status="failed", error=error, finished_at=timezone.now()
+            )
+        return False
+
+    Job.objects.filter(id=job.id).update(
+        status="succeeded", result=result, progress=100, finished_at=timezone.now()
+    )
+    return True
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.models import HealthcareWorker
+from WorkForceTrained.phones import backfill_phone_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the normalized E.164 phone index, e.g. after changing PHONE_DEFAULT_COUNTRY_CODE"
+
+    def handle(self, *args, **options):
+        updated = backfill_phone_index(
+            HealthcareWorker, progress=lambda seen: self.stdout.write(f"   …checked {seen} workers")
+        )
+        self.stdout.write(self.style.SUCCESS(f"📞 Normalized {updated} phone numbers."))
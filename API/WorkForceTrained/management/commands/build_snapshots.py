@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.snapshots import build_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild offline roster snapshots for districts whose data changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("keys", nargs="*", help="District codes and/or 'national' (default: all)")
+        parser.add_argument("--force", action="store_true", help="Rebuild even if nothing changed")
+
+    def handle(self, *args, **options):
+        result = build_snapshots(options["keys"] or None, force=options["force"])
+        for key, version in result["built"].items():
+            self.stdout.write(f"📦 Built {key} snapshot v{version}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(result['built'])} snapshots built, {result['unchanged']} unchanged."
+        ))
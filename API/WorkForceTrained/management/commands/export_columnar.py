@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from WorkForceTrained.exports import FORMATS, TABLES, export_to_directory
+
+
+class Command(BaseCommand):
+    help = "Export workforce tables as Parquet or Arrow IPC files for analysis"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tables", nargs="*", help=f"Tables to export (default: all of {', '.join(TABLES)})")
+        parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+        parser.add_argument("--output", default="exports", help="Directory to write into (default: ./exports)")
+        parser.add_argument("--partition-by-district", action="store_true",
+                            help="Write one file per district in Hive-style folders")
+
+    def handle(self, *args, **options):
+        tables = options["tables"] or list(TABLES)
+        unknown = [t for t in tables if t not in TABLES]
+        if unknown:
+            raise CommandError(f"Unknown tables: {', '.join(unknown)}")
+
+        for table in tables:
+            counts = export_to_directory(
+                table, options["format"], options["output"], partition=options["partition_by_district"]
+            )
+            self.stdout.write(
+                f"📦 {table}: {sum(counts.values())} rows in {len(counts)} file(s)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ Export written to {options['output']}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.dedupe import find_duplicates
+
+
+class Command(BaseCommand):
+    help = "Rebuild blocking keys and the duplicate worker review queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--worker", type=int, action="append", dest="workers",
+            help="Only re-check this worker id (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        result = find_duplicates(options["workers"])
+        self.stdout.write(self.style.SUCCESS(
+            f"🔍 Scored {result['pairs_scored']} pairs across {result['workers']} workers: "
+            f"{result['new']} new, {result['updated']} updated, {result['dropped']} dropped candidates."
+        ))
+        if result["blocks_skipped"]:
+            self.stdout.write(f"⚠️ Skipped {result['blocks_skipped']} oversized blocks.")
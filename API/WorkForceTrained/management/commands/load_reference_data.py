@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from WorkForceTrained.reference_data import ReferenceDataError, load_reference_data
+
+
+class Command(BaseCommand):
+    help = "Apply the districts, organizations, competencies and facility registry fixture"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixture", help="Path to a reference data JSON fixture (defaults to the bundled one)")
+        parser.add_argument("--force", action="store_true", help="Apply even if the fixture is unchanged")
+
+    def handle(self, *args, **options):
+        try:
+            result = load_reference_data(options["fixture"], force=options["force"])
+        except ReferenceDataError as e:
+            raise CommandError(f"❌ {e}")
+
+        if result["skipped"]:
+            self.stdout.write(f"↩️  Reference data {result['version']} already applied, skipping.")
+            return
+        for table, counts in result["counts"].items():
+            self.stdout.write(
+                f"✅ {table}: {counts['created']} created, {counts['updated']} updated, "
+                f"{counts['unchanged']} unchanged"
+            )
+        self.stdout.write(self.style.SUCCESS(f"🌿 Reference data {result['version']} applied."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.sync import prune_tombstones, tombstone_retention
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window"
+
+    def handle(self, *args, **options):
+        removed = prune_tombstones()
+        days = tombstone_retention().days
+        self.stdout.write(self.style.SUCCESS(f"🧹 Removed {removed} tombstones older than {days} days."))
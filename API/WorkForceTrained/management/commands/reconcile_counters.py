@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check workforce counters against exact counts and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it")
+
+    def handle(self, *args, **options):
+        drift = reconcile(repair=not options["dry_run"])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("✅ Counters are in sync."))
+            return
+
+        for (metric, dimension, key), (stored, expected) in sorted(drift.items()):
+            self.stdout.write(f"⚠️  {metric}[{dimension}={key}]: stored {stored}, expected {expected}")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Found {len(drift)} drifted counters (not repaired)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"🔧 Repaired {len(drift)} counters."))
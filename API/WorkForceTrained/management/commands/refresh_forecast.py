@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.forecast import refresh_forecast
+
+
+class Command(BaseCommand):
+    help = "Recompute the 12-month certification and deployment forecast"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--district", type=int, action="append", dest="districts",
+            help="Only refresh this district id (repeatable, 0 for unassigned workers)",
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_forecast(options["districts"])
+        self.stdout.write(self.style.SUCCESS(
+            f"📈 Stored {result['rows']} forecast rows for {result['districts']} districts."
+        ))
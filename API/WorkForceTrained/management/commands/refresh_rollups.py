@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from WorkForceTrained.rollups import refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh the worker and training rollup cubes used by the dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running and refresh every N seconds (default: refresh once)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for name, seconds in refresh().items():
+                self.stdout.write(f"🔄 Refreshed {name} in {seconds:.2f}s")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS("Rollups refreshed."))
@@ -0,0 +1,74 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from WorkForceTrained import querystats
+from WorkForceTrained.jobs import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (archiving, exports, rollups...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Number of worker threads")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        self.poll_interval = options["poll_interval"]
+        self.once = options["once"]
+        self.stopping = threading.Event()
+        # Deploys stop the worker with SIGTERM, let current jobs finish.
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"↩️  Requeued {requeued} stale jobs")
+
+        self.stdout.write(f"🛠️  Starting {concurrency} job worker(s)...")
+        threads = [
+            threading.Thread(target=self.work, args=(f"{socket.gethostname()}-{os.getpid()}-{i}",), daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop()
+        for thread in threads:
+            thread.join()
+
+        querystats.flush()
+        self.stdout.write(self.style.SUCCESS("Job workers stopped."))
+
+    def stop(self):
+        if not self.stopping.is_set():
+            self.stopping.set()
+            self.stdout.write("Stopping after current jobs...")
+
+    def work(self, worker_name):
+        while not self.stopping.is_set():
+            close_old_connections()
+            job = claim_next(worker_name)
+            if job is None:
+                if self.once:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            self.stdout.write(f"▶️  [{worker_name}] {job}")
+            ok = run_job(job)
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"✅ [{worker_name}] {job.kind} #{job.pk} done"))
+            else:
+                self.stdout.write(self.style.ERROR(f"❌ [{worker_name}] {job.kind} #{job.pk} failed"))
+        close_old_connections()
@@ -2,6 +2,7 @@ import random
 from datetime import date, timedelta
 from django.core.management.base import BaseCommand
 from faker import Faker
+from WorkForceTrained import rollups
 from WorkForceTrained.models import (
     HealthcareWorker, District, Organization, Facility, Competency,
     Training, AvailabilityRecord
@@ -73,4 +74,6 @@ class Command(BaseCommand):
 
             self.stdout.write(f"✅ Created worker: {worker.first_name} {worker.last_name} ({facility.district.name})")
 
+        # Bring the dashboard cubes up to date now rather than waiting for the job worker.
+        rollups.refresh()
         self.stdout.write(self.style.SUCCESS("🎉 Successfully seeded 20 healthcare workers!"))
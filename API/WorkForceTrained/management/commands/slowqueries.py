@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from WorkForceTrained import querystats
+from WorkForceTrained.models import QueryStat
+
+
+class Command(BaseCommand):
+    help = "Rank query fingerprints by total DB time, per endpoint or job"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Number of fingerprints to show")
+        parser.add_argument("--view", help="Only fingerprints from views containing this text")
+        parser.add_argument(
+            "--by-fingerprint", action="store_true",
+            help="Add up each fingerprint across all views",
+        )
+        parser.add_argument("--explain", action="store_true", help="Print the sampled EXPLAIN plans")
+        parser.add_argument("--reset", action="store_true", help="Delete all collected statistics")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = QueryStat.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"🧹 Deleted {deleted} query stats."))
+            return
+
+        # Include this process's own unflushed totals, e.g. from a shell session.
+        querystats.flush()
+        stats = QueryStat.objects.all()
+        if options["view"]:
+            stats = stats.filter(view__icontains=options["view"])
+        if options["by_fingerprint"]:
+            rows = stats.values("fingerprint_hash", "fingerprint").annotate(
+                calls=Sum("calls"), slow_calls=Sum("slow_calls"), total_ms=Sum("total_ms"),
+            ).order_by("-total_ms")[:options["limit"]]
+        else:
+            rows = stats.values(
+                "fingerprint_hash", "fingerprint", "view", "calls", "slow_calls",
+                "total_ms", "max_ms", "explain", "explain_ms", "explained_at",
+            ).order_by("-total_ms")[:options["limit"]]
+
+        rows = list(rows)
+        if not rows:
+            self.stdout.write("No query statistics collected yet.")
+            return
+
+        grand_total = stats.aggregate(total=Sum("total_ms"))["total"] or 0
+        self.stdout.write(f"🐢 Top {len(rows)} fingerprints by total time ({grand_total / 1000:.1f} s recorded):")
+        for rank, row in enumerate(rows, 1):
+            share = row["total_ms"] * 100 / grand_total if grand_total else 0
+            mean = row["total_ms"] / row["calls"] if row["calls"] else 0
+            where = f" [{row['view']}]" if "view" in row else ""
+            line = (
+                f"{rank:>3}. {row['total_ms'] / 1000:9.2f} s {share:5.1f}%  "
+                f"{row['calls']} calls, {mean:.1f} ms mean"
+            )
+            if "max_ms" in row:
+                line += f", {row['max_ms']:.1f} ms max"
+            if row["slow_calls"]:
+                line += f", {row['slow_calls']} slow"
+            self.stdout.write(line + where)
+            self.stdout.write(f"     {row['fingerprint'][:300]}")
+            if options["explain"] and row.get("explain"):
+                self.stdout.write(
+                    f"     📋 Plan of a {row['explain_ms']:.0f} ms call, sampled {row['explained_at']:%Y-%m-%d %H:%M}:"
+                )
+                for plan_line in row["explain"].splitlines():
+                    self.stdout.write(f"       {plan_line}")
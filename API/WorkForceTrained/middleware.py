@@ -0,0 +1,40 @@
+from WorkForceTrained import audit, querystats
+from WorkForceTrained.throttling import endpoint_key, record_endpoint_cost
+
+
+class DatabaseTimeMiddleware:
+    """
+    Measures the DB time each request spends and keeps a moving average per
+    endpoint, which CostBudgetThrottle uses as that endpoint's cost. The
+    same execute wrapper feeds the slow query statistics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with querystats.recording() as recorder:
+            response = self.get_response(request)
+            if getattr(request, "resolver_match", None) is not None:
+                # Counted per fingerprint and endpoint, see querystats.
+                recorder.view = endpoint_key(request)
+
+        db_ms = recorder.elapsed_ms
+        if recorder.view and response.status_code != 429:
+            record_endpoint_cost(recorder.view, db_ms)
+        response["Server-Timing"] = f"db;dur={db_ms:.1f}"
+        return response
+
+
+class AuditMiddleware:
+    """
+    Buffers the audit entries of a request and writes them in one insert
+    once the response is ready, after the changes they describe committed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit.buffered(request):
+            return self.get_response(request)
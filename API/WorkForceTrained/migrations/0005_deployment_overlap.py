@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+from django.db import migrations, models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Concat
+
+BATCH = 500
+
+EXCLUSION_SQL = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE "WorkForceTrained_deployment"
+    ADD CONSTRAINT deployment_no_overlap
+    EXCLUDE USING gist (hcw_id WITH =, daterange(start_date, end_date, '[]') WITH &&)
+    WHERE (status <> 'archived');
+"""
+
+DROP_EXCLUSION_SQL = """
+ALTER TABLE "WorkForceTrained_deployment" DROP CONSTRAINT IF EXISTS deployment_no_overlap;
+"""
+
+
+def archive_overlapping_deployments(apps, schema_editor):
+    """
+    The constraint cannot be added while a worker is double-booked. Sweep
+    each worker's blocking deployments by start date, keep the earliest of
+    overlapping ones and archive the rest with a note, so nothing is lost
+    and the clashes can be reviewed afterwards.
+    """
+    Deployment = apps.get_model("WorkForceTrained", "Deployment")
+    rows = (
+        Deployment.objects.exclude(status="archived")
+        .order_by("hcw_id", "start_date", "id")
+        .values_list("id", "hcw_id", "start_date", "end_date")
+    )
+    archived = []
+    current_hcw, reach_end, reach_id = None, None, None
+    for deployment_id, hcw_id, start_date, end_date in rows.iterator():
+        if hcw_id != current_hcw:
+            current_hcw, reach_end, reach_id = hcw_id, end_date, deployment_id
+            continue
+        if reach_end is None or start_date <= reach_end:
+            archived.append((deployment_id, reach_id))
+            continue
+        reach_end, reach_id = end_date, deployment_id
+
+    # One UPDATE per batch, the note names the deployment each row clashed with.
+    for start in range(0, len(archived), BATCH):
+        batch = archived[start:start + BATCH]
+        note = Case(*(
+            When(id=deployment_id, then=Value(
+                f"Archived by migration 0005: overlapped deployment #{kept_id} of the same worker."
+            ))
+            for deployment_id, kept_id in batch
+        ), output_field=models.TextField())
+        Deployment.objects.filter(id__in=[deployment_id for deployment_id, _ in batch]).update(
+            status="archived",
+            notes=Case(
+                When(Q(notes__isnull=True) | Q(notes=""), then=note),
+                default=Concat(F("notes"), Value("\n"), note, output_field=models.TextField()),
+            ),
+        )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # Range types and GiST exclusion are Postgres only, SQLite relies on the
+    # (hcw, start_date, end_date) index and application-level checks.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_EXCLUSION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0004_alter_deployment_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deployment',
+            index=models.Index(fields=['hcw', 'start_date', 'end_date'], name='WorkForceTr_hcw_id_7c52f2_idx'),
+        ),
+        migrations.RunPython(archive_overlapping_deployments, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:43
+
+from django.db import migrations, models
+
+# The cube SQL as of this migration, copied here so later edits to
+# rollups.py do not change what this migration creates.
+WORKER_CUBE_SQL = """
+SELECT
+    ROW_NUMBER() OVER () AS id,
+    COALESCE(d.id, 0) AS district_id,
+    COALESCE(d.name, '') AS district_name,
+    COALESCE(d.code, '') AS district_code,
+    COALESCE(f.facility_type, '') AS facility_type,
+    COALESCE(w.gender, '') AS gender,
+    COALESCE(o.id, 0) AS organization_id,
+    COALESCE(o.name, '') AS organization_name,
+    COUNT(*) AS workers,
+    SUM(CASE WHEN w.is_active THEN 1 ELSE 0 END) AS active_workers,
+    SUM(CASE WHEN w.disability THEN 1 ELSE 0 END) AS disabled_workers
+FROM "WorkForceTrained_healthcareworker" w
+LEFT JOIN "WorkForceTrained_facility" f ON f.id = w.facility_id
+LEFT JOIN "WorkForceTrained_district" d ON d.id = f.district_id
+LEFT JOIN "WorkForceTrained_organization" o ON o.id = w.organization_id
+GROUP BY COALESCE(d.id, 0), COALESCE(d.name, ''), COALESCE(d.code, ''),
+         COALESCE(f.facility_type, ''), COALESCE(w.gender, ''),
+         COALESCE(o.id, 0), COALESCE(o.name, '')
+"""
+
+TRAINING_CUBE_SQL = """
+SELECT
+    ROW_NUMBER() OVER () AS id,
+    c.id AS competency_id,
+    c.code AS competency_code,
+    c.name AS competency_name,
+    COALESCE(d.id, 0) AS district_id,
+    COALESCE(d.name, '') AS district_name,
+    {year} AS year,
+    COUNT(*) AS trainings,
+    COUNT(DISTINCT t.hcw_id) AS workers
+FROM "WorkForceTrained_training" t
+JOIN "WorkForceTrained_competency" c ON c.id = t.competency_id
+JOIN "WorkForceTrained_healthcareworker" w ON w.id = t.hcw_id
+LEFT JOIN "WorkForceTrained_facility" f ON f.id = w.facility_id
+LEFT JOIN "WorkForceTrained_district" d ON d.id = f.district_id
+GROUP BY c.id, c.code, c.name, COALESCE(d.id, 0), COALESCE(d.name, ''), {year}
+"""
+
+CUBES = {
+    "WorkForceTrained_workercube": (WORKER_CUBE_SQL, "district_id, facility_type, gender, organization_id"),
+    "WorkForceTrained_trainingcube": (TRAINING_CUBE_SQL, "competency_id, district_id, year"),
+}
+
+
+def create(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    year = (
+        "CAST(EXTRACT(YEAR FROM t.date_completed) AS integer)" if vendor == "postgresql"
+        else "CAST(strftime('%Y', t.date_completed) AS integer)"
+    )
+    for name, (sql, columns) in CUBES.items():
+        select = sql.format(year=year)
+        if vendor == "postgresql":
+            schema_editor.execute(f'CREATE MATERIALIZED VIEW "{name}" AS {select} WITH DATA')
+        else:
+            schema_editor.execute(f'CREATE TABLE "{name}" AS {select}')
+        schema_editor.execute(f'CREATE UNIQUE INDEX "{name}_dims" ON "{name}" ({columns})')
+
+
+def drop(apps, schema_editor):
+    kind = "MATERIALIZED VIEW" if schema_editor.connection.vendor == "postgresql" else "TABLE"
+    for name in CUBES:
+        schema_editor.execute(f'DROP {kind} IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0007_workforcecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competency_id', models.BigIntegerField()),
+                ('competency_code', models.CharField(max_length=50)),
+                ('competency_name', models.CharField(max_length=200)),
+                ('district_id', models.BigIntegerField()),
+                ('district_name', models.CharField(max_length=100)),
+                ('year', models.IntegerField()),
+                ('trainings', models.BigIntegerField()),
+                ('workers', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'WorkForceTrained_trainingcube',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkerCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district_id', models.BigIntegerField()),
+                ('district_name', models.CharField(max_length=100)),
+                ('district_code', models.CharField(max_length=10)),
+                ('facility_type', models.CharField(max_length=30)),
+                ('gender', models.CharField(max_length=20)),
+                ('organization_id', models.BigIntegerField()),
+                ('organization_name', models.CharField(max_length=200)),
+                ('workers', models.BigIntegerField()),
+                ('active_workers', models.BigIntegerField()),
+                ('disabled_workers', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'WorkForceTrained_workercube',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create, drop),
+    ]
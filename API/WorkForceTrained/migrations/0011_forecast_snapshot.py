@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0010_roster_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('qualified', models.PositiveIntegerField(default=0)),
+                ('lapsing', models.PositiveIntegerField(default=0)),
+                ('deployed', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('competency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='WorkForceTrained.competency')),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='WorkForceTrained.district')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'district'], name='WorkForceTr_month_18547d_idx')],
+                'unique_together': {('district', 'competency', 'month')},
+            },
+        ),
+    ]
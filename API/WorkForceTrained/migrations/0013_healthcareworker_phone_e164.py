@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH = 5000
+
+
+def normalize(raw, code, digits_wanted):
+    # Frozen copy of phones.normalize_phone, later edits must not change this migration.
+    if not raw:
+        return None
+    raw = raw.strip()
+    digits = re.sub(r'\D', '', raw)
+    if raw.startswith('+') or digits.startswith('00'):
+        if not raw.startswith('+'):
+            digits = digits[2:]
+        trunk = code + '0'
+        if digits.startswith(trunk) and len(digits) == len(trunk) + digits_wanted:
+            digits = code + digits[len(trunk):]
+    elif digits.startswith('0') or len(digits) == digits_wanted:
+        national = digits[1:] if digits.startswith('0') else digits
+        if len(national) != digits_wanted:
+            return None
+        digits = code + national
+    return f'+{digits}' if 8 <= len(digits) <= 15 else None
+
+
+def backfill(apps, schema_editor):
+    HealthcareWorker = apps.get_model('WorkForceTrained', 'HealthcareWorker')
+    code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '265')
+    digits = getattr(settings, 'PHONE_NATIONAL_DIGITS', 9)
+    rows = HealthcareWorker.objects.order_by('pk').values_list('pk', 'phone').iterator(chunk_size=BATCH)
+    changed = []
+    for pk, phone in rows:
+        e164 = normalize(phone, code, digits)
+        if e164:
+            changed.append(HealthcareWorker(pk=pk, phone_e164=e164))
+        if len(changed) == BATCH:
+            HealthcareWorker.objects.bulk_update(changed, ['phone_e164'])
+            changed = []
+    HealthcareWorker.objects.bulk_update(changed, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0012_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthcareworker',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+def clear_duplicate_codes(apps, schema_editor):
+    # Blank codes become NULL and a code shared by several facilities stays
+    # on the oldest one, so the unique constraint can be added.
+    Facility = apps.get_model('WorkForceTrained', 'Facility')
+    Facility.objects.filter(code='').update(code=None)
+    seen = set()
+    for pk, code in Facility.objects.exclude(code=None).order_by('id').values_list('id', 'code'):
+        if code in seen:
+            Facility.objects.filter(pk=pk).update(code=None)
+        seen.add(code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0013_healthcareworker_phone_e164'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.CharField(blank=True, max_length=50)),
+                ('sha256', models.CharField(max_length=64)),
+                ('counts', models.JSONField(blank=True, default=dict)),
+                ('applied_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(clear_duplicate_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='facility',
+            name='code',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
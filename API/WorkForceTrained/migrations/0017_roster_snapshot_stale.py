@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0016_query_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rostersnapshot',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH = 5000
+
+
+def strip_trunk_zero(apps, schema_editor):
+    # "+265 0991 234 567" used to be indexed as +2650991234567.
+    HealthcareWorker = apps.get_model('WorkForceTrained', 'HealthcareWorker')
+    code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '265')
+    digits = getattr(settings, 'PHONE_NATIONAL_DIGITS', 9)
+    trunk = f'+{code}0'
+    wrong = HealthcareWorker.objects.filter(phone_e164__regex=rf'^{re.escape(trunk)}[0-9]{{{digits}}}$')
+    fixed = [
+        HealthcareWorker(pk=pk, phone_e164=f'+{code}{stored[len(trunk):]}')
+        for pk, stored in wrong.values_list('pk', 'phone_e164')
+    ]
+    HealthcareWorker.objects.bulk_update(fixed, ['phone_e164'], batch_size=BATCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0018_stream_ticket'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_trunk_zero, migrations.RunPython.noop),
+    ]
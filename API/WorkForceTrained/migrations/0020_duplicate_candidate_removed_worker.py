@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0019_phone_e164_trunk_zero'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='removed_worker_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='removed_worker_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def drop_unread_counters(apps, schema_editor):
+    # Worker and training totals are read from the rollup cubes.
+    WorkforceCounter = apps.get_model('WorkForceTrained', 'WorkforceCounter')
+    WorkforceCounter.objects.filter(metric__in=['workers', 'active_workers', 'trainings']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WorkForceTrained', '0020_duplicate_candidate_removed_worker'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_unread_counters, migrations.RunPython.noop),
+    ]
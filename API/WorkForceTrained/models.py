@@ -1,11 +1,28 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from WorkForceTrained.phones import normalize_phone
 
 User = get_user_model()
 
+
+class AtomicSaveMixin:
+    """
+    Wraps save() in a transaction so post_save handlers (workforce counters)
+    commit or roll back together with the row itself. delete() already runs
+    its signals inside the deletion transaction.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
 class District(models.Model):
     code = models.CharField(max_length=10, unique=True)
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["name"]
@@ -13,16 +30,17 @@ class District(models.Model):
     def __str__(self):
         return self.name
 
-class Organization(models.Model):
+class Organization(AtomicSaveMixin, models.Model):
     name = models.CharField(max_length=200)
     contact_email = models.EmailField(blank=True, null=True)
     contact_phone = models.CharField(max_length=20, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
 
-class Facility(models.Model):
+class Facility(AtomicSaveMixin, models.Model):
     FACILITY_TYPES = [
         ("clinic", "Clinic"),
         ("health_center", "Health Centre"),
@@ -32,10 +50,12 @@ class Facility(models.Model):
     ]
 
     name = models.CharField(max_length=255)
-    code = models.CharField(max_length=50, blank=True, null=True)
+    # Registry code, the key reference data loads upsert on.
+    code = models.CharField(max_length=50, blank=True, null=True, unique=True)
     facility_type = models.CharField(max_length=30, choices=FACILITY_TYPES)
     district = models.ForeignKey(District, on_delete=models.PROTECT, related_name="facilities")
     organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["district__name", "name"]
@@ -45,10 +65,11 @@ class Facility(models.Model):
         return f"{self.name} ({self.district.name})"
 
 
-class Competency(models.Model):
+class Competency(AtomicSaveMixin, models.Model):
     code = models.CharField(max_length=50, unique=True)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["code"]
@@ -56,7 +77,7 @@ class Competency(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
-class HealthcareWorker(models.Model):
+class HealthcareWorker(AtomicSaveMixin, models.Model):
     GENDER_CHOICES = [
         ("male", "Male"),
         ("female", "Female"),
@@ -67,6 +88,8 @@ class HealthcareWorker(models.Model):
     first_name = models.CharField(max_length=120)
     last_name = models.CharField(max_length=120)
     phone = models.CharField(max_length=20, db_index=True)
+    # Canonical +<country><number> form of phone, kept in step by save().
+    phone_e164 = models.CharField(max_length=16, blank=True, null=True, db_index=True, editable=False)
     email = models.EmailField(blank=True, null=True)
     gender = models.CharField(max_length=20, choices=GENDER_CHOICES, blank=True, null=True)
     disability = models.BooleanField(default=False)
@@ -88,20 +111,31 @@ class HealthcareWorker(models.Model):
         indexes = [
             models.Index(fields=["phone"]),
             models.Index(fields=["last_name", "first_name"]),
+            models.Index(fields=["updated_at"]),
         ]
         ordering = ["last_name", "first_name"]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        # A deferred phone was not changed, reading it would cost a query.
+        if "phone" in self.__dict__:
+            self.phone_e164 = normalize_phone(self.phone)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "phone" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "phone_e164"}
+        super().save(*args, **kwargs)
 
-class Training(models.Model):
+
+class Training(AtomicSaveMixin, models.Model):
     hcw = models.ForeignKey(HealthcareWorker, on_delete=models.CASCADE, related_name="trainings")
     competency = models.ForeignKey(Competency, on_delete=models.PROTECT)
     provider = models.CharField(max_length=200, blank=True)
     date_completed = models.DateField()
     valid_until = models.DateField(blank=True, null=True)
     certificate_file = models.FileField(upload_to="certificates/", blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-date_completed"]
@@ -124,6 +158,7 @@ class AvailabilityRecord(models.Model):
     note = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-timestamp"]
@@ -151,9 +186,13 @@ class Deployment(models.Model):
     role = models.CharField(max_length=120, blank=True)
     status = models.CharField(max_length=50, default="status")
     notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-start_date"]
+        indexes = [
+            models.Index(fields=["hcw", "start_date", "end_date"]),
+        ]
 
     def __str__(self):
         return f"{self.hcw} - {self.outbreak_type} ({self.status})"
@@ -178,10 +217,281 @@ class DeploymentHistory(models.Model):
     archived_at = models.DateTimeField(auto_now_add=True)
     archived_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     completion_notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-archived_at"]
         verbose_name_plural = "Deployment Histories"
 
     def __str__(self):
-        return f"{self.hcw_name} - {self.outbreak_type} (Archived)"
\ No newline at end of file
+        return f"{self.hcw_name} - {self.outbreak_type} (Archived)"
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    progress = models.PositiveSmallIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class WorkforceCounter(models.Model):
+    """
+    Running totals of the reference tables kept up to date on every write,
+    e.g. ("facilities", "district", "12") or ("organizations", "all", "").
+    """
+    metric = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True, default="")
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("metric", "dimension", "key")
+
+    def __str__(self):
+        return f"{self.metric}[{self.dimension}={self.key}] = {self.value}"
+
+
+class WorkerCube(models.Model):
+    """
+    District x facility type x gender x organization worker counts.
+    A materialized view on Postgres, a plain table elsewhere, see rollups.py.
+    """
+    district_id = models.BigIntegerField()
+    district_name = models.CharField(max_length=100)
+    district_code = models.CharField(max_length=10)
+    facility_type = models.CharField(max_length=30)
+    gender = models.CharField(max_length=20)
+    organization_id = models.BigIntegerField()
+    organization_name = models.CharField(max_length=200)
+    workers = models.BigIntegerField()
+    active_workers = models.BigIntegerField()
+    disabled_workers = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = "WorkForceTrained_workercube"
+
+
+class TrainingCube(models.Model):
+    """Competency x district x year training counts, see rollups.py."""
+    competency_id = models.BigIntegerField()
+    competency_code = models.CharField(max_length=50)
+    competency_name = models.CharField(max_length=200)
+    district_id = models.BigIntegerField()
+    district_name = models.CharField(max_length=100)
+    year = models.IntegerField()
+    trainings = models.BigIntegerField()
+    workers = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = "WorkForceTrained_trainingcube"
+
+
+class RollupRefresh(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    refreshed_at = models.DateTimeField()
+    duration_ms = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.refreshed_at}"
+
+
+class Tombstone(models.Model):
+    """Records deletions so delta sync clients can drop rows they still hold."""
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["model", "deleted_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+
+class RosterSnapshot(models.Model):
+    """Offline roster bundle for one district, or the whole country."""
+    key = models.CharField(max_length=20, unique=True)  # district code or "national"
+    district = models.ForeignKey(District, on_delete=models.CASCADE, null=True, blank=True)
+    fingerprint = models.CharField(max_length=64)
+    version = models.PositiveIntegerField(default=0)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    rows = models.JSONField(default=dict, blank=True)
+    built_at = models.DateTimeField()
+    # Set by writes to the data it bundles, cleared when the build job checks it.
+    stale = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class ForecastSnapshot(models.Model):
+    """Projected supply of one competency in one district for one month."""
+    district = models.ForeignKey(District, on_delete=models.CASCADE, null=True, blank=True)
+    competency = models.ForeignKey(Competency, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    qualified = models.PositiveIntegerField(default=0)
+    lapsing = models.PositiveIntegerField(default=0)
+    deployed = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("district", "competency", "month")
+        indexes = [
+            models.Index(fields=["month", "district"]),
+        ]
+
+    @property
+    def available(self):
+        return self.qualified - self.deployed
+
+    def __str__(self):
+        return f"{self.competency_id} in {self.district_id} {self.month:%Y-%m}: {self.qualified}"
+
+
+class DedupeKey(models.Model):
+    """Blocking key of a worker, only workers sharing a key are compared."""
+    hcw = models.ForeignKey(HealthcareWorker, on_delete=models.CASCADE, related_name="dedupe_keys")
+    key = models.CharField(max_length=64, db_index=True)
+
+    class Meta:
+        unique_together = ("hcw", "key")
+
+    def __str__(self):
+        return f"{self.hcw_id}: {self.key}"
+
+
+class DuplicateCandidate(models.Model):
+    """Pair of workers that look like the same person, awaiting review."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("merged", "Merged"),
+        ("dismissed", "Dismissed"),
+    ]
+
+    # worker_a always has the lower id so each pair is stored once.
+    # Reviewed pairs outlive a merged-away worker as history, pending ones
+    # are removed with the worker.
+    worker_a = models.ForeignKey(HealthcareWorker, on_delete=models.SET_NULL, null=True, related_name="+")
+    worker_b = models.ForeignKey(HealthcareWorker, on_delete=models.SET_NULL, null=True, related_name="+")
+    score = models.FloatField()
+    reasons = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_at = models.DateTimeField(blank=True, null=True)
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # The merged-away worker, kept once the foreign key has gone null.
+    removed_worker_id = models.PositiveBigIntegerField(blank=True, null=True)
+    removed_worker_name = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        unique_together = ("worker_a", "worker_b")
+        indexes = [
+            models.Index(fields=["status", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.worker_a_id} ~ {self.worker_b_id} ({self.score:.2f}, {self.status})"
+
+
+class ReferenceDataVersion(models.Model):
+    """Hash of the last reference data fixture applied, so unchanged ones are skipped."""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.CharField(max_length=50, blank=True)
+    sha256 = models.CharField(max_length=64)
+    counts = models.JSONField(default=dict, blank=True)
+    applied_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} {self.version} ({self.sha256[:12]})"
+
+
+class AuditEntry(models.Model):
+    """One change to an audited row, with field-level old and new values."""
+    ACTION_CHOICES = [
+        ("created", "Created"),
+        ("updated", "Updated"),
+        ("deleted", "Deleted"),
+    ]
+
+    entity = models.CharField(max_length=50)  # model name, e.g. "deployment"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # created/deleted: {field: value}, updated: {field: [old, new]}
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["entity", "object_id", "timestamp"]),
+            models.Index(fields=["timestamp"]),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} #{self.object_id} {self.action} at {self.timestamp}"
+
+
+class QueryStat(models.Model):
+    """Calls and DB time of one query shape (fingerprint) from one endpoint or job."""
+    fingerprint_hash = models.CharField(max_length=32)
+    view = models.CharField(max_length=255)  # "GET api/hcws/$" or "job archive_deployments"
+    fingerprint = models.TextField()  # SQL with literals replaced by ?
+    calls = models.BigIntegerField(default=0)
+    slow_calls = models.BigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    # Latest sampled EXPLAIN (ANALYZE, BUFFERS) of a slow call, Postgres only.
+    explain = models.TextField(blank=True)
+    explain_ms = models.FloatField(null=True, blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("fingerprint_hash", "view")
+
+    def __str__(self):
+        return f"{self.view}: {self.calls} calls, {self.total_ms:.0f} ms"
+
+
+class StreamTicket(models.Model):
+    """Short-lived, single-use credential for the event stream URL."""
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user_id} until {self.expires_at}"
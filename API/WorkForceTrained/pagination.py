@@ -0,0 +1,119 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough.
+DEFAULT_ESTIMATE_THRESHOLD = 100000
+
+
+def estimate_threshold():
+    return getattr(settings, "PAGINATION_ESTIMATE_THRESHOLD", DEFAULT_ESTIMATE_THRESHOLD)
+
+
+def estimate_count(queryset):
+    """
+    Planner row estimate for a queryset, None where the database has none.
+    Unfiltered tables read pg_class.reltuples, anything else asks EXPLAIN.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 for tables never vacuumed or analyzed.
+            return row[0] if row and row[0] >= 0 else None
+
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def approximate_count(queryset, threshold=None):
+    """(count, is_estimate). Exact whenever the estimate is small or missing."""
+    threshold = estimate_threshold() if threshold is None else threshold
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count(), False
+    return estimate, True
+
+
+class EstimatedPage(Page):
+    """Page whose has_next comes from fetching one extra row, not from num_pages."""
+
+    has_more = False
+
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips COUNT(*) on large querysets, for DRF and the admin.
+    With an estimated count, a page is valid whenever it has rows, so rows
+    past a planner underestimate stay reachable.
+    """
+
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        count, self.count_is_estimate = approximate_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        if not self.count_is_estimate:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        self.count  # Settles count_is_estimate.
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        page = EstimatedPage(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        # Never report fewer rows than this page proves exist.
+        self.__dict__["count"] = max(self.count, bottom + len(rows))
+        return page
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_is_estimate"] = self.page.paginator.count_is_estimate
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count_is_estimate"] = {"type": "boolean"}
+        return schema
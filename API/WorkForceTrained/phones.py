@@ -0,0 +1,67 @@
+import re
+
+from django.conf import settings
+
+# Malawi: +265 followed by a 9-digit national number, written 0XXXXXXXXX locally.
+DEFAULT_COUNTRY_CODE = "265"
+DEFAULT_NATIONAL_DIGITS = 9
+BACKFILL_BATCH = 5000
+MAX_PHONE_LOOKUPS = 1000
+
+
+def country_code():
+    return getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", DEFAULT_COUNTRY_CODE)
+
+
+def national_digits():
+    return getattr(settings, "PHONE_NATIONAL_DIGITS", DEFAULT_NATIONAL_DIGITS)
+
+
+def normalize_phone(raw):
+    """
+    E.164 form of a phone number as typed, e.g. "0991 234 567",
+    "+265-991-234-567", "+265 0991 234 567" and "00265991234567" all give
+    "+265991234567". None when it cannot be a phone number.
+    """
+    if not raw:
+        return None
+    raw = raw.strip()
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+") or digits.startswith("00"):
+        if not raw.startswith("+"):
+            digits = digits[2:]
+        # The trunk 0 is often kept after the country code, drop it.
+        trunk = country_code() + "0"
+        if digits.startswith(trunk) and len(digits) == len(trunk) + national_digits():
+            digits = country_code() + digits[len(trunk):]
+    elif digits.startswith("0") or len(digits) == national_digits():
+        # Local number, with or without the trunk 0.
+        national = digits[1:] if digits.startswith("0") else digits
+        if len(national) != national_digits():
+            return None
+        digits = country_code() + national
+    return f"+{digits}" if 8 <= len(digits) <= 15 else None
+
+
+def backfill_phone_index(model, progress=None):
+    """
+    Recompute phone_e164 for every row of `model` whose stored value is out
+    of date, in bulk_update batches. Returns the number of rows changed.
+    """
+    changed, updated, seen = [], 0, 0
+    rows = model.objects.order_by("pk").values_list("pk", "phone", "phone_e164").iterator(chunk_size=BACKFILL_BATCH)
+    for pk, phone, stored in rows:
+        seen += 1
+        e164 = normalize_phone(phone)
+        if e164 != stored:
+            changed.append(model(pk=pk, phone_e164=e164))
+        if len(changed) == BACKFILL_BATCH:
+            model.objects.bulk_update(changed, ["phone_e164"])
+            updated += len(changed)
+            changed = []
+            if progress:
+                progress(seen)
+    if changed:
+        model.objects.bulk_update(changed, ["phone_e164"])
+        updated += len(changed)
+    return updated
@@ -0,0 +1,98 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from users.authentication import shared_cache
+from WorkForceTrained.models import AvailabilityRecord, Deployment, HealthcareWorker, Training
+
+DEFAULT_CACHE_SECONDS = 300
+# Without a shared cache another process's bump is not seen, so profiles
+# are kept only this long.
+DEFAULT_LOCAL_CACHE_SECONDS = 30
+RECENT_AVAILABILITY = 20
+
+
+def cache_seconds():
+    if shared_cache():
+        return getattr(settings, "WORKER_PROFILE_CACHE_SECONDS", DEFAULT_CACHE_SECONDS)
+    return getattr(settings, "WORKER_PROFILE_LOCAL_CACHE_SECONDS", DEFAULT_LOCAL_CACHE_SECONDS)
+
+
+def _version_key(hcw_id):
+    return f"worker-profile-version:{hcw_id}"
+
+
+def _cache_key(hcw_id, version):
+    return f"worker-profile:{hcw_id}:{version}"
+
+
+def _version(hcw_id):
+    key = _version_key(hcw_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh clock value, never one an evicted counter already used.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def profile_queryset():
+    """Worker with facility, district and organization, plus three prefetches."""
+    return HealthcareWorker.objects.select_related(
+        "facility__district", "organization"
+    ).prefetch_related(
+        Prefetch("trainings", queryset=Training.objects.select_related("competency").order_by("-date_completed")),
+        Prefetch(
+            "availability_records",
+            queryset=AvailabilityRecord.objects.order_by("-timestamp")[:RECENT_AVAILABILITY],
+            to_attr="recent_availability",
+        ),
+        Prefetch("deployments", queryset=Deployment.objects.select_related("district").order_by("-start_date")),
+    )
+
+
+def is_current(deployment, today=None):
+    today = today or date.today()
+    return deployment.status != "archived" and (deployment.end_date is None or deployment.end_date >= today)
+
+
+def get_profile(hcw_id, build):
+    """
+    Cached profile of one worker, `build(worker)` serializes it on a miss.
+    None if the worker does not exist.
+
+    The key carries a per-worker version that forget() increments, so
+    changes retire the profile without writing to the worker row.
+    """
+    key = _cache_key(hcw_id, _version(hcw_id))
+    profile = cache.get(key)
+    if profile is None:
+        worker = profile_queryset().filter(pk=hcw_id).first()
+        if worker is None:
+            return None
+        profile = build(worker)
+        cache.set(key, profile, cache_seconds())
+    return profile
+
+
+def forget(hcw_ids):
+    """
+    Retire cached profiles now and again after commit, so a request that
+    cached the old state mid-transaction does not keep it.
+    """
+    keys = [_version_key(hcw_id) for hcw_id in set(hcw_ids) if hcw_id]
+    if keys:
+        _bump(keys)
+        transaction.on_commit(lambda: _bump(keys))
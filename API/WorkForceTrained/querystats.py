@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from WorkForceTrained.models import QueryStat
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    # Calls at least this slow are counted as slow and may be explained.
+    "SLOW_MS": 200,
+    "EXPLAIN": True,
+    # Each fingerprint is explained at most once per interval per process.
+    "EXPLAIN_EVERY_SECONDS": 3600,
+    # Process totals are added to the QueryStat table this often.
+    "FLUSH_SECONDS": 60,
+}
+MAX_VIEW_LENGTH = 255
+# Slow calls waiting to be explained, more are dropped until it drains.
+MAX_WAITING_PLANS = 100
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%s|\$\d+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+# SELECTs with side effects: ANALYZE would take sequence values, send
+# notifications or take row and advisory locks a second time.
+_SIDE_EFFECTS = re.compile(
+    r"\b(?:nextval|setval|pg_notify|pg_advisory\w*)\s*\(|\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b",
+    re.IGNORECASE,
+)
+
+
+def stats_settings():
+    return {**DEFAULTS, **getattr(settings, "QUERY_STATS", {})}
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    SQL with literals and placeholders replaced by ?, and IN lists or
+    VALUES rows of any length collapsed, so one query shape has one print.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+@lru_cache(maxsize=4096)
+def _fingerprint_hash(sql):
+    return hashlib.md5(fingerprint(sql).encode()).hexdigest()
+
+
+class QueryRecorder:
+    """
+    Execute wrapper timing the queries of one request or job. Totals are
+    kept by raw SQL text while it runs, fingerprinting waits for finish().
+    """
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.elapsed_ms = 0.0
+        self.queries = {}  # sql -> [calls, total_ms, max_ms, slow_calls]
+        self.slow = {}  # sql -> (ms, params, connection alias) of its slowest call
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.elapsed_ms += ms
+            stat = self.queries.get(sql)
+            if stat is None:
+                stat = self.queries[sql] = [0, 0.0, 0.0, 0]
+            stat[0] += 1
+            stat[1] += ms
+            if ms > stat[2]:
+                stat[2] = ms
+            if ms >= self.slow_ms:
+                stat[3] += 1
+                if not many and ms >= self.slow.get(sql, (0,))[0]:
+                    self.slow[sql] = (ms, params, context["connection"].alias)
+
+
+_lock = threading.Lock()
+_pending = {}  # (fingerprint hash, view) -> [fingerprint, calls, total_ms, max_ms, slow_calls]
+_plans = {}  # (fingerprint hash, view) -> (plan, ms)
+_explained = {}  # fingerprint hash -> monotonic time of its last EXPLAIN
+_last_flush = [time.monotonic()]
+_waiting_plans = queue.Queue(maxsize=MAX_WAITING_PLANS)
+_writer = []
+
+
+@contextmanager
+def recording():
+    """
+    Time every query on every connection inside the block. Set `.view` on
+    the yielded recorder before the block ends to have the queries counted.
+    """
+    recorder = QueryRecorder(stats_settings()["SLOW_MS"])
+    recorder.view = None
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+    if recorder.view:
+        finish(recorder, recorder.view)
+
+
+def finish(recorder, view):
+    """
+    Fold a recorder into the process totals and queue its slow calls for
+    EXPLAIN. Explaining and flushing happen on the writer thread, never
+    in the request or job that was recorded.
+    """
+    config = stats_settings()
+    if not config["ENABLED"] or not recorder.queries:
+        return
+    view = view[:MAX_VIEW_LENGTH]
+    with _lock:
+        for sql, (calls, total_ms, max_ms, slow_calls) in recorder.queries.items():
+            key = (_fingerprint_hash(sql), view)
+            stat = _pending.get(key)
+            if stat is None:
+                _pending[key] = [fingerprint(sql), calls, total_ms, max_ms, slow_calls]
+            else:
+                stat[1] += calls
+                stat[2] += total_ms
+                stat[3] = max(stat[3], max_ms)
+                stat[4] += slow_calls
+
+    if recorder.slow and config["EXPLAIN"]:
+        for sql, (ms, params, alias) in recorder.slow.items():
+            _queue_plan(sql, params, alias, view, ms, config["EXPLAIN_EVERY_SECONDS"])
+    _start_writer()
+
+
+def _queue_plan(sql, params, alias, view, ms, every):
+    """Queue a slow SELECT for EXPLAIN, at most once per fingerprint per interval."""
+    if connections[alias].vendor != "postgresql":
+        return
+    # Only SELECTs are explained, see _sample_plan for which are analyzed.
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return
+    digest = _fingerprint_hash(sql)
+    now = time.monotonic()
+    with _lock:
+        if now - _explained.get(digest, -every) < every:
+            return
+        _explained[digest] = now
+    try:
+        _waiting_plans.put_nowait((sql, params, alias, view, ms))
+    except queue.Full:
+        with _lock:
+            _explained.pop(digest, None)
+
+
+def _start_writer():
+    with _lock:
+        if _writer:
+            return
+        thread = threading.Thread(target=_write_forever, name="querystats-writer", daemon=True)
+        _writer.append(thread)
+    thread.start()
+
+
+def _write_forever():
+    """Explain queued slow calls and flush the totals every FLUSH_SECONDS."""
+    while True:
+        wait = stats_settings()["FLUSH_SECONDS"] - (time.monotonic() - _last_flush[0])
+        try:
+            sample = _waiting_plans.get(timeout=max(wait, 0.01))
+        except queue.Empty:
+            sample = None
+        try:
+            if sample is not None:
+                _sample_plan(*sample)
+            if time.monotonic() - _last_flush[0] >= stats_settings()["FLUSH_SECONDS"]:
+                flush()
+        except Exception:
+            logger.exception("Query stats writer failed")
+        finally:
+            close_old_connections()
+
+
+def explain_prefix(sql):
+    """
+    EXPLAIN (ANALYZE, BUFFERS) for pure reads. ANALYZE runs the statement
+    again, so anything with side effects only gets the estimated plan.
+    """
+    return "EXPLAIN " if _SIDE_EFFECTS.search(sql) else "EXPLAIN (ANALYZE, BUFFERS) "
+
+
+def _sample_plan(sql, params, alias, view, ms):
+    """Explain one slow SELECT on this thread's connection."""
+    connection = connections[alias]
+    digest = _fingerprint_hash(sql)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(explain_prefix(sql) + sql, params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+    except Exception:
+        logger.warning("Could not explain slow query %s", digest, exc_info=True)
+        return
+    with _lock:
+        _plans[(digest, view)] = (plan, ms)
+
+
+def flush():
+    """Add this process's pending totals and plans to the QueryStat table."""
+    with _lock:
+        pending, plans = dict(_pending), dict(_plans)
+        _pending.clear()
+        _plans.clear()
+        _last_flush[0] = time.monotonic()
+    if not pending and not plans:
+        return 0
+
+    now = timezone.now()
+    try:
+        QueryStat.objects.bulk_create(
+            [QueryStat(fingerprint_hash=h, view=v, fingerprint=stat[0]) for (h, v), stat in pending.items()],
+            ignore_conflicts=True,
+        )
+        for (digest, view), (_, calls, total_ms, max_ms, slow_calls) in pending.items():
+            changes = {
+                "calls": F("calls") + calls,
+                "total_ms": F("total_ms") + total_ms,
+                "max_ms": Greatest("max_ms", max_ms),
+                "slow_calls": F("slow_calls") + slow_calls,
+                "last_seen": now,
+            }
+            if (digest, view) in plans:
+                plan, ms = plans[(digest, view)]
+                changes.update(explain=plan, explain_ms=ms, explained_at=now)
+            QueryStat.objects.filter(fingerprint_hash=digest, view=view).update(**changes)
+        # Plans whose totals an earlier flush already wrote.
+        for (digest, view), (plan, ms) in plans.items():
+            if (digest, view) not in pending:
+                QueryStat.objects.filter(fingerprint_hash=digest, view=view).update(
+                    explain=plan, explain_ms=ms, explained_at=now
+                )
+    except Exception:
+        # Statistics are best effort, a failed flush must not fail the request.
+        logger.exception("Failed to flush %s query stats", len(pending))
+        return 0
+    return len(pending)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from WorkForceTrained import autocomplete, counters, rollups, snapshots
+from WorkForceTrained.models import Competency, District, Facility, Organization, ReferenceDataVersion
+
+FIXTURE = Path(__file__).resolve().parent / "data" / "reference_data.json"
+DATASET = "reference"
+BATCH_SIZE = 1000
+FACILITY_TYPES = {value for value, _ in Facility.FACILITY_TYPES}
+
+# table -> (model, key, required fields, optional fields). Optional fields are
+# only written when the fixture carries them, so values edited in the app
+# survive a fixture that does not know about them.
+TABLES = {
+    "districts": (District, "code", ("name",), ()),
+    "organizations": (Organization, "name", (), ("contact_email", "contact_phone")),
+    "competencies": (Competency, "code", ("name",), ("description",)),
+    "facilities": (Facility, "code", ("name", "district_id", "facility_type", "organization_id"), ()),
+}
+
+
+class ReferenceDataError(Exception):
+    pass
+
+
+def _fields(table, rows):
+    _, _, required, optional = TABLES[table]
+    return list(required) + [f for f in optional if any(f in row for row in rows)]
+
+
+def _upsert(table, rows, now):
+    """
+    Insert new rows and update changed ones, keyed on the table's code.
+    Unchanged rows are not written, so their updated_at (and delta sync
+    clients) are left alone.
+    """
+    model, key, _, _ = TABLES[table]
+    fields = _fields(table, rows)
+    existing = {row[0]: row[1:] for row in model.objects.values_list(key, *fields)}
+    new = [row for row in rows if row[key] not in existing]
+    changed = [
+        row for row in rows
+        if row[key] in existing and existing[row[key]] != tuple(row.get(f) for f in fields)
+    ]
+    objects = [model(updated_at=now, **{f: row.get(f) for f in (key, *fields)}) for row in new + changed]
+
+    if model._meta.get_field(key).unique:
+        model.objects.bulk_create(
+            objects, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=[key], update_fields=[*fields, "updated_at"],
+        )
+    else:
+        # No unique key to conflict on (organizations), split inserts and updates.
+        ids = dict(model.objects.filter(**{f"{key}__in": [row[key] for row in changed]}).values_list(key, "pk"))
+        model.objects.bulk_create(objects[:len(new)], batch_size=BATCH_SIZE)
+        updates = objects[len(new):]
+        for obj in updates:
+            obj.pk = ids[getattr(obj, key)]
+        model.objects.bulk_update(updates, [*fields, "updated_at"], batch_size=BATCH_SIZE)
+    return {"created": len(new), "updated": len(changed), "unchanged": len(rows) - len(new) - len(changed)}
+
+
+def _facility_rows(rows):
+    """Resolve district codes and organization names to ids."""
+    districts = dict(District.objects.values_list("code", "id"))
+    organizations = dict(Organization.objects.values_list("name", "id"))
+    resolved, errors = [], []
+    for row in rows:
+        if row.get("facility_type") not in FACILITY_TYPES:
+            errors.append(f"{row['code']}: unknown facility_type {row.get('facility_type')!r}")
+        if row.get("district") not in districts:
+            errors.append(f"{row['code']}: unknown district {row.get('district')!r}")
+        if row.get("organization") and row["organization"] not in organizations:
+            errors.append(f"{row['code']}: unknown organization {row['organization']!r}")
+        resolved.append({
+            "code": row["code"],
+            "name": row["name"],
+            "facility_type": row.get("facility_type"),
+            "district_id": districts.get(row.get("district")),
+            "organization_id": organizations.get(row.get("organization")),
+        })
+    if errors:
+        raise ReferenceDataError("; ".join(errors[:20]))
+    return resolved
+
+
+def _adopt_facility_codes(rows, now):
+    """
+    Give existing facilities without the registry code (seeded by name
+    before codes existed) their code, matched on name and district, so the
+    upsert updates them rather than colliding on (name, district).
+    """
+    by_place = {(row["name"], row["district_id"]): row["code"] for row in rows}
+    adopted = []
+    for facility in Facility.objects.exclude(code__in=by_place.values()).only("id", "name", "district_id", "code"):
+        code = by_place.get((facility.name, facility.district_id))
+        if code:
+            facility.code, facility.updated_at = code, now
+            adopted.append(facility)
+    Facility.objects.bulk_update(adopted, ["code", "updated_at"], batch_size=BATCH_SIZE)
+    return len(adopted)
+
+
+def _validate(data):
+    if not isinstance(data, dict):
+        raise ReferenceDataError("Fixture must be a JSON object")
+    for table, (_, key, required, _) in TABLES.items():
+        rows = data.get(table, [])
+        if not isinstance(rows, list):
+            raise ReferenceDataError(f"{table} must be a list")
+        needed = (key, *[f for f in required if not f.endswith("_id")])
+        for index, row in enumerate(rows):
+            missing = [f for f in needed if not row.get(f)]
+            if missing:
+                raise ReferenceDataError(f"{table}[{index}] is missing {', '.join(missing)}")
+        keys = [row[key] for row in rows]
+        if len(keys) != len(set(keys)):
+            raise ReferenceDataError(f"{table} has duplicate {key} values")
+
+
+def load_reference_data(path=None, force=False):
+    """
+    Apply a reference data fixture with bulk upserts. Does nothing when the
+    fixture's hash matches the last one applied, unless forced.
+    Rows missing from the fixture are kept, workers may still point at them.
+    """
+    raw = Path(path or FIXTURE).read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    applied = ReferenceDataVersion.objects.filter(name=DATASET).first()
+    if applied and applied.sha256 == digest and not force:
+        return {"skipped": True, "version": applied.version, "sha256": digest}
+
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise ReferenceDataError(f"Fixture is not valid JSON: {e}")
+    _validate(data)
+
+    now = timezone.now()
+    counts = {}
+    with transaction.atomic():
+        # Districts and organizations first, facilities refer to both.
+        for table in ("districts", "organizations", "competencies"):
+            counts[table] = _upsert(table, data.get(table, []), now)
+        facilities = _facility_rows(data.get("facilities", []))
+        adopted = _adopt_facility_codes(facilities, now)
+        counts["facilities"] = _upsert("facilities", facilities, now)
+        counts["facilities"]["adopted"] = adopted
+
+        ReferenceDataVersion.objects.update_or_create(
+            name=DATASET,
+            defaults={"version": str(data.get("version", "")), "sha256": digest, "counts": counts, "applied_at": now},
+        )
+
+    # Bulk writes skip the model signals, do their work once instead.
+    changed = [table for table, c in counts.items() if c["created"] or c["updated"] or c.get("adopted")]
+    if changed:
+        counters.reconcile(repair=True)
+        rollups.mark_dirty()
+        snapshots.mark_stale()
+        for table in changed:
+            autocomplete.forget(TABLES[table][0])
+    return {"skipped": False, "version": str(data.get("version", "")), "sha256": digest, "counts": counts}
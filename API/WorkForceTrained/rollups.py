@@ -0,0 +1,106 @@
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from WorkForceTrained.models import RollupRefresh
+
+WORKER_CUBE = "WorkForceTrained_workercube"
+TRAINING_CUBE = "WorkForceTrained_trainingcube"
+
+WORKER_CUBE_SQL = """
+SELECT
+    ROW_NUMBER() OVER () AS id,
+    COALESCE(d.id, 0) AS district_id,
+    COALESCE(d.name, '') AS district_name,
+    COALESCE(d.code, '') AS district_code,
+    COALESCE(f.facility_type, '') AS facility_type,
+    COALESCE(w.gender, '') AS gender,
+    COALESCE(o.id, 0) AS organization_id,
+    COALESCE(o.name, '') AS organization_name,
+    COUNT(*) AS workers,
+    SUM(CASE WHEN w.is_active THEN 1 ELSE 0 END) AS active_workers,
+    SUM(CASE WHEN w.disability THEN 1 ELSE 0 END) AS disabled_workers
+FROM "WorkForceTrained_healthcareworker" w
+LEFT JOIN "WorkForceTrained_facility" f ON f.id = w.facility_id
+LEFT JOIN "WorkForceTrained_district" d ON d.id = f.district_id
+LEFT JOIN "WorkForceTrained_organization" o ON o.id = w.organization_id
+GROUP BY COALESCE(d.id, 0), COALESCE(d.name, ''), COALESCE(d.code, ''),
+         COALESCE(f.facility_type, ''), COALESCE(w.gender, ''),
+         COALESCE(o.id, 0), COALESCE(o.name, '')
+"""
+
+TRAINING_CUBE_SQL = """
+SELECT
+    ROW_NUMBER() OVER () AS id,
+    c.id AS competency_id,
+    c.code AS competency_code,
+    c.name AS competency_name,
+    COALESCE(d.id, 0) AS district_id,
+    COALESCE(d.name, '') AS district_name,
+    {year} AS year,
+    COUNT(*) AS trainings,
+    COUNT(DISTINCT t.hcw_id) AS workers
+FROM "WorkForceTrained_training" t
+JOIN "WorkForceTrained_competency" c ON c.id = t.competency_id
+JOIN "WorkForceTrained_healthcareworker" w ON w.id = t.hcw_id
+LEFT JOIN "WorkForceTrained_facility" f ON f.id = w.facility_id
+LEFT JOIN "WorkForceTrained_district" d ON d.id = f.district_id
+GROUP BY c.id, c.code, c.name, COALESCE(d.id, 0), COALESCE(d.name, ''), {year}
+"""
+
+# Cube name -> SELECT it is built from. The tables themselves and their
+# unique indexes (needed by REFRESH ... CONCURRENTLY) come from migrations.
+CUBES = {
+    WORKER_CUBE: WORKER_CUBE_SQL,
+    TRAINING_CUBE: TRAINING_CUBE_SQL,
+}
+
+
+def _select(name, vendor):
+    year = (
+        "CAST(EXTRACT(YEAR FROM t.date_completed) AS integer)" if vendor == "postgresql"
+        else "CAST(strftime('%Y', t.date_completed) AS integer)"
+    )
+    return CUBES[name].format(year=year)
+
+
+def refresh(names=None):
+    """Rebuild the cubes without blocking readers, returns {name: seconds}."""
+    timings = {}
+    for name in names or CUBES:
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{name}"')
+            else:
+                # Readers keep seeing the old rows until this commits.
+                with transaction.atomic():
+                    cursor.execute(f'DELETE FROM "{name}"')
+                    cursor.execute(f'INSERT INTO "{name}" {_select(name, connection.vendor)}')
+        timings[name] = round(time.monotonic() - started, 3)
+        RollupRefresh.objects.update_or_create(
+            name=name, defaults={"refreshed_at": timezone.now(), "duration_ms": int(timings[name] * 1000)}
+        )
+    return timings
+
+
+def refreshed_at():
+    """Oldest refresh time across the cubes, None if never refreshed."""
+    times = list(RollupRefresh.objects.filter(name__in=CUBES).values_list("refreshed_at", flat=True))
+    if len(times) < len(CUBES):
+        return None
+    return min(times)
+
+
+def mark_dirty():
+    """Refresh the cubes in the background once the current transaction commits."""
+    transaction.on_commit(_queue_refresh)
+
+
+def _queue_refresh():
+    from WorkForceTrained.jobs import enqueue_merged
+
+    # Folds into a refresh that has not started yet, so a burst of writes
+    # costs one rebuild.
+    enqueue_merged("refresh_rollups", "names", CUBES)
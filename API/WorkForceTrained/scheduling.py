@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Exists, F, Func, OuterRef, Q, Value
+
+from WorkForceTrained.models import Deployment, HealthcareWorker
+
+# Archived deployments no longer hold the worker; everything else does.
+BLOCKING = ~Q(status="archived")
+
+
+def _overlap_q(start, end):
+    """Inclusive [start, end] overlap, a missing end_date means open-ended."""
+    q = Q(end_date__isnull=True) | Q(end_date__gte=start)
+    if end is not None:
+        q &= Q(start_date__lte=end)
+    return q
+
+
+def overlapping_deployments(start, end, queryset=None):
+    """
+    Blocking deployments overlapping [start, end].
+    On Postgres this compares daterange values so the GiST index behind the
+    deployment exclusion constraint is used.
+    """
+    if queryset is None:
+        queryset = Deployment.objects.all()
+    queryset = queryset.filter(BLOCKING)
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.fields import DateRangeField
+        from django.db.backends.postgresql.psycopg_any import DateRange
+
+        return queryset.annotate(
+            period=Func(
+                F("start_date"), F("end_date"), Value("[]"),
+                function="daterange", output_field=DateRangeField(),
+            )
+        ).filter(period__overlap=DateRange(start, end, "[]"))
+
+    return queryset.filter(_overlap_q(start, end))
+
+
+def conflicting_deployments(hcw_id, start, end, exclude_id=None):
+    queryset = overlapping_deployments(start, end, Deployment.objects.filter(hcw_id=hcw_id))
+    if exclude_id is not None:
+        queryset = queryset.exclude(id=exclude_id)
+    return queryset
+
+
+def free_workers(start, end, queryset=None):
+    """Active workers with no blocking deployment between start and end."""
+    if queryset is None:
+        queryset = HealthcareWorker.objects.filter(is_active=True)
+    busy = overlapping_deployments(start, end, Deployment.objects.filter(hcw=OuterRef("pk")))
+    return queryset.filter(~Exists(busy))
+
+
+def find_conflicts(proposals):
+    """
+    Check a batch of proposed deployments against each other and the database.
+
+    `proposals` is a list of dicts with hcw, start_date, end_date and an
+    optional id (for updates). Existing deployments for the batch's workers are
+    fetched in one query, then each worker's intervals are sorted and swept once,
+    so a batch costs O(n log n) instead of comparing every pair.
+    Returns a list of {"index", "hcw", "conflicts_with"} dicts.
+    """
+    if not proposals:
+        return []
+
+    hcw_ids = {p["hcw"] for p in proposals}
+    start = min(p["start_date"] for p in proposals)
+    ends = [p.get("end_date") for p in proposals]
+    end = None if any(e is None for e in ends) else max(ends)
+    replaced = {p["id"] for p in proposals if p.get("id")}
+
+    intervals = defaultdict(list)
+    existing = (
+        overlapping_deployments(start, end, Deployment.objects.filter(hcw_id__in=hcw_ids))
+        .exclude(id__in=replaced)
+        .values_list("id", "hcw_id", "start_date", "end_date")
+    )
+    for deployment_id, hcw_id, start_date, end_date in existing:
+        intervals[hcw_id].append((start_date, end_date, {"deployment": deployment_id}))
+    for index, p in enumerate(proposals):
+        intervals[p["hcw"]].append((p["start_date"], p.get("end_date"), {"index": index}))
+
+    conflicts = []
+    for hcw_id, items in intervals.items():
+        items.sort(key=lambda item: item[0])
+        # Sweep keeping the interval that reaches furthest so far.
+        reach_end, reach_ref = None, None
+        for start_date, end_date, ref in items:
+            overlaps = reach_ref is not None and (reach_end is None or start_date <= reach_end)
+            if overlaps:
+                for a, b in ((ref, reach_ref), (reach_ref, ref)):
+                    if "index" in a:
+                        conflicts.append({"index": a["index"], "hcw": hcw_id, "conflicts_with": b})
+            if reach_ref is None or reach_end is not None and (end_date is None or end_date > reach_end):
+                reach_end, reach_ref = end_date, ref
+
+    conflicts.sort(key=lambda c: c["index"])
+    return conflicts
@@ -5,8 +5,11 @@ from django.utils.timezone import localtime
 from .models import (
     District, Organization, Facility, Competency,
     HealthcareWorker, Training, AvailabilityRecord,
-    Deployment,DeploymentHistory
+    Deployment,DeploymentHistory, Job, RosterSnapshot, DuplicateCandidate, AuditEntry
 )
+from .scheduling import conflicting_deployments
+from .geo import get_distance_matrix, distance_band
+from .profiles import is_current
 
 
 class DistrictSerializer(serializers.ModelSerializer):
@@ -49,7 +52,7 @@ class HealthcareWorkerSerializer(serializers.ModelSerializer):
     class Meta:
         model = HealthcareWorker
         fields = [
-            "id", "national_id", "first_name", "last_name", "phone", "email",
+            "id", "national_id", "first_name", "last_name", "phone", "phone_e164", "email",
             "gender", "disability", "language", "position", "is_active",
             "facility","facility_details","organization", "organization_name",
             "created_at", "updated_at"
@@ -90,14 +93,149 @@ class DeploymentSerializer(serializers.ModelSerializer):
     district_name = serializers.CharField(source="district.name", read_only=True)
 
     hcw = HealthcareWorkerSerializer(read_only=True)
+    hcw_id = serializers.PrimaryKeyRelatedField(
+        source="hcw", queryset=HealthcareWorker.objects.all(), write_only=True, required=False
+    )
 
     class Meta:
         model = Deployment
         fields = [
-            "id", "hcw", "hcw_name", "district", "district_name",
+            "id", "hcw", "hcw_id", "hcw_name", "district", "district_name",
             "outbreak_type", "start_date", "end_date", "role",
             "status", "notes"
         ]
+
+    def validate(self, attrs):
+        instance = self.instance
+        hcw = attrs.get("hcw", getattr(instance, "hcw", None))
+        start_date = attrs.get("start_date", getattr(instance, "start_date", None))
+        end_date = attrs["end_date"] if "end_date" in attrs else getattr(instance, "end_date", None)
+        status = attrs.get("status", getattr(instance, "status", None))
+
+        if hcw is None:
+            raise serializers.ValidationError({"hcw_id": "Healthcare worker is required."})
+        if end_date and start_date and end_date < start_date:
+            raise serializers.ValidationError({"end_date": "End date cannot be before start date."})
+
+        if status != "archived":
+            conflicts = conflicting_deployments(
+                hcw.pk, start_date, end_date, exclude_id=getattr(instance, "pk", None)
+            ).values_list("id", flat=True)[:5]
+            if conflicts:
+                raise serializers.ValidationError({
+                    "non_field_errors": [f"{hcw} is already deployed during these dates."],
+                    "conflicting_deployments": list(conflicts),
+                })
+        return attrs
+class ProfileTrainingSerializer(serializers.ModelSerializer):
+    competency_code = serializers.CharField(source="competency.code", read_only=True)
+    competency_name = serializers.CharField(source="competency.name", read_only=True)
+
+    class Meta:
+        model = Training
+        fields = [
+            "id", "competency", "competency_code", "competency_name",
+            "provider", "date_completed", "valid_until", "certificate_file"
+        ]
+
+
+class ProfileAvailabilitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityRecord
+        fields = ["id", "status", "note", "location", "timestamp"]
+
+
+class ProfileDeploymentSerializer(serializers.ModelSerializer):
+    district_name = serializers.CharField(source="district.name", read_only=True)
+
+    class Meta:
+        model = Deployment
+        fields = [
+            "id", "district", "district_name", "outbreak_type",
+            "start_date", "end_date", "role", "status", "notes"
+        ]
+
+
+class WorkerProfileSerializer(HealthcareWorkerSerializer):
+    """Worker with everything ViewDetail shows, from profiles.profile_queryset()."""
+    trainings = ProfileTrainingSerializer(many=True, read_only=True)
+    recent_availability = ProfileAvailabilitySerializer(many=True, read_only=True)
+    current_deployments = serializers.SerializerMethodField()
+    past_deployments = serializers.SerializerMethodField()
+
+    class Meta(HealthcareWorkerSerializer.Meta):
+        fields = HealthcareWorkerSerializer.Meta.fields + [
+            "trainings", "recent_availability", "current_deployments", "past_deployments"
+        ]
+
+    def _deployments(self, obj, current):
+        # Uses the prefetched list, filtering the manager would query again.
+        return ProfileDeploymentSerializer(
+            [d for d in obj.deployments.all() if is_current(d) == current], many=True
+        ).data
+
+    def get_current_deployments(self, obj):
+        return self._deployments(obj, True)
+
+    def get_past_deployments(self, obj):
+        return self._deployments(obj, False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "progress", "progress_message", "result", "error",
+            "attempts", "max_attempts", "run_after", "created_at", "finished_at"
+        ]
+        read_only_fields = fields
+
+
+class RosterSnapshotSerializer(serializers.ModelSerializer):
+    district_name = serializers.CharField(source="district.name", read_only=True, default=None)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RosterSnapshot
+        fields = ["key", "district", "district_name", "version", "size", "rows", "built_at", "download_url"]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        request = self.context.get("request")
+        url = f"/api/snapshots/{obj.key}/download/"
+        return request.build_absolute_uri(url) if request else url
+
+
+class DuplicateWorkerSerializer(serializers.ModelSerializer):
+    facility_name = serializers.CharField(source="facility.name", read_only=True, default=None)
+
+    class Meta:
+        model = HealthcareWorker
+        fields = ["id", "national_id", "first_name", "last_name", "phone", "email", "position", "facility_name"]
+
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    worker_a = DuplicateWorkerSerializer(read_only=True)
+    worker_b = DuplicateWorkerSerializer(read_only=True)
+
+    class Meta:
+        model = DuplicateCandidate
+        fields = [
+            "id", "worker_a", "worker_b", "score", "reasons", "status", "created_at", "reviewed_at", "reviewed_by",
+            "removed_worker_id", "removed_worker_name",
+        ]
+        read_only_fields = fields
+
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True, default=None)
+
+    class Meta:
+        model = AuditEntry
+        fields = ["id", "entity", "object_id", "action", "changes", "user", "username", "timestamp"]
+        read_only_fields = fields
+
+
 class DeploymentHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = DeploymentHistory
@@ -127,6 +265,14 @@ class DeploymentWizardRequestSerializer(serializers.Serializer):
     estimated_duration_days = serializers.IntegerField(min_value=1, max_value=365, default=30)
 
 
+class PlannedDeploymentSerializer(serializers.ModelSerializer):
+    """A proposal accepted from the batch planner."""
+
+    class Meta:
+        model = Deployment
+        fields = ["hcw", "district", "outbreak_type", "start_date", "end_date", "role", "notes"]
+
+
 
 
 
@@ -165,9 +311,8 @@ class HealthcareWorkerTableSerializer(serializers.ModelSerializer):
 
     def get_latest_availability(self, obj):
     
-        latest = getattr(obj, "latest_availability", None)
-        if latest:
-            return latest
+        if hasattr(obj, "latest_availability"):
+            return obj.latest_availability
         rec = obj.availability_records.order_by("-timestamp").first()
         if not rec:
             return None
@@ -181,30 +326,65 @@ class HealthcareWorkerTableSerializer(serializers.ModelSerializer):
         score = 0
         
         if requested_competency_id:
-            if obj.trainings.filter(competency_id=requested_competency_id).exists():
+            trainings = getattr(obj, "prefetched_trainings", None)
+            if trainings is not None:
+                trained = any(t.competency_id == requested_competency_id for t in trainings)
+            else:
+                trained = obj.trainings.filter(competency_id=requested_competency_id).exists()
+            if trained:
                 score += 70
     
-        latest = obj.availability_records.order_by("-timestamp").first()
-        if latest and latest.status == "available":
+        latest = self.get_latest_availability(obj)
+        if latest and latest["status"] == "available":
             score += 30
     
         return min(100, score)
 class DeploymentCandidateSerializer(HealthcareWorkerTableSerializer):
     
     distance_from_outbreak = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+    travel_time_hours = serializers.SerializerMethodField()
     deployment_readiness = serializers.SerializerMethodField()
     
     class Meta(HealthcareWorkerTableSerializer.Meta):
         fields = HealthcareWorkerTableSerializer.Meta.fields + [
-            'distance_from_outbreak', 'deployment_readiness'
+            'distance_from_outbreak', 'distance_km', 'travel_time_hours', 'deployment_readiness'
         ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._travel_by_worker = {}
+
+    def _travel(self, obj):
+        # Three fields need it, look it up once per worker.
+        if obj.pk not in self._travel_by_worker:
+            self._travel_by_worker[obj.pk] = self._lookup_travel(obj)
+        return self._travel_by_worker[obj.pk]
+
+    def _lookup_travel(self, obj):
+        # Compare ids against the in-memory matrix, never the related objects.
+        outbreak_district = self.context.get('outbreak_district')
+        outbreak_id = getattr(outbreak_district, "pk", outbreak_district)
+        if outbreak_id is None or not obj.facility_id:
+            return None, None
+        # Callers select_related the facility, otherwise read just its district id.
+        if HealthcareWorker.facility.is_cached(obj):
+            worker_district_id = obj.facility.district_id
+        else:
+            worker_district_id = Facility.objects.filter(pk=obj.facility_id).values_list('district_id', flat=True).first()
+        if worker_district_id is None:
+            return None, None
+        return get_distance_matrix().between(worker_district_id, outbreak_id)
     
     def get_distance_from_outbreak(self, obj):
-    
-        outbreak_district = self.context.get('outbreak_district')
-        if obj.facility and obj.facility.district == outbreak_district:
-            return "Same District"
-        return "Different District"
+        km, _ = self._travel(obj)
+        return distance_band(km)
+
+    def get_distance_km(self, obj):
+        return self._travel(obj)[0]
+
+    def get_travel_time_hours(self, obj):
+        return self._travel(obj)[1]
     
     def get_deployment_readiness(self, obj):
 
@@ -0,0 +1,241 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from WorkForceTrained import audit, autocomplete, counters, dedupe, events, forecast, profiles, rollups, snapshots
+from WorkForceTrained.geo import get_distance_matrix
+from WorkForceTrained.models import (
+    AvailabilityRecord, Competency, Deployment, DeploymentHistory, District, Facility,
+    HealthcareWorker, Organization, Training
+)
+from WorkForceTrained.sync import record_tombstone
+
+# Fields whose previous values are kept on each instance so saves can
+# compute counter deltas and forecast changes without re-reading the row.
+# Worker and training totals come from the rollup cubes, not counters.
+TRACKED_FIELDS = {
+    HealthcareWorker: ("facility_id", "is_active"),
+    Facility: ("district_id", "facility_type"),
+}
+UNKNOWN = object()
+REFERENCE_METRICS = {Organization: "organizations", Competency: "competencies"}
+# Models served through DeltaSyncMixin, deletions are kept for delta clients.
+SYNCED_MODELS = (
+    District, Organization, Facility, Competency, HealthcareWorker, Training,
+    AvailabilityRecord, Deployment, DeploymentHistory,
+)
+
+
+@receiver([post_save, post_delete], sender=District)
+def reset_distance_matrix(sender, **kwargs):
+    get_distance_matrix.cache_clear()
+
+
+def leave_tombstone(sender, instance, **kwargs):
+    record_tombstone(instance)
+
+
+# Connected per model, a receiver without a sender would turn every model's
+# bulk delete into one-by-one deletes.
+for _model in SYNCED_MODELS:
+    post_delete.connect(leave_tombstone, sender=_model, dispatch_uid=f"tombstone-{_model._meta.label_lower}")
+
+
+def _snapshot(instance):
+    fields = TRACKED_FIELDS[type(instance)]
+    # Read __dict__ directly, touching a deferred field would cost a query.
+    if not all(f in instance.__dict__ for f in fields):
+        return UNKNOWN
+    return tuple(instance.__dict__[f] for f in fields)
+
+
+def _current(instance):
+    """
+    State after a save. Fields still deferred were not written, so they keep
+    the values loaded in pre_save.
+    """
+    old = instance._counted_state
+    fields = TRACKED_FIELDS[type(instance)]
+    return tuple(
+        instance.__dict__[f] if f in instance.__dict__ else (old[i] if old else None)
+        for i, f in enumerate(fields)
+    )
+
+
+@receiver(post_init, sender=HealthcareWorker)
+@receiver(post_init, sender=Facility)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._counted_state = _snapshot(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=HealthcareWorker)
+@receiver(pre_save, sender=Facility)
+def load_unknown_state(sender, instance, **kwargs):
+    if getattr(instance, "_counted_state", None) is UNKNOWN:
+        fields = TRACKED_FIELDS[sender]
+        instance._counted_state = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _facility_districts(*facility_ids):
+    ids = {f for f in facility_ids if f}
+    return dict(Facility.objects.filter(id__in=ids).values_list("id", "district_id")) if ids else {}
+
+
+@receiver(post_save, sender=HealthcareWorker)
+def remember_saved_state(sender, instance, **kwargs):
+    instance._counted_state = _current(instance)
+
+
+@receiver(post_save, sender=Facility)
+def count_facility_save(sender, instance, **kwargs):
+    old, new = instance._counted_state, _current(instance)
+    if old == new:
+        return
+    counters.apply(counters.diff(counters.facility_keys(*old) if old else [], counters.facility_keys(*new)))
+    instance._counted_state = new
+
+
+@receiver(pre_delete, sender=Facility)
+def count_facility_delete(sender, instance, **kwargs):
+    counters.apply(counters.diff(counters.facility_keys(instance.district_id, instance.facility_type), []))
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Competency)
+def count_reference_create(sender, instance, created, **kwargs):
+    if created:
+        counters.apply({(REFERENCE_METRICS[sender], *counters.ALL): 1})
+
+
+@receiver(pre_delete, sender=Organization)
+def count_organization_delete(sender, instance, **kwargs):
+    counters.apply({("organizations", *counters.ALL): -1})
+
+
+@receiver(pre_delete, sender=Competency)
+def count_competency_delete(sender, instance, **kwargs):
+    counters.apply({("competencies", *counters.ALL): -1})
+
+
+@receiver(post_save, sender=AvailabilityRecord)
+def push_availability_save(sender, instance, created, **kwargs):
+    events.publish_after_commit(events.availability_events([instance], "created" if created else "updated"))
+
+
+@receiver(post_delete, sender=AvailabilityRecord)
+def push_availability_delete(sender, instance, **kwargs):
+    events.publish_after_commit(events.availability_events([instance], "deleted"))
+
+
+@receiver(post_save, sender=Deployment)
+def push_deployment_save(sender, instance, created, **kwargs):
+    events.publish_after_commit(events.deployment_events([instance], "created" if created else "updated"))
+
+
+@receiver(post_delete, sender=Deployment)
+def push_deployment_delete(sender, instance, **kwargs):
+    events.publish_after_commit(events.deployment_events([instance], "deleted"))
+
+
+@receiver(post_save, sender=HealthcareWorker)
+def push_worker_save(sender, instance, created, **kwargs):
+    events.publish_after_commit(events.worker_events([instance], "created" if created else "updated"))
+
+
+@receiver(pre_delete, sender=HealthcareWorker)
+def push_worker_delete(sender, instance, **kwargs):
+    # The facility link is gone once the delete commits, so resolve it now.
+    district = _facility_districts(instance.facility_id).get(instance.facility_id)
+    events.publish_after_commit(events.worker_events([instance], "deleted", {instance.pk: district}))
+
+
+@receiver(pre_save, sender=HealthcareWorker)
+def forecast_worker_change(sender, instance, **kwargs):
+    old = instance._counted_state
+    if old is None:
+        return  # new workers have no certifications yet
+    facility_id = instance.__dict__.get("facility_id", old[0])
+    is_active = instance.__dict__.get("is_active", old[1])
+    if old != (facility_id, is_active):
+        districts = _facility_districts(old[0], facility_id)
+        forecast.mark_dirty({districts.get(old[0]), districts.get(facility_id)})
+
+
+@receiver(post_save, sender=Training)
+@receiver(pre_delete, sender=Training)
+@receiver(post_save, sender=Deployment)
+@receiver(pre_delete, sender=Deployment)
+def forecast_commitment_change(sender, instance, **kwargs):
+    forecast.mark_dirty(forecast.worker_districts([instance.hcw_id]))
+
+
+@receiver([post_save, post_delete], sender=HealthcareWorker)
+@receiver([post_save, post_delete], sender=Training)
+@receiver([post_save, post_delete], sender=Facility)
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=Organization)
+@receiver([post_save, post_delete], sender=Competency)
+def refresh_rollups_change(sender, **kwargs):
+    rollups.mark_dirty()
+
+
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=Organization)
+@receiver([post_save, post_delete], sender=Competency)
+@receiver([post_save, post_delete], sender=Facility)
+@receiver([post_save, post_delete], sender=HealthcareWorker)
+@receiver([post_save, post_delete], sender=Training)
+@receiver([post_save, post_delete], sender=AvailabilityRecord)
+def stale_roster_snapshots(sender, **kwargs):
+    snapshots.mark_stale()
+
+
+@receiver(post_save, sender=HealthcareWorker)
+def dedupe_worker_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(dedupe.MATCH_FIELDS):
+        dedupe.mark_dirty([instance.pk])
+
+
+@receiver(pre_delete, sender=HealthcareWorker)
+def dedupe_worker_delete(sender, instance, **kwargs):
+    dedupe.forget_pending(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=Facility)
+@receiver([post_save, post_delete], sender=Organization)
+@receiver([post_save, post_delete], sender=Competency)
+def reset_autocomplete(sender, **kwargs):
+    autocomplete.forget(sender)
+
+
+@receiver(post_init, sender=HealthcareWorker)
+@receiver(post_init, sender=Training)
+@receiver(post_init, sender=Deployment)
+def remember_audited_state(sender, instance, **kwargs):
+    instance._audit_state = audit.snapshot(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=HealthcareWorker)
+@receiver(post_save, sender=Training)
+@receiver(post_save, sender=Deployment)
+def audit_save(sender, instance, created, **kwargs):
+    audit.record_saved(instance, created)
+
+
+@receiver(post_delete, sender=HealthcareWorker)
+@receiver(post_delete, sender=Training)
+@receiver(post_delete, sender=Deployment)
+def audit_delete(sender, instance, **kwargs):
+    audit.record_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=HealthcareWorker)
+def reset_worker_profile(sender, instance, **kwargs):
+    profiles.forget([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Training)
+@receiver([post_save, post_delete], sender=AvailabilityRecord)
+@receiver([post_save, post_delete], sender=Deployment)
+def reset_related_profile(sender, instance, **kwargs):
+    profiles.forget([instance.hcw_id])
@@ -0,0 +1,220 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from WorkForceTrained.models import (
+    AvailabilityRecord, Competency, District, Facility, HealthcareWorker,
+    Job, Organization, RosterSnapshot, Training,
+)
+
+NATIONAL = "national"
+# Bundles live in default storage, which the job worker writes and the web
+# process serves from.
+STORAGE_DIR = "snapshots"
+FORMAT_VERSION = 1
+# Rows per columnar chunk, also the iterator fetch size.
+CHUNK_ROWS = 2000
+
+# (table, queryset factory, columns). Each factory takes the district or None.
+TABLES = (
+    ("districts", lambda d: District.objects.filter(**({"pk": d.pk} if d else {})),
+     ("id", "code", "name")),
+    ("organizations", lambda d: Organization.objects.all(),
+     ("id", "name", "contact_phone")),
+    ("competencies", lambda d: Competency.objects.all(),
+     ("id", "code", "name")),
+    ("facilities", lambda d: Facility.objects.filter(**({"district": d} if d else {})),
+     ("id", "code", "name", "facility_type", "district_id", "organization_id")),
+    ("workers", lambda d: HealthcareWorker.objects.filter(**({"facility__district": d} if d else {})),
+     ("id", "first_name", "last_name", "phone", "gender", "position", "language",
+      "is_active", "facility_id", "organization_id")),
+    ("trainings", lambda d: Training.objects.filter(**({"hcw__facility__district": d} if d else {})),
+     ("id", "hcw_id", "competency_id", "date_completed", "valid_until")),
+)
+
+# Sources whose (row count, last update) decide whether a district bundle is stale.
+DISTRICT_SOURCES = (
+    (Facility.objects.all(), "district_id"),
+    (HealthcareWorker.objects.all(), "facility__district_id"),
+    (Training.objects.all(), "hcw__facility__district_id"),
+    (AvailabilityRecord.objects.all(), "hcw__facility__district_id"),
+)
+SHARED_SOURCES = (District, Organization, Competency)
+
+
+def _shared_state():
+    return [
+        list(model.objects.aggregate(n=Count("pk"), last=Max("updated_at")).values())
+        for model in SHARED_SOURCES
+    ]
+
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def fingerprints():
+    """
+    {key: fingerprint} for every district and the national bundle, from one
+    grouped count/max(updated_at) query per source table.
+    """
+    shared = _shared_state()
+    per_district = {}
+    for queryset, district_field in DISTRICT_SOURCES:
+        rows = queryset.values(district_field).annotate(n=Count("pk"), last=Max("updated_at"))
+        for row in rows:
+            per_district.setdefault(row[district_field], []).append(
+                [queryset.model._meta.model_name, row["n"], row["last"]]
+            )
+
+    result = {}
+    for district_id, code in District.objects.values_list("id", "code"):
+        result[code] = _hash(shared, sorted(per_district.get(district_id, []), key=lambda r: r[0]))
+    # Workers without a facility only appear nationally, so hash every group.
+    result[NATIONAL] = _hash(shared, sorted(
+        (str(k), v) for k, v in per_district.items()
+    ))
+    return result
+
+
+def _latest_availability(district):
+    """Current status per worker, streamed in hcw order and deduplicated on the fly."""
+    queryset = AvailabilityRecord.objects.all()
+    if district:
+        queryset = queryset.filter(hcw__facility__district=district)
+    last_hcw = None
+    rows = queryset.order_by("hcw_id", "-timestamp", "-id").values_list(
+        "hcw_id", "status", "location", "timestamp"
+    )
+    for row in rows.iterator(chunk_size=CHUNK_ROWS):
+        if row[0] != last_hcw:
+            last_hcw = row[0]
+            yield row
+
+
+def _write_table(out, table, columns, rows):
+    """Write rows as columnar chunks, one JSON line each. Returns the row count."""
+    count = 0
+    chunk = []
+
+    def flush():
+        out.write(json.dumps(
+            {"table": table, "columns": dict(zip(columns, map(list, zip(*chunk))))},
+            cls=DjangoJSONEncoder, separators=(",", ":"),
+        ))
+        out.write("\n")
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_ROWS:
+            flush()
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        flush()
+        count += len(chunk)
+    return count
+
+
+def write_bundle(path, key, district, fingerprint):
+    """
+    Stream the roster into a gzip'd NDJSON file: a header line, then columnar
+    chunks per table. Nothing is held in memory beyond one chunk.
+    """
+    counts = {}
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as out:
+        out.write(json.dumps({
+            "format": "roster-snapshot",
+            "format_version": FORMAT_VERSION,
+            "key": key,
+            "generated_at": timezone.now(),
+            "fingerprint": fingerprint,
+        }, cls=DjangoJSONEncoder))
+        out.write("\n")
+        for table, queryset, columns in TABLES:
+            rows = queryset(district).order_by("pk").values_list(*columns).iterator(chunk_size=CHUNK_ROWS)
+            counts[table] = _write_table(out, table, columns, rows)
+        counts["availability"] = _write_table(
+            out, "availability", ("hcw_id", "status", "location", "timestamp"),
+            _latest_availability(district),
+        )
+    return counts
+
+
+def build_snapshot(key, fingerprint):
+    district = None if key == NATIONAL else District.objects.get(code=key)
+    previous = RosterSnapshot.objects.filter(key=key).first()
+    version = previous.version + 1 if previous else 1
+
+    handle, partial = tempfile.mkstemp(suffix=".ndjson.gz")
+    os.close(handle)
+    try:
+        counts = write_bundle(partial, key, district, fingerprint)
+        size = os.path.getsize(partial)
+        with open(partial, "rb") as f:
+            path = default_storage.save(f"{STORAGE_DIR}/{key}.v{version}.ndjson.gz", File(f))
+    finally:
+        os.unlink(partial)
+
+    # stale is left alone, a write during the build has already set it again.
+    RosterSnapshot.objects.update_or_create(key=key, defaults={
+        "district": district,
+        "fingerprint": fingerprint,
+        "version": version,
+        "path": path,
+        "size": size,
+        "rows": counts,
+        "built_at": timezone.now(),
+    })
+    if previous and previous.path != path:
+        default_storage.delete(previous.path)
+    return version
+
+
+def build_snapshots(keys=None, force=False, progress=None):
+    """Rebuild the bundles whose data changed since their last build."""
+    # Cleared before reading, so writes from here on mark the bundles again.
+    RosterSnapshot.objects.filter(**({"key__in": keys} if keys else {})).update(stale=False)
+    current = fingerprints()
+    keys = [k for k in (keys or current) if k in current]
+    stored = {key: (fingerprint, path) for key, fingerprint, path
+              in RosterSnapshot.objects.values_list("key", "fingerprint", "path")}
+    stale = [
+        k for k in keys
+        if force or k not in stored or stored[k][0] != current[k] or not default_storage.exists(stored[k][1])
+    ]
+
+    built = {}
+    for done, key in enumerate(stale, start=1):
+        built[key] = build_snapshot(key, current[key])
+        if progress:
+            progress(done, len(stale), f"Built {key} snapshot")
+    return {"built": built, "unchanged": len(keys) - len(stale)}
+
+
+def mark_stale():
+    """
+    Flag every bundle once the current transaction commits. The build job
+    compares fingerprints and only rebuilds the bundles that really changed.
+    """
+    transaction.on_commit(
+        lambda: RosterSnapshot.objects.filter(stale=False).update(stale=True)
+    )
+
+
+def rebuild_in_background():
+    """Queue a build of every stale bundle unless one is already waiting."""
+    from WorkForceTrained.jobs import enqueue
+
+    if Job.objects.filter(kind="build_snapshots", status="queued").exists():
+        return None
+    return enqueue("build_snapshots")
@@ -0,0 +1,107 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+
+from WorkForceTrained.models import Tombstone
+
+SYNC_TOKEN_SALT = "workforce.sync"
+# Tokens point slightly into the past so rows committed while a response was
+# being built are sent again next time instead of being missed.
+SYNC_OVERLAP = timedelta(seconds=5)
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, "TOMBSTONE_RETENTION_DAYS", DEFAULT_TOMBSTONE_RETENTION_DAYS))
+
+
+def issue_sync_token(now=None):
+    now = now or timezone.now()
+    return signing.dumps({"since": (now - SYNC_OVERLAP).isoformat()}, salt=SYNC_TOKEN_SALT, compress=True)
+
+
+def parse_updated_since(value):
+    """
+    Accept a sync token issued by this server or a plain ISO 8601 timestamp.
+    Returns an aware datetime or raises ValueError.
+    """
+    try:
+        since = signing.loads(value, salt=SYNC_TOKEN_SALT)["since"]
+    except (signing.BadSignature, KeyError, TypeError):
+        since = value
+    parsed = parse_datetime(since) if isinstance(since, str) else None
+    if parsed is None:
+        raise ValueError("updated_since must be a sync token or an ISO 8601 datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def tombstone_label(model):
+    return model._meta.label_lower
+
+
+def record_tombstone(instance):
+    Tombstone.objects.create(model=tombstone_label(type(instance)), object_id=instance.pk)
+
+
+def prune_tombstones():
+    return Tombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()[0]
+
+
+class DeltaSyncMixin:
+    """
+    Adds ?updated_since=<sync token | ISO datetime> to a viewset's list action.
+
+    Delta responses contain the rows changed since then, the ids of rows that
+    were deleted or no longer match the request's filters, and a new
+    sync_token for the next call. Every list response also carries the
+    current token in the X-Sync-Token header so a full fetch can seed it.
+    """
+
+    def list(self, request, *args, **kwargs):
+        now = timezone.now()
+        value = request.query_params.get("updated_since")
+        if not value:
+            response = super().list(request, *args, **kwargs)
+            response["X-Sync-Token"] = issue_sync_token(now)
+            return response
+
+        try:
+            since = parse_updated_since(value)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if since < now - tombstone_retention():
+            # Deletions that old have been pruned, a delta could miss some.
+            return Response(
+                {"error": "updated_since is too old, fetch the full list again", "resync": True},
+                status=410,
+            )
+
+        model = self.get_queryset().model
+        queryset = self.filter_queryset(self.get_queryset())
+        changed = queryset.filter(updated_at__gt=since).order_by("updated_at")
+        serializer = self.get_serializer(changed, many=True)
+
+        # Rows that changed but fell out of this view's filters (e.g. an
+        # archived deployment) count as removed for this client.
+        left = (
+            model.objects.filter(updated_at__gt=since)
+            .exclude(pk__in=queryset.values("pk"))
+            .values_list("pk", flat=True)
+        )
+        deleted = Tombstone.objects.filter(
+            model=tombstone_label(model), deleted_at__gt=since
+        ).values_list("object_id", flat=True)
+
+        response = Response({
+            "results": serializer.data,
+            "deleted": sorted(set(deleted) | set(left)),
+            "sync_token": issue_sync_token(now),
+        })
+        response["X-Sync-Token"] = response.data["sync_token"]
+        return response
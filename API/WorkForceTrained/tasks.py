@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.utils import timezone
+
+from WorkForceTrained import audit, dedupe, events, exports, forecast, profiles, rollups, snapshots
+from WorkForceTrained.jobs import job_handler
+from WorkForceTrained.models import Deployment, DeploymentHistory
+
+ARCHIVE_BATCH_SIZE = 500
+
+
+@job_handler("archive_deployments")
+def archive_deployments(payload, progress):
+    """Move every active deployment into DeploymentHistory, in batches."""
+    completion_notes = payload.get("completion_notes", "")
+    archived_by_id = payload.get("archived_by")
+
+    active = Deployment.objects.filter(status="active")
+    total = active.count()
+    archived_count = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                active.select_related("hcw", "district")
+                .select_for_update(of=("self",))
+                .order_by("id")[:ARCHIVE_BATCH_SIZE]
+            )
+            if not batch:
+                break
+
+            DeploymentHistory.objects.bulk_create([
+                DeploymentHistory(
+                    hcw_name=f"{deployment.hcw.first_name} {deployment.hcw.last_name}",
+                    hcw_phone=deployment.hcw.phone,
+                    hcw_email=deployment.hcw.email,
+                    hcw_position=deployment.hcw.position,
+                    district_name=deployment.district.name,
+                    outbreak_type=deployment.outbreak_type,
+                    start_date=deployment.start_date,
+                    end_date=deployment.end_date,
+                    role=deployment.role,
+                    notes=deployment.notes,
+                    original_deployment_id=deployment.id,
+                    archived_by_id=archived_by_id,
+                    completion_notes=completion_notes,
+                )
+                for deployment in batch
+            ])
+            Deployment.objects.filter(id__in=[d.id for d in batch]).update(
+                status="archived", updated_at=timezone.now()
+            )
+            audit.record_bulk_updated(Deployment, [d.id for d in batch], {"status": ["active", "archived"]})
+            for deployment in batch:
+                deployment.status = "archived"
+            events.publish_after_commit(events.deployment_events(batch, "archived"))
+            forecast.mark_dirty(forecast.worker_districts({d.hcw_id for d in batch}))
+            profiles.forget(d.hcw_id for d in batch)
+
+        archived_count += len(batch)
+        progress(archived_count, max(total, archived_count), f"Archived {archived_count} deployments")
+
+    return {
+        "message": f"Successfully archived {archived_count} deployments",
+        "archived_count": archived_count,
+    }
+
+
+@job_handler("refresh_rollups")
+def refresh_rollups(payload, progress):
+    timings = rollups.refresh(payload.get("names"))
+    return {"refreshed": timings}
+
+
+@job_handler("build_snapshots")
+def build_roster_snapshots(payload, progress):
+    return snapshots.build_snapshots(payload.get("keys"), force=payload.get("force", False), progress=progress)
+
+
+@job_handler("refresh_forecast")
+def refresh_workforce_forecast(payload, progress):
+    return forecast.refresh_forecast(payload.get("districts"))
+
+
+@job_handler("find_duplicates")
+def find_duplicate_workers(payload, progress):
+    return dedupe.find_duplicates(payload.get("workers"), progress=progress)
+
+
+@job_handler("export_columnar")
+def export_columnar(payload, progress):
+    exports.prune_downloads()
+    progress(0, message=f"Exporting {payload['table']}")
+    return exports.build_download(payload["table"], payload["file_format"], payload.get("partition", False))
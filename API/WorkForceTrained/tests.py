@@ -1,3 +1,1323 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from itertools import product
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.paginator import EmptyPage
+from django.db import connection, transaction
+from django.db.models.deletion import Collector
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import autocomplete, counters, dedupe, exports, jobs, querystats, snapshots
+from .assignment import solve_assignment
+from .dedupe import blocking_keys, find_duplicates, score_pair, soundex
+from .events import issue_ticket, redeem_ticket
+from .forecast import compute_forecast
+from .geo import _simplify_line, load_district_shapes, simplified_geometry
+from .models import (
+    AuditEntry, AvailabilityRecord, Competency, DedupeKey, Deployment, District, DuplicateCandidate, Facility,
+    HealthcareWorker, Job, Organization, QueryStat, RosterSnapshot, StreamTicket, Tombstone, Training, WorkforceCounter,
+)
+from .pagination import EstimatedCountPaginator
+from .phones import normalize_phone
+from .reference_data import ReferenceDataError, load_reference_data
+from .scheduling import find_conflicts
+from .sync import issue_sync_token, parse_updated_since
+from .throttling import endpoint_cost, record_endpoint_cost
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("sync"))
+        district = District.objects.create(code="LL", name="Lilongwe")
+        self.facility = Facility.objects.create(name="Area 25", facility_type="clinic", district=district)
+        self.worker = HealthcareWorker.objects.create(
+            first_name="Chisomo", last_name="Banda", phone="0991234567", facility=self.facility
+        )
+
+    def test_naive_timestamp_is_read_as_utc(self):
+        parsed = parse_updated_since("2026-10-01T00:00:00")
+        self.assertTrue(timezone.is_aware(parsed))
+        self.assertEqual(parsed.utcoffset(), timedelta(0))
+
+    def test_naive_updated_since_returns_changes(self):
+        since = (timezone.now() - timedelta(hours=1)).replace(tzinfo=None).isoformat()
+        response = self.client.get("/api/hcws/", {"updated_since": since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.worker.pk])
+
+    def test_token_returns_only_later_changes_and_deletions(self):
+        token = issue_sync_token(timezone.now() + timedelta(seconds=10))
+        other = HealthcareWorker.objects.create(first_name="Tamanda", last_name="Phiri", phone="0888000111")
+        HealthcareWorker.objects.filter(pk=other.pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        deleted_id = self.worker.pk
+        self.worker.delete()
+        Tombstone.objects.filter(object_id=deleted_id).update(deleted_at=timezone.now() + timedelta(minutes=1))
+
+        response = self.client.get("/api/hcws/", {"updated_since": token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [other.pk])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+        self.assertIn("sync_token", response.data)
+
+    def test_unparseable_updated_since_is_rejected(self):
+        response = self.client.get("/api/hcws/", {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unsynced_models_keep_fast_delete(self):
+        collector = Collector(using="default")
+        for model in (Tombstone, AuditEntry, QueryStat):
+            self.assertTrue(collector.can_fast_delete(model.objects.all()), model)
+
+
+class EstimatedPaginationTests(TestCase):
+    def setUp(self):
+        HealthcareWorker.objects.bulk_create(
+            HealthcareWorker(first_name=f"W{i:02}", last_name="Test", phone=f"099100{i:04}") for i in range(25)
+        )
+        self.queryset = HealthcareWorker.objects.order_by("id")
+
+    def paginator(self, estimate):
+        patcher = mock.patch("WorkForceTrained.pagination.approximate_count", return_value=(estimate, True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return EstimatedCountPaginator(self.queryset, 10)
+
+    def test_rows_past_an_underestimate_stay_reachable(self):
+        paginator = self.paginator(5)
+        first = paginator.page(1)
+        self.assertTrue(first.has_next())
+        self.assertEqual(first.next_page_number(), 2)
+        last = paginator.page(3)
+        self.assertEqual(len(last.object_list), 5)
+        self.assertFalse(last.has_next())
+        self.assertEqual(paginator.count, 25)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_overestimate_ends_at_the_last_row(self):
+        paginator = self.paginator(1000)
+        self.assertTrue(paginator.page(2).has_next())
+        self.assertFalse(paginator.page(3).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_exact_counts_paginate_as_usual(self):
+        paginator = EstimatedCountPaginator(self.queryset, 10)
+        self.assertEqual(paginator.count, 25)
+        self.assertFalse(paginator.count_is_estimate)
+        self.assertFalse(paginator.page(3).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_api_serves_pages_past_the_estimate(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("pages"))
+        with mock.patch("WorkForceTrained.pagination.approximate_count", return_value=(5, True)):
+            response = client.get("/api/hcws/", {"page": 2, "page_size": 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["count_is_estimate"])
+        self.assertIsNotNone(response.data["next"])
+
+
+class StreamTicketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("stream")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ticket_opens_one_stream(self):
+        response = self.client.post("/api/events/ticket/")
+        self.assertEqual(response.status_code, 201)
+        key = response.data["ticket"]
+        self.assertEqual(redeem_ticket(key), self.user)
+        self.assertIsNone(redeem_ticket(key))
+
+    def test_expired_ticket_is_refused(self):
+        ticket = issue_ticket(self.user)
+        StreamTicket.objects.filter(pk=ticket.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(redeem_ticket(ticket.key))
+
+    def test_stream_refuses_access_token_in_url(self):
+        response = APIClient().get("/api/events/", {"token": "anything"})
+        self.assertEqual(response.status_code, 401)
+
+
+class AvailableCandidatesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("planner"))
+        self.lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        self.blantyre = District.objects.create(code="BL", name="Blantyre")
+        self.competency = Competency.objects.create(code="IPC", name="Infection prevention")
+        self.near = self.worker("Near", self.blantyre, trained=True, status="available")
+        self.far = self.worker("Far", self.lilongwe)
+
+    def worker(self, name, district, trained=False, status=None):
+        facility = Facility.objects.create(name=f"{name} clinic", facility_type="clinic", district=district)
+        worker = HealthcareWorker.objects.create(
+            first_name=name, last_name="Worker", phone=f"099{len(name):07}{HealthcareWorker.objects.count()}",
+            facility=facility,
+        )
+        if trained:
+            Training.objects.create(hcw=worker, competency=self.competency, date_completed="2026-01-01")
+        if status:
+            AvailabilityRecord.objects.create(hcw=worker, status=status)
+        return worker
+
+    def candidates(self):
+        return self.client.get("/api/deployments/available_workers/", {
+            "start_date": "2026-11-01", "outbreak_district": self.blantyre.pk, "competency": self.competency.pk,
+        })
+
+    def test_nearest_first_with_travel_and_readiness(self):
+        response = self.candidates()
+        self.assertEqual(response.status_code, 200)
+        rows = response.data["results"]
+        self.assertEqual([row["id"] for row in rows], [self.near.pk, self.far.pk])
+        self.assertEqual(rows[0]["distance_from_outbreak"], "Same District")
+        self.assertEqual(rows[0]["distance_km"], 0.0)
+        self.assertEqual(rows[0]["deployment_readiness"], "High")
+        self.assertGreater(rows[1]["distance_km"], 200)
+        self.assertGreater(rows[1]["travel_time_hours"], 0)
+        self.assertEqual(rows[1]["deployment_readiness"], "Low")
+
+    def test_queries_do_not_grow_with_the_page(self):
+        self.candidates()  # builds the distance matrix
+        with CaptureQueriesContext(connection) as two:
+            self.candidates()
+        for i in range(3):
+            self.worker(f"Extra{i}", self.lilongwe, trained=True, status="available")
+        with CaptureQueriesContext(connection) as five:
+            self.assertEqual(len(self.candidates().data["results"]), 5)
+        self.assertEqual(len(five), len(two))
+
+
+class WorkerProfileCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("profiles"))
+        self.worker = HealthcareWorker.objects.create(first_name="Kondwani", last_name="Mwale", phone="0881234567")
+        self.url = f"/api/hcws/{self.worker.pk}/profile/"
+        self.addCleanup(cache.clear)
+
+    def test_cached_profile_costs_no_profile_query(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertFalse([q for q in queries if "healthcareworker" in q["sql"]])
+
+    def test_saving_the_worker_moves_the_profile_key(self):
+        self.client.get(self.url)
+        self.worker.first_name = "Kondie"
+        self.worker.save()
+        self.assertEqual(self.client.get(self.url).data["first_name"], "Kondie")
+
+    def test_new_training_moves_the_profile_key(self):
+        self.client.get(self.url)
+        competency = Competency.objects.create(code="CHL", name="Cholera case management")
+        Training.objects.create(hcw=self.worker, competency=competency, date_completed="2026-09-01")
+        self.assertEqual(len(self.client.get(self.url).data["trainings"]), 1)
+
+    def test_check_in_leaves_the_worker_row_alone(self):
+        before = HealthcareWorker.objects.get(pk=self.worker.pk).updated_at
+        AvailabilityRecord.objects.create(hcw=self.worker, status="available")
+        self.assertEqual(HealthcareWorker.objects.get(pk=self.worker.pk).updated_at, before)
+        self.assertEqual(self.client.get(self.url).data["recent_availability"][0]["status"], "available")
+
+    def test_evicted_version_never_reuses_a_key(self):
+        self.client.get(self.url)
+        cache.delete(f"worker-profile-version:{self.worker.pk}")
+        HealthcareWorker.objects.filter(pk=self.worker.pk).update(first_name="Kondie")
+        self.assertEqual(self.client.get(self.url).data["first_name"], "Kondie")
+
+    def test_deleted_worker_is_not_found(self):
+        self.client.get(self.url)
+        self.worker.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get("/api/hcws/999999/profile/").status_code, 404)
+
+
+class QueryStatsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("WorkForceTrained.querystats._start_writer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(querystats._explained.clear)
+        self.addCleanup(querystats._pending.clear)
+
+    def slow_recorder(self):
+        recorder = querystats.QueryRecorder(slow_ms=0)
+        sql = 'SELECT "id" FROM "workforcetrained_healthcareworker" WHERE "id" = %s'
+        recorder.queries[sql] = [1, 250.0, 250.0, 1]
+        recorder.slow[sql] = (250.0, (7,), "default")
+        return recorder
+
+    def test_finish_leaves_explain_and_flush_to_the_writer(self):
+        querystats._last_flush[0] -= 3600
+        with mock.patch.object(connection, "vendor", "postgresql"), self.assertNumQueries(0):
+            querystats.finish(self.slow_recorder(), "GET /api/hcws/")
+        self.assertEqual(querystats._waiting_plans.get_nowait()[3], "GET /api/hcws/")
+
+        self.assertEqual(querystats.flush(), 1)
+        stat = QueryStat.objects.get(view="GET /api/hcws/")
+        self.assertEqual((stat.calls, stat.slow_calls), (1, 1))
+        self.assertIn("WHERE \"id\" = ?", stat.fingerprint)
+
+    def test_side_effects_are_never_analyzed(self):
+        for sql in [
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            "SELECT pg_notify(%s, %s)",
+            'SELECT "id" FROM "workforcetrained_job" WHERE "status" = %s LIMIT 1 FOR UPDATE SKIP LOCKED',
+            'SELECT "id" FROM "workforcetrained_job" FOR NO KEY UPDATE',
+            'SELECT "id" FROM "workforcetrained_job" for share',
+            "SELECT pg_advisory_xact_lock(%s)",
+        ]:
+            self.assertEqual(querystats.explain_prefix(sql), "EXPLAIN ", sql)
+        read = 'SELECT "id", "notes" FROM "workforcetrained_deployment" WHERE "notes" LIKE %s'
+        self.assertEqual(querystats.explain_prefix(read), "EXPLAIN (ANALYZE, BUFFERS) ")
+
+    def test_each_fingerprint_is_queued_once_per_interval(self):
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            querystats.finish(self.slow_recorder(), "a")
+            querystats.finish(self.slow_recorder(), "b")
+        self.assertEqual(querystats._waiting_plans.qsize(), 1)
+        querystats._waiting_plans.get_nowait()
+
+
+class PhoneNormalizationTests(TestCase):
+    def test_local_and_international_forms_agree(self):
+        for raw in ["0991 234 567", "991234567", "+265-991-234-567", "00265991234567",
+                    "+265 0991 234 567", "00265 0991 234 567"]:
+            self.assertEqual(normalize_phone(raw), "+265991234567", raw)
+
+    def test_other_countries_are_kept(self):
+        self.assertEqual(normalize_phone("+44 20 7946 0000"), "+442079460000")
+
+    def test_impossible_numbers_are_none(self):
+        for raw in [None, "", "12", "0991 234", "+2650991"]:
+            self.assertIsNone(normalize_phone(raw), raw)
+
+    def test_lookup_finds_worker_by_any_form(self):
+        worker = HealthcareWorker.objects.create(first_name="Thoko", last_name="Zulu", phone="0991 234 567")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("phones"))
+        response = client.post("/api/hcws/lookup-phones/", {"phones": ["+265 0991 234 567"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        result = response.data["results"][0]
+        self.assertEqual(result["e164"], "+265991234567")
+        self.assertEqual([row["id"] for row in result["workers"]], [worker.pk])
+
+
+class MergeWorkersTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("reviewer", is_staff=True))
+        self.keep = HealthcareWorker.objects.create(first_name="Grace", last_name="Chirwa", phone="0991234567")
+        self.remove = HealthcareWorker.objects.create(
+            first_name="Grace", last_name="Chirwa", phone="+265 0991 234 567", email="grace@example.org"
+        )
+        competency = Competency.objects.create(code="EPI", name="Immunisation")
+        Training.objects.create(hcw=self.remove, competency=competency, date_completed="2026-03-01")
+        self.candidate = DuplicateCandidate.objects.create(
+            worker_a=self.keep, worker_b=self.remove, score=0.9, reasons=["same phone"]
+        )
+
+    def merge(self):
+        return self.client.post(f"/api/duplicates/{self.candidate.pk}/merge/", {"keep": self.keep.pk}, format="json")
+
+    def test_merged_candidate_keeps_the_removed_worker(self):
+        response = self.merge()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["moved"]["training"], 1)
+        self.assertEqual(response.data["filled"], ["email"])
+        self.assertFalse(HealthcareWorker.objects.filter(pk=self.remove.pk).exists())
+        self.keep.refresh_from_db()
+        self.assertEqual(self.keep.email, "grace@example.org")
+
+        candidate = self.client.get(f"/api/duplicates/{self.candidate.pk}/").data
+        self.assertEqual(candidate["status"], "merged")
+        self.assertIsNone(candidate["worker_b"])
+        self.assertEqual(candidate["removed_worker_id"], self.remove.pk)
+        self.assertEqual(candidate["removed_worker_name"], "Grace Chirwa")
+
+    def test_overlapping_deployments_block_the_merge(self):
+        district = District.objects.create(code="ZB", name="Zomba")
+        for worker in (self.keep, self.remove):
+            Deployment.objects.create(
+                hcw=worker, district=district, outbreak_type="Cholera", start_date="2026-11-01", end_date="2026-11-30",
+                status="active",
+            )
+        response = self.merge()
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(HealthcareWorker.objects.filter(pk=self.remove.pk).exists())
+
+
+def best_assignment(scores, quotas):
+    """(workers placed, total score) of the best plan, by trying every one."""
+    n_workers, n_requests = scores.shape
+    best = (0, 0.0)
+    for plan in product(range(-1, n_requests), repeat=n_workers):
+        counts = np.bincount([r for r in plan if r >= 0], minlength=n_requests)
+        if (counts > quotas).any():
+            continue
+        picked = [scores[w, r] for w, r in enumerate(plan) if r >= 0]
+        if np.isfinite(picked).all():
+            best = max(best, (len(picked), float(sum(picked))))
+    return best
+
+
+class AssignmentSolverTests(TestCase):
+    def outcome(self, scores, quotas):
+        assigned = solve_assignment(scores, quotas)
+        counts = np.bincount(assigned[assigned >= 0], minlength=scores.shape[1])
+        self.assertTrue((counts <= quotas).all())
+        picked = [scores[w, r] for w, r in enumerate(assigned) if r >= 0]
+        self.assertTrue(np.isfinite(picked).all())
+        return len(picked), float(sum(picked))
+
+    def test_later_request_gets_the_worker_only_it_can_use(self):
+        # Worker 0 is best everywhere, but only worker 0 can go to request 1.
+        scores = np.array([[90.0, 80.0], [85.0, -np.inf]])
+        self.assertEqual(list(solve_assignment(scores, [1, 1])), [1, 0])
+
+    def test_matches_exhaustive_search(self):
+        rng = np.random.default_rng(29)
+        for _ in range(60):
+            n_workers, n_requests = rng.integers(1, 7), rng.integers(1, 4)
+            scores = rng.integers(0, 100, size=(n_workers, n_requests)).astype(float)
+            scores[rng.random(scores.shape) < 0.25] = -np.inf
+            quotas = rng.integers(1, 4, size=n_requests)
+            count, total = self.outcome(scores, quotas)
+            best_count, best_total = best_assignment(scores, quotas)
+            self.assertEqual(count, best_count)
+            self.assertAlmostEqual(total, best_total)
+
+    def test_nobody_is_forced_into_a_forbidden_request(self):
+        scores = np.full((3, 2), -np.inf)
+        scores[0, 0] = 10.0
+        self.assertEqual(list(solve_assignment(scores, [2, 2])), [0, -1, -1])
+
+    def test_empty_inputs(self):
+        self.assertEqual(len(solve_assignment(np.empty((0, 2)), [1, 1])), 0)
+        self.assertEqual(list(solve_assignment(np.empty((2, 0)), [])), [-1, -1])
+
+
+class PlanDeploymentsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("coordinator"))
+        self.lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        self.blantyre = District.objects.create(code="BL", name="Blantyre")
+        self.ipc = Competency.objects.create(code="IPC", name="Infection prevention")
+        facility = Facility.objects.create(
+            name="Kamuzu Central", facility_type="central_hospital", district=self.lilongwe
+        )
+        self.trained = HealthcareWorker.objects.create(
+            first_name="Trained", last_name="Nurse", phone="0991000001", facility=facility, position="Nurse"
+        )
+        Training.objects.create(hcw=self.trained, competency=self.ipc, date_completed="2026-01-01")
+        AvailabilityRecord.objects.create(hcw=self.trained, status="available")
+        self.untrained = HealthcareWorker.objects.create(
+            first_name="Untrained", last_name="Nurse", phone="0991000002", facility=facility, position="Nurse"
+        )
+        self.busy = HealthcareWorker.objects.create(
+            first_name="Busy", last_name="Nurse", phone="0991000003", facility=facility, position="Nurse"
+        )
+        AvailabilityRecord.objects.create(hcw=self.busy, status="available")
+        Deployment.objects.create(
+            hcw=self.busy, district=self.lilongwe, outbreak_type="Cholera", start_date="2026-10-01", status="active"
+        )
+
+    def test_plan_fills_both_requests_and_skips_busy_workers(self):
+        requests = [
+            # Listed first, yet it must leave the only trained worker to Blantyre.
+            {"district_id": self.lilongwe.pk, "outbreak_type": "Cholera", "number_of_workers": 1,
+             "start_date": "2026-11-01"},
+            {"district_id": self.blantyre.pk, "outbreak_type": "Cholera", "number_of_workers": 1,
+             "required_competencies": [self.ipc.pk], "start_date": "2026-11-01"},
+        ]
+        response = self.client.post("/api/deployments/plan/", {"requests": requests}, format="json")
+        self.assertEqual(response.status_code, 200)
+        proposed = [[p["hcw"] for p in plan["proposals"]] for plan in response.data["plans"]]
+        self.assertEqual(proposed, [[self.untrained.pk], [self.trained.pk]])
+
+    def test_confirmed_plan_is_announced_and_marks_forecasts_dirty(self):
+        plan = [{"hcw": self.trained.pk, "district": self.blantyre.pk, "outbreak_type": "Cholera",
+                 "start_date": "2026-11-01"}]
+        with mock.patch("WorkForceTrained.events.broker") as broker, \
+                mock.patch("WorkForceTrained.forecast._queue_refresh") as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            broker.has_subscribers.return_value = True
+            response = self.client.post("/api/deployments/confirm_plan/", {"deployments": plan}, format="json")
+        self.assertEqual(response.status_code, 201)
+        published = [call.args[0] for call in broker.publish.call_args_list]
+        self.assertEqual(
+            [(e["type"], e["op"], e["pk"]) for e in published], [("deployment", "created", response.data["ids"][0])]
+        )
+        refresh.assert_called_once_with({self.lilongwe.pk})
+
+
+class FindConflictsTests(TestCase):
+    def setUp(self):
+        self.district = District.objects.create(code="MZ", name="Mzimba")
+        self.worker = HealthcareWorker.objects.create(first_name="Mphatso", last_name="Gondwe", phone="0999000001")
+        self.other = HealthcareWorker.objects.create(first_name="Chikondi", last_name="Kaunda", phone="0999000002")
+
+    def deploy(self, start, end=None, status="active"):
+        return Deployment.objects.create(
+            hcw=self.worker, district=self.district, outbreak_type="Cholera",
+            start_date=start, end_date=end, status=status,
+        )
+
+    def proposal(self, start, end=None, hcw=None, **extra):
+        return {"hcw": (hcw or self.worker).pk, "start_date": start, "end_date": end, **extra}
+
+    def test_batch_members_conflict_with_each_other(self):
+        conflicts = find_conflicts([
+            self.proposal(date(2026, 11, 1), date(2026, 11, 10)),
+            self.proposal(date(2026, 11, 10), date(2026, 11, 20)),
+            self.proposal(date(2026, 11, 21), date(2026, 11, 30)),
+            self.proposal(date(2026, 11, 5), date(2026, 11, 6), hcw=self.other),
+        ])
+        self.assertEqual(
+            [(c["index"], c["conflicts_with"]) for c in conflicts],
+            [(0, {"index": 1}), (1, {"index": 0})],
+        )
+
+    def test_open_ended_deployment_blocks_everything_after_it(self):
+        existing = self.deploy(date(2026, 9, 1))
+        conflicts = find_conflicts([self.proposal(date(2027, 3, 1), date(2027, 3, 5))])
+        self.assertEqual(
+            conflicts, [{"index": 0, "hcw": self.worker.pk, "conflicts_with": {"deployment": existing.pk}}]
+        )
+
+    def test_archived_and_replaced_deployments_do_not_block(self):
+        self.deploy(date(2026, 11, 1), date(2026, 11, 30), status="archived")
+        current = self.deploy(date(2026, 12, 1), date(2026, 12, 31))
+        self.assertEqual(find_conflicts([self.proposal(date(2026, 11, 15), date(2026, 11, 20))]), [])
+        moved = self.proposal(date(2026, 12, 10), date(2027, 1, 10), id=current.pk)
+        self.assertEqual(find_conflicts([moved]), [])
+
+    def test_long_interval_is_reported_against_every_overlap(self):
+        self.deploy(date(2026, 11, 1), date(2026, 12, 31))
+        conflicts = find_conflicts([
+            self.proposal(date(2026, 11, 5), date(2026, 11, 6)),
+            self.proposal(date(2026, 12, 20), date(2027, 1, 5)),
+        ])
+        self.assertEqual([c["index"] for c in conflicts], [0, 1])
+
+
+class DuplicateScoringTests(TestCase):
+    def test_soundex(self):
+        self.assertEqual([soundex(n) for n in ["Robert", "Rupert", "Tymczak", "Ashcraft", ""]],
+                         ["R163", "R163", "T522", "A261", ""])
+
+    def test_swapped_names_share_a_block(self):
+        self.assertTrue(
+            blocking_keys("Chisomo", "Banda", "", "") & blocking_keys("Banda", "Chisomo", "", "")
+        )
+
+    def test_same_person_in_different_formats_scores_high(self):
+        score, reasons = score_pair(
+            ("Chisomo", "Banda", "0991 234 567", "AB12 3456", "c.banda@example.org"),
+            ("Banda", "Chisomo", "+265 0991 234 567", "ab123456", "C.Banda@example.org"),
+        )
+        self.assertEqual(score, 1.0)
+        self.assertEqual(reasons[1:], ["same phone", "same national ID", "same email"])
+
+    def test_different_national_ids_pull_the_score_down(self):
+        same_name = ("Chisomo", "Banda", "", "", "")
+        score, _ = score_pair(same_name, same_name)
+        penalised, reasons = score_pair(
+            ("Chisomo", "Banda", "", "AB123456", ""), ("Chisomo", "Banda", "", "ZZ999999", "")
+        )
+        self.assertEqual(score, 0.5)
+        self.assertEqual(penalised, 0.2)
+        self.assertIn("different national IDs", reasons)
+
+
+class FindDuplicatesTests(TestCase):
+    def setUp(self):
+        self.chisomo = HealthcareWorker.objects.create(first_name="Chisomo", last_name="Banda", phone="0991234567")
+        self.copy = HealthcareWorker.objects.create(first_name="Banda", last_name="Chisomo", phone="+265991234567")
+        self.other = HealthcareWorker.objects.create(first_name="Tamanda", last_name="Phiri", phone="0888000111")
+
+    def pairs(self):
+        return set(DuplicateCandidate.objects.values_list("worker_a_id", "worker_b_id"))
+
+    def test_full_scan_streams_in_small_batches(self):
+        with mock.patch("WorkForceTrained.dedupe.FETCH_SIZE", 1), mock.patch("WorkForceTrained.dedupe.WRITE_BATCH", 1):
+            result = find_duplicates()
+        self.assertEqual((result["workers"], result["pairs_scored"]), (3, 1))
+        self.assertEqual(self.pairs(), {(self.chisomo.pk, self.copy.pk)})
+        self.assertEqual(DedupeKey.objects.filter(hcw=self.other).count(), 2)
+
+    def test_full_scan_only_loads_workers_in_pairs(self):
+        with mock.patch("WorkForceTrained.dedupe._records", wraps=dedupe._records) as records:
+            find_duplicates()
+        records.assert_called_once_with({self.chisomo.pk, self.copy.pk})
+
+    def test_oversized_blocks_are_skipped(self):
+        with mock.patch("WorkForceTrained.dedupe.MAX_BLOCK", 1):
+            result = find_duplicates()
+        self.assertEqual(result["pairs_scored"], 0)
+        self.assertEqual(result["blocks_skipped"], 2)
+
+    def test_incremental_check_matches_the_full_scan(self):
+        find_duplicates()
+        DuplicateCandidate.objects.all().delete()
+        result = find_duplicates([self.copy.pk])
+        self.assertEqual(result["pairs_scored"], 1)
+        self.assertEqual(self.pairs(), {(self.chisomo.pk, self.copy.pk)})
+
+
+class BatchThrottleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("batcher"))
+        District.objects.create(code="KS", name="Kasungu")
+        self.addCleanup(cache.clear)
+
+    def batch(self, parallel=False):
+        return self.client.post(
+            "/api/batch/", {"requests": [{"id": "d", "path": "/api/districts/"}], "parallel": parallel},
+            format="json",
+        )
+
+    def direct_key(self):
+        with mock.patch("WorkForceTrained.middleware.record_endpoint_cost") as record:
+            self.client.get("/api/districts/")
+        return record.call_args.args[0]
+
+    def test_sub_requests_share_the_direct_endpoint_cost(self):
+        key = self.direct_key()
+        with mock.patch("WorkForceTrained.batch.record_endpoint_cost") as record:
+            response = self.batch()
+        self.assertEqual(response.data["responses"][0]["status"], 200)
+        record.assert_called_once()
+        self.assertEqual(record.call_args.args[0], key)
+
+    def test_parallel_sub_requests_are_measured_on_their_thread(self):
+        key = self.direct_key()
+        with mock.patch("WorkForceTrained.batch.record_endpoint_cost") as record:
+            self.batch(parallel=True)
+        self.assertEqual(record.call_args.args[0], key)
+        self.assertGreater(record.call_args.args[1], 0)
+
+    @override_settings(COST_THROTTLE={"FREE_BELOW_MS": 50, "USER_BUDGET_MS": 100})
+    def test_expensive_sub_request_is_throttled(self):
+        record_endpoint_cost(self.direct_key(), 5000)
+        response = self.batch()
+        self.assertEqual(response.data["responses"][0]["status"], 429)
+
+
+class WorkforceCounterTests(TestCase):
+    def setUp(self):
+        self.district = District.objects.create(code="MZ", name="Mzimba")
+        self.facility = Facility.objects.create(name="Mzuzu Central", facility_type="hospital", district=self.district)
+
+    def test_worker_and_training_saves_write_no_counter(self):
+        competency = Competency.objects.create(code="IPC", name="Infection prevention")
+        with CaptureQueriesContext(connection) as queries:
+            worker = HealthcareWorker.objects.create(
+                first_name="Kondwani", last_name="Mwale", phone="0991000222", facility=self.facility
+            )
+            Training.objects.create(hcw=worker, competency=competency, date_completed=date(2026, 1, 5))
+        self.assertFalse([q for q in queries if "workforcecounter" in q["sql"].lower()])
+        self.assertFalse(WorkforceCounter.objects.filter(metric__in=["workers", "active_workers", "trainings"]))
+
+    def test_reference_counters_follow_writes(self):
+        other = District.objects.create(code="NB", name="Nkhata Bay")
+        self.facility.district = other
+        self.facility.save()
+        Organization.objects.create(name="MSF")
+        self.assertEqual(counters.values("facilities", "district"), {str(self.district.pk): 0, str(other.pk): 1})
+        self.assertEqual(counters.totals()["organizations"], 1)
+        self.assertEqual(counters.reconcile(repair=False), {})
+
+    def test_deletes_and_deferred_saves_are_counted(self):
+        Facility.objects.create(name="Mzuzu Clinic", facility_type="clinic", district=self.district)
+        # Loaded without its tracked fields, the save has to read them first.
+        renamed = Facility.objects.only("name").get(name="Mzuzu Clinic")
+        renamed.facility_type = "health_center"
+        renamed.save()
+        self.facility.delete()
+        self.assertEqual(counters.values("facilities", "facility_type"), {"hospital": 0, "clinic": 0, "health_center": 1})
+        self.assertEqual(counters.totals()["facilities"], 1)
+
+    def test_reconcile_repairs_drift(self):
+        WorkforceCounter.objects.filter(metric="facilities", dimension="all").update(value=7)
+        drift = counters.reconcile()
+        self.assertEqual(drift, {("facilities", "all", ""): (7, 1)})
+        self.assertEqual(counters.totals()["facilities"], 1)
+        self.assertEqual(counters.reconcile(), {})
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.district = District.objects.create(code="ZA", name="Zomba")
+        self.facility = Facility.objects.create(name="Zomba Central", facility_type="hospital", district=self.district)
+        self.ipc = Competency.objects.create(code="IPC", name="Infection prevention")
+
+    def worker(self, phone, is_active=True):
+        return HealthcareWorker.objects.create(
+            first_name="Worker", last_name=phone, phone=phone, facility=self.facility, is_active=is_active
+        )
+
+    def certify(self, worker, completed, valid_until=None):
+        Training.objects.create(hcw=worker, competency=self.ipc, date_completed=completed, valid_until=valid_until)
+
+    def test_known_matrix(self):
+        renewed = self.worker("0991000301")
+        # Lapses mid-March and is only renewed in June.
+        self.certify(renewed, date(2026, 1, 1), date(2026, 3, 15))
+        self.certify(renewed, date(2026, 6, 1))
+        expiring = self.worker("0991000302")
+        self.certify(expiring, date(2025, 6, 1), date(2026, 2, 10))
+        Deployment.objects.create(
+            hcw=expiring, district=self.district, outbreak_type="Cholera",
+            start_date=date(2026, 1, 15), end_date=date(2026, 1, 31), status="active",
+        )
+        self.certify(self.worker("0991000303", is_active=False), date(2025, 1, 1))
+
+        months, groups, totals = compute_forecast(first_month=date(2026, 1, 1))
+        self.assertEqual(months[0], date(2026, 1, 1))
+        self.assertEqual(len(months), 12)
+        self.assertEqual(groups.tolist(), [[self.district.pk, self.ipc.pk]])
+        self.assertEqual(totals["qualified"][0].tolist(), [2, 2, 1, 0, 0, 1, 1, 1, 1, 1, 1, 1])
+        self.assertEqual(totals["lapsing"][0].tolist(), [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(totals["deployed"][0].tolist(), [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+
+    def test_certifications_split_across_fetches(self):
+        worker = self.worker("0991000304")
+        self.certify(worker, date(2025, 1, 1), date(2026, 1, 20))
+        self.certify(worker, date(2026, 1, 10), date(2026, 5, 31))
+        with mock.patch("WorkForceTrained.forecast.FETCH_SIZE", 1):
+            _, groups, totals = compute_forecast(first_month=date(2026, 1, 1))
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(totals["qualified"][0].tolist()[:6], [1, 1, 1, 1, 1, 0])
+        self.assertEqual(totals["lapsing"][0].tolist()[:6], [0, 0, 0, 0, 1, 0])
+
+    def test_nothing_to_forecast(self):
+        months, groups, totals = compute_forecast(first_month=date(2026, 1, 1))
+        self.assertEqual((len(months), len(groups)), (12, 0))
+        self.assertEqual(totals["qualified"].shape, (0, 12))
+
+
+def write_fixture(testcase, data):
+    """Reference data fixture in a temporary file, removed after the test."""
+    fixture = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump(data, fixture)
+    fixture.close()
+    testcase.addCleanup(os.unlink, fixture.name)
+    return fixture.name
+
+
+class ReferenceDataTests(TestCase):
+    fixture = {
+        "version": "2026.1",
+        "districts": [{"code": "LL", "name": "Lilongwe"}, {"code": "ZA", "name": "Zomba"}],
+        "organizations": [{"name": "Ministry of Health"}],
+        "competencies": [{"code": "IPC", "name": "Infection prevention"}],
+        "facilities": [
+            {"code": "KCH", "name": "Kamuzu Central Hospital", "district": "LL",
+             "facility_type": "central_hospital", "organization": "Ministry of Health"},
+            {"code": "ZCH", "name": "Zomba Central Hospital", "district": "ZA", "facility_type": "central_hospital"},
+        ],
+    }
+
+    def load(self, data, **kwargs):
+        return load_reference_data(write_fixture(self, data), **kwargs)
+
+    def test_first_load_creates_everything_and_counts_it(self):
+        result = self.load(self.fixture)
+        self.assertEqual(result["counts"]["facilities"]["created"], 2)
+        kch = Facility.objects.get(code="KCH")
+        self.assertEqual((kch.district.code, kch.organization.name), ("LL", "Ministry of Health"))
+        self.assertEqual(counters.reconcile(repair=False), {})
+
+    def test_unchanged_fixture_is_skipped(self):
+        self.load(self.fixture)
+        path = write_fixture(self, self.fixture)
+        self.assertTrue(load_reference_data(path)["skipped"])
+        self.assertFalse(load_reference_data(path, force=True)["skipped"])
+
+    def test_only_changed_rows_are_written(self):
+        self.load(self.fixture)
+        Facility.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        edited = {**self.fixture, "facilities": [
+            {**self.fixture["facilities"][0], "name": "Kamuzu Teaching Hospital"}, self.fixture["facilities"][1],
+        ]}
+        counts = self.load(edited)["counts"]["facilities"]
+        self.assertEqual((counts["updated"], counts["unchanged"]), (1, 1))
+        recent = Facility.objects.filter(updated_at__gte=timezone.now() - timedelta(hours=1))
+        self.assertEqual(list(recent.values_list("name", flat=True)), ["Kamuzu Teaching Hospital"])
+
+    def test_facilities_seeded_by_name_adopt_their_code(self):
+        lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        seeded = Facility.objects.create(name="Kamuzu Central Hospital", facility_type="clinic", district=lilongwe)
+        counts = self.load(self.fixture)["counts"]["facilities"]
+        self.assertEqual((counts["adopted"], counts["created"]), (1, 1))
+        seeded.refresh_from_db()
+        self.assertEqual((seeded.code, seeded.facility_type), ("KCH", "central_hospital"))
+
+    def test_bad_fixture_writes_nothing(self):
+        broken = {**self.fixture, "facilities": [{**self.fixture["facilities"][0], "district": "XX"}]}
+        with self.assertRaisesMessage(ReferenceDataError, "unknown district 'XX'"):
+            self.load(broken)
+        self.assertFalse(District.objects.exists())
+        with self.assertRaisesMessage(ReferenceDataError, "duplicate code"):
+            self.load({"districts": [{"code": "LL", "name": "A"}, {"code": "LL", "name": "B"}]})
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("typeahead"))
+        self.lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        self.zomba = District.objects.create(code="ZA", name="Zomba")
+        for name, code, district in (
+            ("Kamuzu Central Hospital", "KCH", self.lilongwe),
+            ("Kawale Health Centre", "KHC", self.lilongwe),
+            ("Zomba Central Hospital", "ZCH", self.zomba),
+        ):
+            Facility.objects.create(name=name, code=code, facility_type="central_hospital", district=district)
+        self.addCleanup(autocomplete._indexes.clear)
+        self.addCleanup(autocomplete._checked.clear)
+
+    def labels(self, query, **kwargs):
+        return [row["label"] for row in autocomplete.suggest("facilities", query, **kwargs)[0]]
+
+    def test_every_word_must_prefix_a_word_of_the_label(self):
+        self.assertEqual(self.labels("central hosp"), ["Zomba Central Hospital", "Kamuzu Central Hospital"])
+        self.assertEqual(self.labels("ka"), ["Kawale Health Centre", "Kamuzu Central Hospital"])
+        self.assertEqual(self.labels("kch"), ["Kamuzu Central Hospital"])
+
+    def test_typos_fall_back_to_trigrams(self):
+        results = autocomplete.suggest("facilities", "kamuzo")[0]
+        self.assertEqual([(r["label"], r["match"]) for r in results][:1], [("Kamuzu Central Hospital", "similar")])
+
+    def test_district_filter(self):
+        self.assertEqual(self.labels("central", district_id=self.zomba.pk), ["Zomba Central Hospital"])
+
+    def test_local_write_drops_the_index(self):
+        self.labels("kamuzu")
+        Facility.objects.filter(code="KCH").get().delete()
+        self.assertEqual(self.labels("kamuzu"), [])
+
+    def test_reference_data_load_drops_the_index(self):
+        self.labels("kamuzu")
+        load_reference_data(write_fixture(self, {
+            "version": "1",
+            "districts": [{"code": "LL", "name": "Lilongwe"}],
+            "facilities": [{"code": "KCH", "name": "Kamuzu Teaching Hospital", "district": "LL",
+                            "facility_type": "central_hospital"}],
+        }))
+        self.assertEqual(self.labels("teaching"), ["Kamuzu Teaching Hospital"])
+
+    def test_etag_answers_not_modified(self):
+        response = self.client.get("/api/autocomplete/facilities/", {"q": "zomba"})
+        self.assertEqual(response.status_code, 200)
+        again = self.client.get("/api/autocomplete/facilities/", {"q": "zomba"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get("/api/autocomplete/wards/", {"q": "x"}).status_code, 404)
+
+
+class DistrictMapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("mapper"))
+        self.addCleanup(cache.clear)
+        lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        District.objects.create(code="LK", name="Likoma")  # no shape in the GeoJSON
+        facility = Facility.objects.create(name="Area 18", facility_type="health_center", district=lilongwe)
+        ipc = Competency.objects.create(code="IPC", name="Infection prevention")
+        for phone, gender in (("0991000401", "female"), ("0991000402", "male")):
+            worker = HealthcareWorker.objects.create(
+                first_name="Map", last_name=phone, phone=phone, gender=gender, facility=facility
+            )
+            Training.objects.create(hcw=worker, competency=ipc, date_completed=date(2026, 1, 1))
+        AvailabilityRecord.objects.create(hcw=worker, status="available")
+
+    def features(self, **params):
+        response = self.client.get("/api/map/districts/", params)
+        self.assertEqual(response.status_code, 200)
+        return {f["properties"]["code"]: f for f in response.data["features"]}
+
+    def test_metrics_are_joined_and_filtered(self):
+        lilongwe = self.features()["LL"]["properties"]
+        self.assertEqual(
+            (lilongwe["workers"], lilongwe["available"], lilongwe["trained"]), (2, 1, {"IPC": 2})
+        )
+        female = self.features(gender="female")["LL"]["properties"]
+        self.assertEqual((female["workers"], female["available"], female["trained"]), (1, 0, {"IPC": 1}))
+
+    def test_districts_without_shape_only_come_without_geometry(self):
+        self.assertNotIn("LK", self.features())
+        bare = self.features(geometry="false")
+        self.assertEqual((set(bare), bare["LK"]["geometry"]), ({"LL", "LK"}, None))
+
+    def test_lower_zoom_has_fewer_points(self):
+        # A square whose edges wobble by 0.001 degrees, gone at low zoom, kept at high.
+        edge = [[33.0 + i / 100, -14.0 + (i % 2) / 1000] for i in range(101)]
+        ring = edge + [[34.0, -13.0], [33.0, -13.0], edge[0]]
+        shapes = {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": "Lilongwe"}, "geometry": {"type": "Polygon", "coordinates": [ring]}},
+        ]}
+        for cached in (load_district_shapes, simplified_geometry):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        with override_settings(MALAWI_GEOJSON_PATH=write_fixture(self, shapes)):
+            low, high = (self.features(zoom=zoom)["LL"]["geometry"]["coordinates"][0] for zoom in ("low", "high"))
+        self.assertEqual((len(low), len(high)), (5, len(ring)))
+        self.assertEqual(self.client.get("/api/map/districts/", {"zoom": "street"}).status_code, 400)
+
+    def test_etag_answers_not_modified(self):
+        response = self.client.get("/api/map/districts/")
+        again = self.client.get("/api/map/districts/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        other_zoom = self.client.get("/api/map/districts/", {"zoom": "high"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(other_zoom.status_code, 200)
+
+    def test_douglas_peucker_drops_points_within_tolerance(self):
+        line = [(0, 0), (1, 0.001), (2, 0), (3, 1), (4, 0)]
+        self.assertEqual(_simplify_line(line, 0.01), [(0, 0), (2, 0), (3, 1), (4, 0)])
+        self.assertEqual(_simplify_line(line, 0), line)
+
+
+class BulkCheckInTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("checkin"))
+        self.worker = HealthcareWorker.objects.create(first_name="Check", last_name="In", phone="0991000501")
+        AvailabilityRecord.objects.create(hcw=self.worker, status="available", location="Mzuzu")
+
+    def check_in(self, entries):
+        return self.client.post("/api/availability/bulk/", {"entries": entries}, format="json")
+
+    def test_outcomes_line_up_with_entries(self):
+        response = self.check_in([
+            {"hcw": self.worker.pk, "status": "available", "location": "Mzuzu"},
+            {"hcw": self.worker.pk, "status": "on_leave"},
+            {"hcw": self.worker.pk, "status": "on_leave"},
+            {"hcw": 999999, "status": "available"},
+            {"hcw": "x", "status": "asleep"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        outcomes = [r["outcome"] for r in response.data["results"]]
+        self.assertEqual(outcomes, ["unchanged", "created", "unchanged", "invalid", "invalid"])
+        self.assertEqual(len(response.data["results"][4]["errors"]), 2)
+        self.assertEqual(
+            response.data["summary"], {"received": 5, "unchanged": 2, "created": 1, "invalid": 2}
+        )
+        created = AvailabilityRecord.objects.get(pk=response.data["results"][1]["id"])
+        self.assertEqual((created.hcw_id, created.status), (self.worker.pk, "on_leave"))
+
+    def test_checks_workers_and_writes_in_a_fixed_number_of_queries(self):
+        workers = HealthcareWorker.objects.bulk_create(
+            HealthcareWorker(first_name="W", last_name=str(i), phone=f"09920005{i:02}") for i in range(20)
+        )
+        entries = [{"hcw": w.pk, "status": "available"} for w in workers]
+        with CaptureQueriesContext(connection) as few:
+            self.check_in(entries[:2])
+        with CaptureQueriesContext(connection) as many:
+            self.check_in(entries[2:])
+        self.assertEqual(len(few), len(many))
+
+    def test_bad_bodies_are_rejected(self):
+        self.assertEqual(self.check_in([]).status_code, 400)
+        with mock.patch("WorkForceTrained.views.MAX_BULK_ENTRIES", 1):
+            self.assertEqual(self.check_in([{}, {}]).status_code, 400)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        handlers = mock.patch.dict(jobs.HANDLERS, {"echo": self.echo, "broken": self.broken})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def echo(self, payload, progress):
+        self.calls.append(payload)
+        progress(50, message="halfway")
+        return {"echo": payload}
+
+    def broken(self, payload, progress):
+        raise RuntimeError("no luck")
+
+    def test_unknown_kind_is_refused(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("nope")
+
+    def test_jobs_are_claimed_oldest_first_and_run(self):
+        later = jobs.enqueue("echo", {"n": 2})
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(minutes=5))
+        first = jobs.enqueue("echo", {"n": 1})
+
+        claimed = jobs.claim_next("worker-1")
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (first.pk, "running", 1))
+        self.assertIsNone(jobs.claim_next("worker-2"))
+
+        self.assertTrue(jobs.run_job(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.result, claimed.progress), ("succeeded", {"echo": {"n": 1}}, 100))
+
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue("broken", max_attempts=2)
+        with self.assertLogs("WorkForceTrained.jobs", "WARNING"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w")))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertIn("no luck", job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs("WorkForceTrained.jobs", "WARNING"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        delays = [jobs.retry_delay(n).total_seconds() for n in (1, 2, 3, 20)]
+        self.assertEqual(delays, [30, 60, 120, jobs.RETRY_MAX_SECONDS])
+
+    def test_merged_jobs_collect_ids_until_started(self):
+        job = jobs.enqueue_merged("echo", "ids", [3, 1])
+        self.assertEqual(jobs.enqueue_merged("echo", "ids", [2, 3]).pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.payload, {"ids": [1, 2, 3]})
+
+        jobs.claim_next("w")
+        self.assertNotEqual(jobs.enqueue_merged("echo", "ids", [4]).pk, job.pk)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue("echo")
+        jobs.claim_next("w")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - jobs.STALE_AFTER - timedelta(minutes=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim_next("w2").pk, job.pk)
+
+    def test_users_only_see_their_own_jobs(self):
+        owner, other = User.objects.create_user("owner"), User.objects.create_user("other")
+        job = jobs.enqueue("echo", user=owner)
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f"/api/jobs/{job.pk}/").status_code, 404)
+        client.force_authenticate(owner)
+        self.assertEqual(client.get(f"/api/jobs/{job.pk}/").status_code, 200)
+
+
+class RosterSnapshotTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("field"))
+        self.lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        self.zomba = District.objects.create(code="ZA", name="Zomba")
+        facility = Facility.objects.create(name="Area 25", facility_type="clinic", district=self.lilongwe)
+        self.worker = HealthcareWorker.objects.create(
+            first_name="Offline", last_name="Nurse", phone="0991000601", facility=facility
+        )
+        AvailabilityRecord.objects.create(hcw=self.worker, status="on_leave")
+        AvailabilityRecord.objects.create(hcw=self.worker, status="available")
+
+    def bundle(self, key):
+        with default_storage.open(RosterSnapshot.objects.get(key=key).path, "rb") as f:
+            return [json.loads(line) for line in gzip.decompress(f.read()).splitlines()]
+
+    def test_bundle_holds_the_district_roster(self):
+        snapshots.build_snapshots()
+        header, *chunks = self.bundle("LL")
+        self.assertEqual((header["format"], header["key"]), ("roster-snapshot", "LL"))
+        tables = {chunk["table"]: chunk["columns"] for chunk in chunks}
+        self.assertEqual(tables["workers"]["id"], [self.worker.pk])
+        self.assertEqual(tables["availability"]["status"], ["available"])
+        self.assertNotIn("workers", {chunk["table"] for chunk in self.bundle("ZA")[1:]})
+
+    def test_only_changed_bundles_are_rebuilt(self):
+        self.assertEqual(set(snapshots.build_snapshots()["built"]), {"LL", "ZA", "national"})
+        self.assertEqual(snapshots.build_snapshots(), {"built": {}, "unchanged": 3})
+
+        old_path = RosterSnapshot.objects.get(key="LL").path
+        self.worker.position = "Midwife"
+        self.worker.save()
+        self.assertEqual(snapshots.build_snapshots()["built"], {"LL": 2, "national": 2})
+        self.assertFalse(default_storage.exists(old_path))
+
+    def test_writes_flag_bundles_stale_after_commit(self):
+        snapshots.build_snapshots()
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailabilityRecord.objects.create(hcw=self.worker, status="deployed")
+            self.assertFalse(RosterSnapshot.objects.filter(stale=True).exists())
+        self.assertEqual(RosterSnapshot.objects.filter(stale=True).count(), 3)
+
+    def test_download_revalidates_and_resumes(self):
+        snapshots.build_snapshots()
+        url = "/api/snapshots/LL/download/"
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, 200)
+        body, etag = b"".join(full.streaming_content), full["ETag"]
+        self.assertEqual(full["X-Snapshot-Stale"], "false")
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        part = self.client.get(url, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE=etag)
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part["Content-Range"], f"bytes 10-{len(body) - 1}/{len(body)}")
+        self.assertEqual(part.content, body[10:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=-5").content, body[-5:])
+
+        # A resume against an older build gets the whole new file.
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE='"old"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(body)}-").status_code, 416)
+
+    def test_missing_bundle_queues_a_build(self):
+        response = self.client.get("/api/snapshots/LL/")
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(Job.objects.filter(kind="build_snapshots", status="queued").exists())
+        self.assertEqual(self.client.get("/api/snapshots/XX/").status_code, 404)
+
+
+class TrainingCoverageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("analyst"))
+        self.addCleanup(cache.clear)
+        self.lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        self.zomba = District.objects.create(code="ZA", name="Zomba")
+        ll_clinic = Facility.objects.create(name="Area 25", facility_type="clinic", district=self.lilongwe)
+        za_clinic = Facility.objects.create(name="Domasi", facility_type="clinic", district=self.zomba)
+        # Nine competencies, so the last one lives in the second byte of the bitmap.
+        self.competencies = [Competency.objects.create(code=f"C{i}", name=f"Skill {i}") for i in range(9)]
+        first, last = self.competencies[0], self.competencies[-1]
+        expired, valid = date.today() - timedelta(days=1), date.today() + timedelta(days=30)
+
+        def worker(phone, facility, gender="female", is_active=True, *certifications):
+            hcw = HealthcareWorker.objects.create(
+                first_name="C", last_name=phone, phone=phone, facility=facility, gender=gender, is_active=is_active
+            )
+            for competency, valid_until in certifications:
+                Training.objects.create(hcw=hcw, competency=competency, date_completed=date(2025, 1, 1),
+                                        valid_until=valid_until)
+
+        worker("0991000701", ll_clinic, "female", True, (first, valid), (last, expired))
+        worker("0991000702", ll_clinic, "male", True, (first, None), (last, valid))
+        worker("0991000703", ll_clinic, "male", False, (first, valid))
+        worker("0991000704", za_clinic)
+        worker("0991000705", None, "female", True, (last, valid))
+
+    def matrix(self, **params):
+        response = self.client.get("/api/analytics/coverage/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_known_matrix(self):
+        data = self.matrix()
+        self.assertEqual([c["code"] for c in data["competencies"]], [f"C{i}" for i in range(9)])
+        rows = [(r["district_name"], r["workers"], r["certified"][0], r["certified"][8], r["coverage"][8])
+                for r in data["rows"]]
+        self.assertEqual(rows, [("Unassigned", 1, 0, 1, 1.0), ("Lilongwe", 2, 2, 1, 0.5), ("Zomba", 1, 0, 0, 0.0)])
+        self.assertEqual(sum(sum(r["certified"][1:8]) for r in data["rows"]), 0)
+
+    def test_split_and_filtered(self):
+        first, last = self.competencies[0].pk, self.competencies[-1].pk
+        data = self.matrix(by="gender", district=str(self.lilongwe.pk), competency=f"{last},{first}")
+        self.assertEqual(
+            [(r["gender"], r["workers"], r["certified"]) for r in data["rows"]],
+            [("female", 1, [1, 0]), ("male", 1, [1, 1])],
+        )
+        self.assertEqual(self.client.get("/api/analytics/coverage/", {"by": "shoe_size"}).status_code, 400)
+
+    def test_result_is_cached_until_data_changes(self):
+        version = self.matrix()["data_version"]
+        with self.assertNumQueries(4):
+            self.assertEqual(self.matrix()["data_version"], version)
+        Training.objects.create(hcw=HealthcareWorker.objects.get(phone="0991000704"),
+                                competency=self.competencies[0], date_completed=date(2026, 1, 1))
+        zomba = [r for r in self.matrix()["rows"] if r["district_name"] == "Zomba"][0]
+        self.assertEqual(zomba["certified"][0], 1)
+
+
+class ColumnarExportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        lilongwe = District.objects.create(code="LL", name="Lilongwe")
+        zomba = District.objects.create(code="ZA", name="Zomba")
+        for phone, district in (("0991000801", lilongwe), ("0991000802", lilongwe), ("0991000803", zomba)):
+            facility = Facility.objects.create(name=f"Clinic {phone}", facility_type="clinic", district=district)
+            HealthcareWorker.objects.create(first_name="Export", last_name=phone, phone=phone, facility=facility)
+        HealthcareWorker.objects.create(first_name="No", last_name="Facility", phone="0991000804")
+
+    def test_parquet_has_the_schema_and_one_row_group_per_batch(self):
+        with mock.patch("WorkForceTrained.exports.ROW_GROUP", 3):
+            counts = exports.export_to_directory("workers", "parquet", self.directory)
+        self.assertEqual(counts, {"all": 4})
+        parquet = pq.ParquetFile(os.path.join(self.directory, "workers.parquet"))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.schema, exports.schema_for("workers"))
+        self.assertEqual(table.column("district_name").to_pylist(), ["Lilongwe", "Lilongwe", "Zomba", None])
+
+    def test_arrow_file_is_readable(self):
+        exports.export_to_directory("workers", "arrow", self.directory)
+        with pa.memory_map(os.path.join(self.directory, "workers.arrow")) as source:
+            table = pa.ipc.open_file(source).read_all()
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.schema.field("created_at").type, pa.timestamp("us", tz="UTC"))
+
+    def test_partitioned_by_district(self):
+        counts = exports.export_to_directory("workers", "parquet", self.directory, partition=True)
+        self.assertEqual(counts, {"district=Lilongwe": 2, "district=Zomba": 1, "district=__unassigned__": 1})
+        zomba = pq.read_table(os.path.join(self.directory, "workers", "district=Zomba", "part-0.parquet"))
+        self.assertEqual(zomba.column("last_name").to_pylist(), ["0991000803"])
+
+    def test_empty_table_still_has_a_schema(self):
+        exports.export_to_directory("deployment_history", "parquet", self.directory)
+        table = pq.read_table(os.path.join(self.directory, "deployment_history.parquet"))
+        self.assertEqual((table.num_rows, table.schema), (0, exports.schema_for("deployment_history")))
+
+    def test_export_job_serves_the_file(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("notebook"))
+        self.assertEqual(client.post("/api/exports/wards/").status_code, 404)
+        self.assertEqual(client.post("/api/exports/workers/", {"file_format": "csv"}).status_code, 400)
+
+        with override_settings(MEDIA_ROOT=self.directory):
+            response = client.post("/api/exports/workers/", {"file_format": "arrow"})
+            self.assertEqual(response.status_code, 202)
+            download = response.data["download_url"]
+            self.assertEqual(client.get(download).status_code, 409)
+
+            self.assertTrue(jobs.run_job(jobs.claim_next("test")))
+            file = client.get(download)
+            self.assertEqual(file["Content-Type"], exports.CONTENT_TYPES["arrow"])
+            table = pa.ipc.open_file(pa.py_buffer(b"".join(file.streaming_content))).read_all()
+        self.assertEqual(table.num_rows, 4)
+
+
+@override_settings(COST_THROTTLE={"FREE_BELOW_MS": 50, "WINDOW_SECONDS": 60, "USER_BUDGET_MS": 1000,
+                                  "GLOBAL_BUDGET_MS": 1500})
+class CostThrottleTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("heavy"))
+        District.objects.create(code="LL", name="Lilongwe")
+        self.workers = [
+            HealthcareWorker.objects.create(first_name="T", last_name=str(i), phone=f"09910009{i:02}") for i in range(2)
+        ]
+        self.expensive = self.key(f"/api/hcws/{self.workers[0].pk}/")
+        self.cheap = self.key("/api/districts/")
+        self.assertNotEqual(self.expensive, self.cheap)
+
+    def key(self, path):
+        with mock.patch("WorkForceTrained.middleware.record_endpoint_cost") as record:
+            self.client.get(path)
+        return record.call_args.args[0]
+
+    def test_cost_is_a_moving_average_per_route(self):
+        self.assertEqual(self.key(f"/api/hcws/{self.workers[1].pk}/"), self.expensive)
+        cache.clear()
+        record_endpoint_cost(self.expensive, 100)
+        self.assertEqual(record_endpoint_cost(self.expensive, 0), 80)
+        self.assertEqual(endpoint_cost(self.cheap), 0)
+
+    @mock.patch("WorkForceTrained.middleware.record_endpoint_cost")
+    def test_budget_only_applies_to_costly_endpoints(self, record):
+        cache.clear()
+        record_endpoint_cost(self.expensive, 400)
+        url = f"/api/hcws/{self.workers[0].pk}/"
+        self.assertEqual([self.client.get(url).status_code for _ in range(3)], [200, 200, 429])
+        self.assertTrue(self.client.get(url).headers["Retry-After"].isdigit())
+        self.assertEqual(self.client.get("/api/districts/").status_code, 200)
+
+    def test_throttled_requests_leave_the_cost_alone(self):
+        cache.clear()
+        record_endpoint_cost(self.expensive, 5000)
+        self.assertEqual(self.client.get(f"/api/hcws/{self.workers[0].pk}/").status_code, 429)
+        self.assertEqual(endpoint_cost(self.expensive), 5000)
+
+    @mock.patch("WorkForceTrained.middleware.record_endpoint_cost")
+    def test_global_budget_is_shared(self, record):
+        cache.clear()
+        record_endpoint_cost(self.expensive, 400)
+        url = f"/api/hcws/{self.workers[0].pk}/"
+        for _ in range(2):
+            self.client.get(url)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other"))
+        self.assertEqual([other.get(url).status_code for _ in range(2)], [200, 429])
+
+
+class AuditTrailTests(TransactionTestCase):
+    """Real commits and rollbacks, on_commit never fires inside TestCase."""
+
+    def setUp(self):
+        self.worker = HealthcareWorker.objects.create(
+            first_name="Audit", last_name="Trail", phone="0991001001", position="Nurse"
+        )
+
+    def entries(self, action=None):
+        entries = AuditEntry.objects.filter(entity="healthcareworker", object_id=self.worker.pk)
+        return entries.filter(action=action) if action else entries
+
+    def test_entry_is_written_after_commit(self):
+        self.assertEqual(self.entries("created").get().changes["first_name"], "Audit")
+        with transaction.atomic():
+            self.worker.position = "Midwife"
+            self.worker.save()
+            self.assertFalse(self.entries("updated").exists())
+        self.assertEqual(self.entries("updated").get().changes, {"position": ["Nurse", "Midwife"]})
+
+    def test_rolled_back_change_leaves_no_entry(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.worker.position = "Midwife"
+            self.worker.save()
+            Training.objects.create(
+                hcw=self.worker, competency=Competency.objects.create(code="IPC", name="IPC"),
+                date_completed=date(2026, 1, 1),
+            )
+            raise RuntimeError("abort")
+        self.assertFalse(self.entries("updated").exists())
+        self.assertFalse(AuditEntry.objects.filter(entity="training").exists())
+
+    def test_unchanged_save_is_not_audited(self):
+        self.worker.save()
+        self.assertFalse(self.entries("updated").exists())
+
+    def test_deletion_keeps_the_last_values(self):
+        pk = self.worker.pk
+        self.worker.delete()
+        deleted = AuditEntry.objects.get(entity="healthcareworker", object_id=pk, action="deleted")
+        self.assertEqual(deleted.changes["position"], "Nurse")
+
+    def test_request_changes_are_attributed_to_the_user(self):
+        user = User.objects.create_user("auditor")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.patch(f"/api/hcws/{self.worker.pk}/", {"position": "Midwife"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        updated = self.entries("updated").get()
+        self.assertEqual((updated.user_id, updated.changes), (user.pk, {"position": ["Nurse", "Midwife"]}))
@@ -0,0 +1,87 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Weight of the newest request in an endpoint's moving average of DB time.
+EWMA_ALPHA = 0.2
+COST_KEY_TIMEOUT = 24 * 60 * 60
+DEFAULTS = {
+    # Endpoints averaging less DB time than this are free and never throttled.
+    "FREE_BELOW_MS": 50,
+    "WINDOW_SECONDS": 60,
+    # DB milliseconds each user, and everyone together, may spend per window
+    # on endpoints above the free threshold.
+    "USER_BUDGET_MS": 20000,
+    "GLOBAL_BUDGET_MS": 120000,
+}
+
+
+def throttle_settings():
+    return {**DEFAULTS, **getattr(settings, "COST_THROTTLE", {})}
+
+
+def endpoint_key(request):
+    """Method plus matched URL pattern, so every /hcws/<id>/ shares one cost."""
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match else request.path
+    return f"{request.method} {route}"
+
+
+def _cost_cache_key(endpoint):
+    return "endpoint-cost:" + hashlib.md5(endpoint.encode()).hexdigest()
+
+
+def endpoint_cost(endpoint):
+    """Moving average of DB milliseconds per request, 0 if never measured."""
+    return cache.get(_cost_cache_key(endpoint), 0.0)
+
+
+def record_endpoint_cost(endpoint, db_ms):
+    key = _cost_cache_key(endpoint)
+    previous = cache.get(key)
+    average = db_ms if previous is None else previous + EWMA_ALPHA * (db_ms - previous)
+    cache.set(key, average, COST_KEY_TIMEOUT)
+    return average
+
+
+def _charge(key, amount, window):
+    """Add to a fixed-window counter, returns the new total."""
+    if cache.add(key, amount, window):
+        return amount
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.set(key, amount, window)
+        return amount
+
+
+class CostBudgetThrottle(BaseThrottle):
+    """
+    Charges each request its endpoint's recent average DB time against a
+    per-user and a global budget. Cheap endpoints cost nothing, so heavy
+    use of the dashboard or exports never blocks ordinary list and detail calls.
+    """
+
+    def allow_request(self, request, view):
+        config = throttle_settings()
+        cost = int(endpoint_cost(endpoint_key(request._request)))
+        if cost < config["FREE_BELOW_MS"]:
+            return True
+
+        window = config["WINDOW_SECONDS"]
+        now = time.time()
+        bucket = int(now // window)
+        self.retry_after = window - (now % window)
+
+        user = request.user
+        ident = f"user:{user.pk}" if user and user.is_authenticated else f"ip:{self.get_ident(request)}"
+        if _charge(f"cost-budget:{ident}:{bucket}", cost, window) > config["USER_BUDGET_MS"]:
+            return False
+        return _charge(f"cost-budget:global:{bucket}", cost, window) <= config["GLOBAL_BUDGET_MS"]
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
@@ -1,10 +1,14 @@
 from django.urls import path, include
-from .views import healthcare_dashboard_data
+from .views import (
+    healthcare_dashboard_data, district_map_data, refresh_dashboard_rollups, live_events, stream_ticket,
+    batch_requests, training_coverage, workforce_forecast, columnar_export, autocomplete
+)
 from rest_framework.routers import DefaultRouter
 from .views import (
     DistrictViewSet, OrganizationViewSet, FacilityViewSet, CompetencyViewSet,
     HealthcareWorkerViewSet, TrainingViewSet, AvailabilityRecordViewSet,
-    DeploymentViewSet,DeploymentHistoryViewSet
+    DeploymentViewSet,DeploymentHistoryViewSet, JobViewSet, RosterSnapshotViewSet,
+    DuplicateCandidateViewSet, AuditEntryViewSet
 )
 
 router = DefaultRouter()
@@ -17,10 +21,23 @@ router.register(r"trainings", TrainingViewSet)
 router.register(r"availability", AvailabilityRecordViewSet)
 router.register(r"deployments", DeploymentViewSet)
 router.register(r"deployment-history", DeploymentHistoryViewSet)
+router.register(r"jobs", JobViewSet)
+router.register(r"snapshots", RosterSnapshotViewSet)
+router.register(r"duplicates", DuplicateCandidateViewSet)
+router.register(r"audit", AuditEntryViewSet)
 
 
 
 urlpatterns = [
     path("", include(router.urls)),
     path('dashboard/summary/', healthcare_dashboard_data, name='dashboard-summary'),
+    path('analytics/coverage/', training_coverage, name='training-coverage'),
+    path('analytics/forecast/', workforce_forecast, name='workforce-forecast'),
+    path('exports/<str:table>/', columnar_export, name='columnar-export'),
+    path('dashboard/rollups/refresh/', refresh_dashboard_rollups, name='dashboard-rollups-refresh'),
+    path('map/districts/', district_map_data, name='district-map'),
+    path('events/', live_events, name='live-events'),
+    path('events/ticket/', stream_ticket, name='stream-ticket'),
+    path('batch/', batch_requests, name='batch'),
+    path('autocomplete/<str:kind>/', autocomplete, name='autocomplete'),
 ]
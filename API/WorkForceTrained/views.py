@@ -1,53 +1,153 @@
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 import traceback
 from WorkForceTrained.analytics import get_healthcare_data_summary
+from WorkForceTrained.geo import (
+    district_map, ZOOM_LEVELS, DEFAULT_ZOOM, get_distance_matrix, distance_band
+)
+from WorkForceTrained.checkin import bulk_check_in, MAX_BULK_ENTRIES
+from WorkForceTrained.scheduling import free_workers, find_conflicts
+from WorkForceTrained.assignment import plan_deployments
+from WorkForceTrained.jobs import enqueue
+from WorkForceTrained.events import TICKET_SECONDS, broker, issue_ticket, redeem_ticket
+from WorkForceTrained.batch import BatchError, parse_items, run_batch
+from WorkForceTrained.coverage import coverage_matrix, DIMENSIONS
+from WorkForceTrained.forecast import forecast_series
+from WorkForceTrained.pagination import EstimatedCountPagination
+from WorkForceTrained.exports import TABLES as EXPORT_TABLES, FORMATS as EXPORT_FORMATS
+from WorkForceTrained.sync import DeltaSyncMixin
+from WorkForceTrained import audit, events, forecast, profiles
+from WorkForceTrained.dedupe import MergeError, merge_workers
+from WorkForceTrained.phones import normalize_phone, MAX_PHONE_LOOKUPS
+from WorkForceTrained.autocomplete import SOURCES as AUTOCOMPLETE_SOURCES, DEFAULT_LIMIT, suggest
+from WorkForceTrained.snapshots import NATIONAL, rebuild_in_background
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Prefetch, OuterRef, Subquery
-from django.http import HttpResponse
+from django.db.models import Prefetch, OuterRef, Subquery, F, Case, When, Value, FloatField
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
 from rest_framework.pagination import PageNumberPagination
 import csv
+import numpy as np
 from io import StringIO, BytesIO
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from django.db.models import Q
+from django.utils import timezone
 from django.utils.timezone import localtime
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from users.authentication import ClaimsJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from asgiref.sync import sync_to_async
+import asyncio
+import hashlib
+import json
 
 
 
 from .models import (
     District, Organization, Facility, Competency,
     HealthcareWorker, Training, AvailabilityRecord,
-    Deployment, DeploymentHistory
+    Deployment, DeploymentHistory, Job, RosterSnapshot, DuplicateCandidate, AuditEntry
 )
 from .serializers import (
     DistrictSerializer, OrganizationSerializer, FacilitySerializer,DeploymentWizardRequestSerializer,
     CompetencySerializer, HealthcareWorkerSerializer, TrainingSerializer,
-    AvailabilityRecordSerializer, DeploymentSerializer, DeploymentCandidateSerializer,DeploymentHistorySerializer
+    AvailabilityRecordSerializer, DeploymentSerializer, DeploymentCandidateSerializer,DeploymentHistorySerializer,
+    PlannedDeploymentSerializer, JobSerializer, RosterSnapshotSerializer, DuplicateCandidateSerializer,
+    AuditEntrySerializer, WorkerProfileSerializer
 )
 
 
-class DistrictViewSet(viewsets.ModelViewSet):
+class DistrictViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = District.objects.all()
     serializer_class = DistrictSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["name", "code"]
 
+    @action(detail=False, methods=['get'])
+    def distances(self, request):
+        """
+        District-to-district distance (km) and travel time (hours).
+        ?from=<district id> returns one row instead of the full matrix.
+        """
+        matrix = get_distance_matrix()
+        ids = [int(i) for i in matrix.ids]
+        km = np.round(matrix.km, 1)
+        hours = np.round(matrix.hours, 1)
+
+        origin = request.GET.get('from')
+        if origin:
+            row = matrix.index([int(origin)])[0] if origin.isdigit() else -1
+            if row < 0:
+                return Response({'error': f'Unknown district: {origin}'}, status=404)
+            return Response({
+                'from': int(origin),
+                'districts': [
+                    {'id': i, 'code': code, 'distance_km': _finite(k), 'travel_time_hours': _finite(h),
+                     'band': distance_band(_finite(k))}
+                    for i, code, k, h in zip(ids, matrix.codes, km[row], hours[row])
+                ],
+            })
 
-class OrganizationViewSet(viewsets.ModelViewSet):
+        return Response({
+            'ids': ids,
+            'codes': matrix.codes,
+            'distance_km': [[_finite(v) for v in r] for r in km],
+            'travel_time_hours': [[_finite(v) for v in r] for r in hours],
+        })
+
+
+def _finite(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _nearest_first(workers, district_id):
+    """Order workers by distance from a district, using the in-memory matrix."""
+    matrix = get_distance_matrix()
+    km = matrix.kilometres_from(district_id, matrix.ids)
+    distance = Case(
+        *[When(facility__district_id=int(i), then=Value(float(k))) for i, k in zip(matrix.ids, km) if not np.isnan(k)],
+        default=Value(None),
+        output_field=FloatField(),
+    )
+    return workers.annotate(outbreak_distance=distance).order_by(
+        F('outbreak_distance').asc(nulls_last=True), 'last_name', 'first_name'
+    )
+
+
+def _attach_latest_availability(workers):
+    """Set latest_availability on a page of workers with one query."""
+    latest_ids = HealthcareWorker.objects.filter(pk__in=[w.pk for w in workers]).annotate(
+        latest=Subquery(
+            AvailabilityRecord.objects.filter(hcw=OuterRef('pk')).order_by('-timestamp', '-pk').values('pk')[:1]
+        )
+    ).values('latest')
+    by_worker = {r.hcw_id: r for r in AvailabilityRecord.objects.filter(pk__in=latest_ids)}
+    for worker in workers:
+        record = by_worker.get(worker.pk)
+        worker.latest_availability = record and {
+            'status': record.status,
+            'timestamp': localtime(record.timestamp).isoformat() if record.timestamp else None,
+            'note': record.note,
+        }
+
+
+class OrganizationViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["name"]
 
 
-class FacilityViewSet(viewsets.ModelViewSet):
+class FacilityViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Facility.objects.select_related("district", "organization").only(
         'id','name','code','facility_type','district_id','organization_id'
     )
@@ -57,25 +157,25 @@ class FacilityViewSet(viewsets.ModelViewSet):
     search_fields = ["name", "code"]
 
 
-class CompetencyViewSet(viewsets.ModelViewSet):
+class CompetencyViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Competency.objects.all()
     serializer_class = CompetencySerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["name", "code"]
 
 
-class HealthcareWorkerPagination(PageNumberPagination):
+class HealthcareWorkerPagination(EstimatedCountPagination):
     page_size = 10         
     page_size_query_param = 'page_size'
     max_page_size = 50
 
 
-class HealthcareWorkerViewSet(viewsets.ModelViewSet):
+class HealthcareWorkerViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
 
     queryset =  (
         HealthcareWorker.objects.select_related
         ("facility", "facility__district","organization")
-        .only('id','national_id','first_name','last_name','phone','email','gender',
+        .only('id','national_id','first_name','last_name','phone','phone_e164','email','gender',
               'disability','language','position','is_active','facility_id','organization_id',
               'created_at','updated_at')
         )
@@ -87,7 +187,55 @@ class HealthcareWorkerViewSet(viewsets.ModelViewSet):
     ordering_fields = ["last_name", "first_name", "updated_at"]
     ordering = ["last_name"]
 
-class DeploymentHistoryViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def profile(self, request, pk=None):
+        """
+        Worker, facility and district, trainings, recent availability and
+        current and past deployments in one response, cached per worker.
+        """
+        try:
+            hcw_id = int(pk)
+        except ValueError:
+            return Response({'error': 'Worker id must be an integer'}, status=400)
+        profile = profiles.get_profile(
+            hcw_id, lambda worker: WorkerProfileSerializer(worker, context={'request': request}).data
+        )
+        if profile is None:
+            return Response({'error': 'Healthcare worker not found'}, status=404)
+        return Response(profile)
+
+    @action(detail=False, methods=['post'], url_path='lookup-phones')
+    def lookup_phones(self, request):
+        """
+        Resolve incoming phone numbers (any format) to workers in one indexed query.
+        Body: {"phones": ["0991 234 567", "+265881234567", ...]}
+        """
+        phones = request.data.get('phones') if isinstance(request.data, dict) else None
+        if not isinstance(phones, list) or not phones:
+            return Response({'error': 'phones must be a non-empty list'}, status=400)
+        if len(phones) > MAX_PHONE_LOOKUPS:
+            return Response({'error': f'At most {MAX_PHONE_LOOKUPS} phones per request'}, status=400)
+
+        normalized = [normalize_phone(str(phone)) for phone in phones]
+        workers = {}
+        rows = HealthcareWorker.objects.filter(
+            phone_e164__in={e164 for e164 in normalized if e164}
+        ).values(
+            'id', 'first_name', 'last_name', 'phone_e164', 'is_active',
+            'facility_id', district_id=F('facility__district_id'),
+        ).order_by('-is_active', 'id')
+        for row in rows:
+            workers.setdefault(row['phone_e164'], []).append(row)
+
+        return Response({
+            'results': [
+                {'phone': phone, 'e164': e164, 'workers': workers.get(e164, [])}
+                for phone, e164 in zip(phones, normalized)
+            ],
+            'matched': sum(1 for e164 in normalized if e164 in workers),
+        })
+
+class DeploymentHistoryViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = DeploymentHistory.objects.all()
     serializer_class = DeploymentHistorySerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -95,7 +243,7 @@ class DeploymentHistoryViewSet(viewsets.ModelViewSet):
     search_fields = ["hcw_name", "deployment_name"]
     
 
-class TrainingViewSet(viewsets.ModelViewSet):
+class TrainingViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Training.objects.select_related("hcw", "competency")
     serializer_class = TrainingSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -103,21 +251,178 @@ class TrainingViewSet(viewsets.ModelViewSet):
     search_fields = ["provider", "hcw__first_name", "hcw__last_name"]
 
 
-class AvailabilityRecordViewSet(viewsets.ModelViewSet):
+class AvailabilityRecordViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = AvailabilityRecord.objects.select_related("hcw")
     serializer_class = AvailabilityRecordSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ["status"]
     search_fields = ["hcw__first_name", "hcw__last_name", "hcw__phone"]
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Check in availability for many workers at once.
+        Body: {"entries": [{"hcw", "status", "location", "note"}, ...]}
+        """
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({'error': 'entries must be a non-empty list'}, status=400)
+        if len(entries) > MAX_BULK_ENTRIES:
+            return Response(
+                {'error': f'At most {MAX_BULK_ENTRIES} entries per request'},
+                status=400
+            )
+
+        try:
+            outcomes, summary = bulk_check_in(entries)
+        except Exception as e:
+            return Response(
+                {'error': str(e), 'detail': 'Failed to record availability'},
+                status=400
+            )
+        return Response({'summary': summary, 'results': outcomes})
+
 
-class DeploymentViewSet(viewsets.ModelViewSet):
+class DeploymentViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Deployment.objects.filter(status="active")  # Only show active deployments
     serializer_class = DeploymentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ["outbreak_type", "status", "district"]
     search_fields = ["hcw__first_name", "hcw__last_name", "role"]
 
+    def perform_create(self, serializer):
+        self._save_checked(serializer)
+
+    def perform_update(self, serializer):
+        self._save_checked(serializer)
+
+    def _save_checked(self, serializer):
+        # The exclusion constraint catches overlaps that raced past validation.
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'non_field_errors': ['Worker is already deployed during these dates.']})
+
+    @action(detail=False, methods=['get'])
+    def available_workers(self, request):
+        """
+        Active workers with no deployment between ?start_date and ?end_date.
+        Optional ?district narrows to workers based in that district.
+        ?outbreak_district ranks them nearest first with distance, travel time
+        and readiness, ?competency sets the competency readiness is scored on.
+        """
+        start_date = parse_date(request.GET.get('start_date', ''))
+        end_date = parse_date(request.GET.get('end_date', '')) if request.GET.get('end_date') else None
+        if start_date is None:
+            return Response({'error': 'start_date is required (YYYY-MM-DD)'}, status=400)
+        if end_date and end_date < start_date:
+            return Response({'error': 'end_date cannot be before start_date'}, status=400)
+
+        workers = free_workers(start_date, end_date, HealthcareWorkerViewSet.queryset.filter(is_active=True))
+        if request.GET.get('district'):
+            workers = workers.filter(facility__district_id=request.GET['district'])
+
+        outbreak = request.GET.get('outbreak_district')
+        if not outbreak:
+            workers = workers.order_by('last_name', 'first_name')
+            paginator = HealthcareWorkerPagination()
+            page = paginator.paginate_queryset(workers, request, view=self)
+            serializer = HealthcareWorkerSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        competency = request.GET.get('competency')
+        if not outbreak.isdigit() or (competency and not competency.isdigit()):
+            return Response({'error': 'outbreak_district and competency must be ids'}, status=400)
+        workers = _nearest_first(workers, int(outbreak)).prefetch_related(
+            Prefetch('trainings', queryset=Training.objects.select_related('competency'),
+                     to_attr='prefetched_trainings')
+        )
+        paginator = HealthcareWorkerPagination()
+        page = paginator.paginate_queryset(workers, request, view=self)
+        _attach_latest_availability(page)
+        serializer = DeploymentCandidateSerializer(page, many=True, context={
+            'outbreak_district': int(outbreak),
+            'requested_competency_id': int(competency) if competency else None,
+        })
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def check_conflicts(self, request):
+        """
+        Check a batch of proposed deployments for double-booking.
+        Body: {"deployments": [{"hcw", "start_date", "end_date", "id"?}, ...]}
+        """
+        proposals = []
+        for index, item in enumerate(request.data.get('deployments') or []):
+            try:
+                start_date = parse_date(item['start_date'])
+                end_date = parse_date(item['end_date']) if item.get('end_date') else None
+                proposal = {'hcw': int(item['hcw']), 'start_date': start_date, 'end_date': end_date}
+            except (KeyError, TypeError, ValueError):
+                return Response({'error': f'Invalid deployment at index {index}'}, status=400)
+            if start_date is None:
+                return Response({'error': f'Invalid start_date at index {index}'}, status=400)
+            if item.get('id'):
+                proposal['id'] = item['id']
+            proposals.append(proposal)
+
+        conflicts = find_conflicts(proposals)
+        return Response({'conflicts': conflicts, 'has_conflicts': bool(conflicts)})
+
+    @action(detail=False, methods=['post'])
+    def plan(self, request):
+        """
+        Propose workers for several deployment requests at once.
+        Body: {"requests": [DeploymentWizardRequestSerializer payload, ...]}
+        Nothing is saved, send the accepted proposals to confirm_plan.
+        """
+        serializer = DeploymentWizardRequestSerializer(data=request.data.get('requests'), many=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            plans = plan_deployments(serializer.validated_data)
+        except Exception as e:
+            return Response(
+                {'error': str(e), 'detail': 'Failed to plan deployments'},
+                status=500
+            )
+        return Response({'plans': plans})
+
+    @action(detail=False, methods=['post'])
+    def confirm_plan(self, request):
+        """
+        Create the accepted proposals from plan in one go.
+        Body: {"deployments": [{"hcw", "district", "outbreak_type", "start_date", "end_date", "role"?}, ...]}
+        """
+        serializer = PlannedDeploymentSerializer(data=request.data.get('deployments'), many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        proposals = [
+            {'hcw': row['hcw'].pk, 'start_date': row['start_date'], 'end_date': row.get('end_date')}
+            for row in rows
+        ]
+        try:
+            with transaction.atomic():
+                conflicts = find_conflicts(proposals)
+                if conflicts:
+                    return Response({'error': 'Some workers are no longer free', 'conflicts': conflicts}, status=409)
+                created = Deployment.objects.bulk_create(
+                    [Deployment(status="active", **row) for row in rows]
+                )
+                # bulk_create sends no post_save, so do what the Deployment receivers would.
+                audit.record_bulk_created(created)
+                events.publish_after_commit(events.deployment_events(created, "created"))
+                forecast.mark_dirty(forecast.worker_districts({d.hcw_id for d in created}))
+                profiles.forget(d.hcw_id for d in created)
+        except IntegrityError:
+            return Response({'error': 'Some workers are no longer free'}, status=409)
+
+        return Response(
+            {'created_count': len(created), 'ids': [d.pk for d in created]},
+            status=201
+        )
+
     @action(detail=False, methods=['get'])
     def active_count(self, request):
         """
@@ -134,51 +439,24 @@ class DeploymentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def archive_all(self, request):
-        
+        """
+        Queue archiving of all active deployments, poll the returned job for the result.
+        """
         try:
-            completion_notes = request.data.get('completion_notes', '')
-            archived_by = request.user if request.user.is_authenticated else None
-            
-            
-            active_deployments = Deployment.objects.filter(status="active")
-            
-            archived_count = 0
-            with transaction.atomic(): 
-                for deployment in active_deployments:
-                    
-                    DeploymentHistory.objects.create(
-                        hcw_name=f"{deployment.hcw.first_name} {deployment.hcw.last_name}",
-                        hcw_phone=deployment.hcw.phone,
-                        hcw_email=deployment.hcw.email,
-                        hcw_position=deployment.hcw.position,
-                        district_name=deployment.district.name,
-                        outbreak_type=deployment.outbreak_type,
-                        start_date=deployment.start_date,
-                        end_date=deployment.end_date,
-                        role=deployment.role,
-                        deployment_name=deployment.deployment_name,
-                        urgency=deployment.urgency,
-                        notes=deployment.notes,
-                        original_deployment_id=deployment.id,
-                        archived_by=archived_by,
-                        completion_notes=completion_notes
-                    )
-                    
-                    # Update deployment status to 'archived'
-                    deployment.status = "archived"
-                    deployment.save()
-                    archived_count += 1
-
-            return Response({
-                'message': f'Successfully archived {archived_count} deployments',
-                'archived_count': archived_count
-            })
-            
+            job = enqueue(
+                "archive_deployments",
+                {
+                    'completion_notes': request.data.get('completion_notes', ''),
+                    'archived_by': request.user.pk if request.user.is_authenticated else None,
+                },
+                user=request.user,
+            )
         except Exception as e:
             return Response(
-                {'error': str(e), 'detail': 'Failed to archive deployments'},
+                {'error': str(e), 'detail': 'Failed to queue archiving'},
                 status=400
             )
+        return job_accepted(request, job)
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -233,6 +511,472 @@ def healthcare_dashboard_data(request):
             status=500
         )
 
+
+
+@api_view(["POST"])
+def refresh_dashboard_rollups(request):
+    """Queue a refresh of the dashboard rollup cubes."""
+    job = enqueue("refresh_rollups", user=request.user)
+    return job_accepted(request, job)
+
+
+@api_view(["GET"])
+def district_map_data(request):
+    """
+    District features for the Malawi map with worker metrics joined on.
+    ?zoom=low|medium|high picks the geometry detail, ?geometry=false skips shapes.
+    """
+    filters = {
+        'district': request.GET.get('district'),
+        'gender': request.GET.get('gender'),
+        'organization': request.GET.get('organization'),
+        'facility_type': request.GET.get('facility_type'),
+    }
+    filters = {k: v for k, v in filters.items() if v is not None and v != ''}
+
+    zoom = request.GET.get('zoom', DEFAULT_ZOOM)
+    if zoom not in ZOOM_LEVELS:
+        return Response(
+            {'error': f'Unknown zoom level: {zoom}', 'choices': list(ZOOM_LEVELS)},
+            status=400
+        )
+    include_geometry = request.GET.get('geometry', 'true').lower() not in ('0', 'false', 'no')
+
+    try:
+        payload, etag = district_map(filters, zoom=zoom, include_geometry=include_geometry)
+    except Exception as e:
+        return Response(
+            {'error': str(e), 'detail': 'Failed to build district map data'},
+            status=500
+        )
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = Response(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of background jobs, users only see the jobs they started."""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file a finished job produced, e.g. a columnar export."""
+        job = self.get_object()
+        result = job.result if isinstance(job.result, dict) else {}
+        if job.status != 'succeeded' or not result.get('file'):
+            return Response(
+                {'error': 'No file to download', 'detail': f'Job is {job.status}', 'status': job.status},
+                status=409
+            )
+        if not default_storage.exists(result['file']):
+            return Response({'error': 'The file has expired', 'detail': 'Start the export again'}, status=410)
+        return FileResponse(
+            default_storage.open(result['file'], 'rb'), as_attachment=True,
+            filename=result['filename'], content_type=result['content_type']
+        )
+
+
+class DuplicateCandidateViewSet(viewsets.ReadOnlyModelViewSet):
+    """Review queue of workers that look like the same person, best matches first."""
+    queryset = DuplicateCandidate.objects.select_related(
+        'worker_a__facility', 'worker_b__facility'
+    ).order_by('-score', 'id')
+    serializer_class = DuplicateCandidateSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status']
+
+    def _pending(self):
+        candidate = self.get_object()
+        if candidate.status != 'pending':
+            raise ValidationError({'error': f'Candidate is already {candidate.status}'})
+        return candidate
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Merge the pair into one worker.
+        Body: {"keep": <worker id>}, defaults to the older record.
+        """
+        candidate = self._pending()
+        pair = [candidate.worker_a_id, candidate.worker_b_id]
+        keep = request.data.get('keep', pair[0])
+        try:
+            keep = int(keep)
+        except (TypeError, ValueError):
+            return Response({'error': 'keep must be a worker id'}, status=400)
+        if keep not in pair:
+            return Response({'error': 'keep must be one of the pair'}, status=400)
+
+        try:
+            result = merge_workers(keep, pair[1] if keep == pair[0] else pair[0], candidate, request.user)
+        except MergeError as e:
+            return Response({'error': str(e), 'detail': 'Failed to merge workers'}, status=409)
+        return Response(result)
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """Mark the pair as different people, it will not be suggested again."""
+        candidate = self._pending()
+        candidate.status = 'dismissed'
+        candidate.reviewed_at = timezone.now()
+        candidate.reviewed_by = request.user
+        candidate.save(update_fields=['status', 'reviewed_at', 'reviewed_by'])
+        return Response(self.get_serializer(candidate).data)
+
+    @action(detail=False, methods=['post'])
+    def scan(self, request):
+        """Queue a full duplicate scan over every worker."""
+        return job_accepted(request, enqueue('find_duplicates', {'workers': None}, user=request.user))
+
+
+class AuditEntryPagination(EstimatedCountPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class AuditEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Change history of workers, trainings and deployments, newest first. Staff only.
+    ?entity=deployment&object_id=12, ?timestamp__gte=...&timestamp__lt=..., ?user=, ?action=
+    """
+    queryset = AuditEntry.objects.select_related('user').order_by('-timestamp', '-id')
+    serializer_class = AuditEntrySerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = AuditEntryPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        'entity': ['exact'],
+        'object_id': ['exact'],
+        'action': ['exact'],
+        'user': ['exact'],
+        'timestamp': ['gte', 'lt'],
+    }
+
+
+def _byte_range(header, size):
+    """(start, end) for a single 'bytes=' range, None if absent, False if unsatisfiable."""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, min(end, size - 1)
+
+
+class RosterSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Offline roster bundles for field devices, one per district plus "national".
+    Bundles are gzip'd NDJSON with columnar chunks per table.
+    """
+    queryset = RosterSnapshot.objects.select_related('district').order_by('key')
+    serializer_class = RosterSnapshotSerializer
+    lookup_field = 'key'
+
+    def retrieve(self, request, *args, **kwargs):
+        key = kwargs['key']
+        if not self.get_queryset().filter(key=key).exists():
+            if key != NATIONAL and not District.objects.filter(code=key).exists():
+                return Response({'error': f'Unknown snapshot: {key}'}, status=404)
+            job = rebuild_in_background() or Job.objects.filter(
+                kind='build_snapshots', status__in=['queued', 'running']
+            ).order_by('-id').first()
+            return job_accepted(request, job)
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, key=None):
+        """Serve the bundle with ETag revalidation and single byte-range resume."""
+        snapshot = self.get_object()
+        if not default_storage.exists(snapshot.path):
+            rebuild_in_background()
+            return Response({'error': 'Snapshot file is missing, a rebuild has been queued'}, status=503)
+
+        # The flag is kept by signals and jobs, no need to re-fingerprint here.
+        stale = snapshot.stale
+        if stale:
+            rebuild_in_background()
+
+        etag = f'"{snapshot.key}-v{snapshot.version}-{snapshot.fingerprint[:12]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            return response
+
+        size = snapshot.size
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            byte_range = _byte_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            with default_storage.open(snapshot.path, 'rb') as f:
+                f.seek(start)
+                response = HttpResponse(f.read(end - start + 1), status=206, content_type='application/gzip')
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            response = FileResponse(default_storage.open(snapshot.path, 'rb'), content_type='application/gzip')
+            response['Content-Length'] = size
+
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Disposition'] = f'attachment; filename="roster-{snapshot.key}-v{snapshot.version}.ndjson.gz"'
+        response['X-Snapshot-Stale'] = 'true' if stale else 'false'
+        return response
+
+
+@api_view(["GET"])
+def training_coverage(request):
+    """
+    Share of active workers holding a valid certification, district x competency.
+    ?by=position,gender splits rows further, ?district= and ?competency= take
+    comma-separated ids.
+    """
+    by = [d for d in request.GET.get('by', '').split(',') if d]
+    unknown = [d for d in by if d not in DIMENSIONS]
+    if unknown:
+        return Response(
+            {'error': f'Unknown dimension: {", ".join(unknown)}', 'choices': list(DIMENSIONS)},
+            status=400
+        )
+    try:
+        district_ids = {int(v) for v in request.GET.get('district', '').split(',') if v}
+        competency_ids = {int(v) for v in request.GET.get('competency', '').split(',') if v}
+    except ValueError:
+        return Response({'error': 'district and competency must be comma-separated ids'}, status=400)
+
+    try:
+        return Response(coverage_matrix(by, district_ids, competency_ids))
+    except Exception as e:
+        return Response(
+            {'error': str(e), 'detail': 'Failed to compute training coverage'},
+            status=500
+        )
+
+
+@api_view(["GET"])
+def workforce_forecast(request):
+    """
+    Qualified, lapsing, deployed and available workers per district and
+    competency for the next 12 months, from the precomputed snapshots.
+    ?district= and ?competency= take comma-separated ids.
+    """
+    try:
+        district_ids = {int(v) for v in request.GET.get('district', '').split(',') if v}
+        competency_ids = {int(v) for v in request.GET.get('competency', '').split(',') if v}
+    except ValueError:
+        return Response({'error': 'district and competency must be comma-separated ids'}, status=400)
+
+    try:
+        data = forecast_series(district_ids, competency_ids)
+    except Exception as e:
+        return Response(
+            {'error': str(e), 'detail': 'Failed to load workforce forecast'},
+            status=500
+        )
+
+    if data['stale'] and not Job.objects.filter(
+        kind='refresh_forecast', status__in=['queued', 'running']
+    ).exists():
+        enqueue('refresh_forecast', {}, user=request.user)
+    return Response(data)
+
+
+@api_view(["GET"])
+def autocomplete(request, kind):
+    """
+    Typeahead for facilities, organizations and competencies.
+    ?q=<text>&limit=<n>&district=<id> (district only applies to facilities)
+    """
+    if kind not in AUTOCOMPLETE_SOURCES:
+        return Response({'error': f'Unknown autocomplete source: {kind}'}, status=404)
+    query = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        district = int(request.GET['district']) if request.GET.get('district') else None
+    except ValueError:
+        return Response({'error': 'limit and district must be integers'}, status=400)
+
+    results, version = suggest(kind, query, limit, district)
+    etag = '"%s"' % hashlib.md5(f'{kind}|{version}|{query}|{limit}|{district}'.encode()).hexdigest()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = Response({'kind': kind, 'query': query, 'results': results})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
+
+@api_view(["POST"])
+def columnar_export(request, table):
+    """
+    Queue a Parquet or Arrow IPC export of a table for notebooks.
+    file_format=parquet|arrow (format is taken by DRF content negotiation),
+    partition=district builds a zip of one file per district. The file is
+    served from /api/jobs/<id>/download/ once the job succeeds.
+    """
+    params = request.data if request.data else request.query_params
+    fmt = params.get('file_format', 'parquet')
+    if table not in EXPORT_TABLES:
+        return Response({'error': f'Unknown table: {table}', 'choices': list(EXPORT_TABLES)}, status=404)
+    if fmt not in EXPORT_FORMATS:
+        return Response({'error': f'Unknown format: {fmt}', 'choices': list(EXPORT_FORMATS)}, status=400)
+
+    job = enqueue('export_columnar', {
+        'table': table,
+        'file_format': fmt,
+        'partition': params.get('partition') == 'district',
+    }, user=request.user)
+    response = job_accepted(request, job)
+    response.data['download_url'] = request.build_absolute_uri(f'/api/jobs/{job.pk}/download/')
+    return response
+
+
+@api_view(["POST"])
+def batch_requests(request):
+    """
+    Run several read requests in one round trip.
+    Body: {"requests": [{"id": "districts", "path": "/api/districts/", "params": {...}}, ...],
+           "parallel": false}
+    """
+    try:
+        items = parse_items(request.data.get('requests') if isinstance(request.data, dict) else None)
+    except BatchError as e:
+        return Response({'error': str(e)}, status=400)
+
+    parallel = bool(request.data.get('parallel', False))
+    try:
+        responses = run_batch(request._request, request.user, request.auth, items, parallel=parallel)
+    except Exception as e:
+        return Response(
+            {'error': str(e), 'detail': 'Failed to run batch'},
+            status=500
+        )
+    return Response({'responses': responses})
+
+
+EVENT_HEARTBEAT_SECONDS = 15
+
+
+@api_view(['POST'])
+def stream_ticket(request):
+    """
+    Single-use ticket for opening /api/events/. EventSource cannot set
+    headers, so the ticket goes in the URL instead of the access token.
+    """
+    ticket = issue_ticket(request.user)
+    return Response({'ticket': ticket.key, 'expires_in': TICKET_SECONDS}, status=201)
+
+
+def _stream_user(request):
+    """User for an event stream, from the Authorization header or a ?ticket=."""
+    auth = ClaimsJWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        key = request.GET.get('ticket')
+        return redeem_ticket(key) if key else None
+    raw = auth.get_raw_token(header)
+    if not raw:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError):
+        return None
+
+
+def _event_districts(values):
+    """District ids from ?district=1&district=BT or ?district=1,2, None for all."""
+    requested = [v for value in values for v in value.split(',') if v]
+    if not requested:
+        return None
+    ids = {int(v) for v in requested if v.isdigit()}
+    codes = [v for v in requested if not v.isdigit()]
+    if codes:
+        ids.update(District.objects.filter(code__in=codes).values_list('id', flat=True))
+    return ids
+
+
+def _sse(event):
+    lines = f"event: {event['type']}\n"
+    if 'id' in event:
+        lines += f"id: {event['id']}\n"
+    return lines + f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def live_events(request):
+    """
+    Server-sent events for availability, deployment and worker changes.
+    ?district= limits the stream to those districts (ids or codes, repeatable).
+    Reconnecting clients send Last-Event-ID and get missed events replayed,
+    or a `resync` event when too much was missed. Needs an ASGI server.
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+    districts = await sync_to_async(_event_districts)(request.GET.getlist('district'))
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    async def stream():
+        subscription, replay = broker.subscribe(districts, last_id)
+        try:
+            yield 'retry: 5000\n\n'
+            for event in ([{'type': 'resync'}] if replay is None else replay):
+                yield _sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _sse(event)
+                if event['type'] == 'resync':
+                    break
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def job_accepted(request, job):
+    """202 response pointing the client at the job status endpoint."""
+    return Response(
+        {
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': request.build_absolute_uri(f'/api/jobs/{job.pk}/'),
+        },
+        status=202
+    )
+
         
 @api_view(["GET"])
 def deployment_search(request):
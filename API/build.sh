@@ -3,4 +3,8 @@ set -o errexit
 pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+python manage.py load_reference_data
+python manage.py reconcile_counters
+python manage.py refresh_rollups
+python manage.py refresh_forecast
\ No newline at end of file
@@ -0,0 +1,28 @@
+#!/usr/bin/env bash
+# Start the service: the ASGI web server (so /api/events/ can stream) and
+# the background job worker that runs everything views enqueue (exports,
+# archiving, rollup refreshes, snapshots...). Both share the database and
+# the default file storage.
+set -o errexit
+
+python manage.py run_jobs --concurrency "${JOB_CONCURRENCY:-2}" &
+jobs_pid=$!
+
+gunicorn WorkForce.asgi:application \
+    -k uvicorn.workers.UvicornWorker \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --workers "${WEB_CONCURRENCY:-2}" &
+web_pid=$!
+
+stop() {
+    # run_jobs finishes its current jobs on SIGTERM.
+    kill -TERM "$jobs_pid" "$web_pid" 2>/dev/null || true
+}
+trap stop TERM INT
+
+# If either process exits, stop the other so the platform restarts both.
+status=0
+wait -n || status=$?
+stop
+wait || true
+exit "$status"
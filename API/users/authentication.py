@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+# Signed into every token, request.user is built from the id and these.
+CLAIM_FIELDS = ("username",)
+# Access tokens live for a day, so flags that decide what a user may do
+# are never taken from claims but from cached_user_status().
+STATUS_FIELDS = ("is_active", "is_staff", "is_superuser")
+DEFAULT_CACHE_SECONDS = 300
+DEFAULT_LOCAL_CACHE_SECONDS = 30
+# Caches private to one process, see cached_user_status().
+LOCAL_CACHE_BACKENDS = ("LocMemCache", "DummyCache")
+
+_local_lock = threading.Lock()
+_local_status = {}  # user id -> (monotonic expiry, status or None)
+
+
+def _cache_key(user_id):
+    return f"auth-user-status:{user_id}"
+
+
+def cache_seconds():
+    return getattr(settings, "AUTH_USER_CACHE_SECONDS", DEFAULT_CACHE_SECONDS)
+
+
+def local_cache_seconds():
+    return getattr(settings, "AUTH_USER_LOCAL_CACHE_SECONDS", DEFAULT_LOCAL_CACHE_SECONDS)
+
+
+def shared_cache():
+    """Whether the default cache is seen by every web and job process."""
+    return settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1] not in LOCAL_CACHE_BACKENDS
+
+
+def forget_user(user_id):
+    with _local_lock:
+        _local_status.pop(user_id, None)
+    if shared_cache():
+        cache.delete(_cache_key(user_id))
+
+
+def _load_status(user_id):
+    return User.objects.filter(pk=user_id).values(*STATUS_FIELDS).first()
+
+
+def cached_user_status(user_id):
+    """
+    Active and staff flags of a user, None if the user is gone.
+
+    With a shared cache they are kept for AUTH_USER_CACHE_SECONDS and cleared
+    everywhere when the user is saved. Otherwise each process keeps them for
+    AUTH_USER_LOCAL_CACHE_SECONDS, so a change saved by another process
+    applies here within that time.
+    """
+    if shared_cache():
+        key = _cache_key(user_id)
+        status = cache.get(key)
+        if status is None:
+            status = _load_status(user_id) or {}
+            cache.set(key, status, cache_seconds())
+        return status or None
+
+    now = time.monotonic()
+    with _local_lock:
+        expires, status = _local_status.get(user_id, (0, None))
+    if expires <= now:
+        status = _load_status(user_id)
+        with _local_lock:
+            _local_status[user_id] = (now + local_cache_seconds(), status)
+    return status
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login tokens that also carry the username."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a User query per request.
+
+    The signed token carries the user's id and username. Active and staff
+    flags come from cached_user_status() rather than the claims, so a
+    deactivation or demotion applies without waiting for the token to expire.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            # Tokens carry the id as a string.
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        status = cached_user_status(user_id)
+        if status is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not status["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        values = {"id": user_id, **status}
+        if "username" in validated_token:
+            values["username"] = validated_token["username"]
+        # Fields not set here (email, password, last_login...) stay deferred,
+        # so reading them fetches from the database and save() cannot blank them.
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        return User.from_db("default", fields, [values[f] for f in fields])
@@ -1,3 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from . import authentication
+from .authentication import ClaimsJWTAuthentication, ClaimsTokenObtainPairSerializer, cached_user_status
+
+# The memory cache standing in for one every process shares.
+shared_cache = mock.patch("users.authentication.shared_cache", return_value=True)
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("nurse", email="nurse@example.org", is_staff=True)
+        self.token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.addCleanup(cache.clear)
+        self.addCleanup(authentication._local_status.clear)
+
+    def authenticate(self):
+        return ClaimsJWTAuthentication().get_user(self.token)
+
+    def test_user_is_built_from_claims_without_a_query(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.username, user.is_staff), (self.user.pk, "nurse", True))
+
+    def test_deferred_fields_load_on_demand(self):
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "nurse@example.org")
+
+    def test_saving_the_user_applies_at_once_in_this_process(self):
+        self.authenticate()
+        self.user.is_staff = False
+        self.user.save()
+        self.assertFalse(self.authenticate().is_staff)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_change_from_another_process_applies_after_the_local_ttl(self):
+        self.authenticate()
+        # Another process deactivates the user, nothing clears this process's entry.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.authenticate()
+        with mock.patch("users.authentication.time.monotonic", return_value=10 ** 9):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
+
+    def test_deleted_user_is_refused(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @shared_cache
+    def test_shared_cache_spares_the_query(self, _):
+        cached_user_status(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.user.pk)
 
-# Create your tests here.
+    @shared_cache
+    def test_saving_the_user_clears_the_shared_entry(self, _):
+        cached_user_status(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
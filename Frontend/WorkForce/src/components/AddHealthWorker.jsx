@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { fetchSuggestions } from '../utils/autocomplete';
 
 const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
   const [currentStep, setCurrentStep] = useState(1);
@@ -26,11 +27,15 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
 
   const [dropdownData, setDropdownData] = useState({
     districts: [],
-    facilities: [],
     organizations: [],
     competencies: []
   });
 
+  // Facilities are looked up as the user types instead of loading the whole registry.
+  const [facilityQuery, setFacilityQuery] = useState('');
+  const [facilitySuggestions, setFacilitySuggestions] = useState([]);
+  const [showFacilitySuggestions, setShowFacilitySuggestions] = useState(false);
+
 
   const getAuthConfig = () => {
     
@@ -93,7 +98,6 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
       const endpoints = {
         districts: 'https://mohsystem.onrender.com/api/districts/',
         organizations: 'https://mohsystem.onrender.com/api/organizations/',
-        facilities: 'https://mohsystem.onrender.com/api/facilities/',
         competencies: 'https://mohsystem.onrender.com/api/competencies/'
       };
 
@@ -109,7 +113,7 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
       }
 
     
-      const [districtsResponse, organizationsResponse, facilitiesResponse, competenciesResponse] = await Promise.all([
+      const [districtsResponse, organizationsResponse, competenciesResponse] = await Promise.all([
         axios.get(endpoints.districts, config).catch(error => {
           console.error('Districts fetch error:', error.response?.status);
           return { data: [] };
@@ -118,10 +122,6 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
           console.error('Organizations fetch error:', error.response?.status);
           return { data: [] };
         }),
-        axios.get(endpoints.facilities, config).catch(error => {
-          console.error('Facilities fetch error:', error.response?.status);
-          return { data: [] };
-        }),
         axios.get(endpoints.competencies, config).catch(error => {
           console.error('Competencies fetch error:', error.response?.status);
           return { data: [] };
@@ -131,7 +131,6 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
       const dropdownDataResult = {
         districts: extractData(districtsResponse.data),
         organizations: extractData(organizationsResponse.data),
-        facilities: extractData(facilitiesResponse.data),
         competencies: extractData(competenciesResponse.data)
       };
 
@@ -161,6 +160,42 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
 
  
 
+  useEffect(() => {
+    if (!showFacilitySuggestions || !facilityQuery.trim()) {
+      setFacilitySuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const results = await fetchSuggestions('facilities', facilityQuery, getAuthConfig(), {
+          signal: controller.signal
+        });
+        setFacilitySuggestions(results);
+      } catch (error) {
+        if (!axios.isCancel(error)) {
+          console.error('Facility lookup error:', error.response?.status);
+        }
+      }
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [facilityQuery, showFacilitySuggestions]);
+
+  const selectFacility = (facility) => {
+    setFormData(prev => ({ ...prev, facility: facility.id }));
+    setFacilityQuery(`${facility.label} - ${facility.district_name}`);
+    setShowFacilitySuggestions(false);
+  };
+
+  const handleFacilityQueryChange = (e) => {
+    setFacilityQuery(e.target.value);
+    setShowFacilitySuggestions(true);
+    setFormData(prev => ({ ...prev, facility: '' }));
+  };
+
   const handleInputChange = (e) => {
     const { name, value, type, checked } = e.target;
     setFormData(prev => ({
@@ -332,6 +367,8 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
       note: '',
       location: ''
     });
+    setFacilityQuery('');
+    setFacilitySuggestions([]);
     setCurrentStep(1);
   };
 
@@ -582,43 +619,34 @@ const AddHealthWorker = ({ isOpen, onClose, onSuccess }) => {
           Health Facility *
         </label>
         <div className="relative">
-          <select
+          <input
+            type="text"
             name="facility"
-            value={formData.facility}
-            onChange={handleInputChange}
+            value={facilityQuery}
+            onChange={handleFacilityQueryChange}
+            onFocus={() => setShowFacilitySuggestions(true)}
+            onBlur={() => setTimeout(() => setShowFacilitySuggestions(false), 150)}
+            placeholder="Start typing a facility name or code"
+            autoComplete="off"
             required
-            className="w-full px-4 py-3 border border-gray-300/80 rounded-xl focus:ring-2 focus:ring-blue-500/50 focus:border-blue-500/50 bg-white/80 backdrop-blur-sm transition-all duration-200 shadow-sm hover:shadow-md focus:shadow-lg appearance-none cursor-pointer"
-          >
-            <option value="" className="text-gray-400">-- Select Health Facility --</option>
-            {dropdownData.facilities.map((facility) => {
-            
-              let districtName = 'Unknown District';
-              
-              if (typeof facility.district === 'string') {
-                districtName = facility.district;
-              } else if (facility.district && typeof facility.district === 'object') {
-                districtName = facility.district.name || facility.district.code || `District ${facility.district.id}`;
-              } else if (facility.district_name) {
-                districtName = facility.district_name;
-              }
-              
-              return (
-                <option 
-                  key={facility.id} 
-                  value={facility.id}
-                  className="text-gray-900 py-2"
-                >
-                  {facility.name} - {districtName}
-                </option>
-              );
-            })}
-          </select>
-          
-          <div className="absolute inset-y-0 right-0 flex items-center px-3 pointer-events-none">
-            <svg className="h-5 w-5 text-gray-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-              <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M19 9l-7 7-7-7" />
-            </svg>
-          </div>
+            className="w-full px-4 py-3 border border-gray-300/80 rounded-xl focus:ring-2 focus:ring-blue-500/50 focus:border-blue-500/50 bg-white/80 backdrop-blur-sm transition-all duration-200 shadow-sm hover:shadow-md focus:shadow-lg"
+          />
+          {showFacilitySuggestions && facilitySuggestions.length > 0 && (
+            <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded-xl shadow-lg max-h-64 overflow-y-auto">
+              {facilitySuggestions.map((facility) => (
+                <li key={facility.id}>
+                  <button
+                    type="button"
+                    onMouseDown={(e) => e.preventDefault()}
+                    onClick={() => selectFacility(facility)}
+                    className="w-full text-left px-4 py-2 text-gray-900 hover:bg-blue-50"
+                  >
+                    {facility.label} - {facility.district_name || 'Unknown District'}
+                  </button>
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
         {formData.facility && (
           <p className="text-xs text-green-600 mt-2 flex items-center">
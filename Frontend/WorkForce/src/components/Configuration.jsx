@@ -18,6 +18,7 @@ import {
   Building,
   Award
 } from 'lucide-react';
+import { subscribeLiveEvents } from '../utils/liveEvents';
 
 const Configuration = () => {
   
@@ -203,6 +204,23 @@ const Configuration = () => {
     fetchDistricts();
   }, []);
 
+  // Availability changes are patched in place, anything else refetches.
+  useEffect(() => {
+    return subscribeLiveEvents({
+      onEvent: (event) => {
+        if (event.type === 'availability' && event.op !== 'deleted') {
+          const patch = (list) => list.map(worker =>
+            worker.id === event.hcw ? { ...worker, status: event.status } : worker
+          );
+          setAllWorkers(patch);
+          setWorkers(patch);
+        } else if (event.type === 'worker' || event.type === 'resync') {
+          fetchWorkforceData();
+        }
+      },
+    });
+  }, []);
+
   
   const applyFilters = () => {
     let filtered = allWorkers;
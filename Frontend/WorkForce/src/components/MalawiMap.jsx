@@ -1,14 +1,30 @@
-import React from "react";
+import React, { useEffect, useState } from "react";
+import axios from "axios";
 import { ComposableMap, Geographies, Geography } from "react-simple-maps";
-import malawiGeo from "../data/malawi.geo.json";
+import { getAuthConfig } from "../utils/auth";
 
-const MalawiMap = ({ districtData = [], selectedDistrict, onDistrictClick }) => {
-  const getDistrictColor = (name) => {
-    const district = districtData.find((d) => d.name === name);
-    const count = district ? district.total_workers : 0;
+const MAP_URL = "https://mohsystem.onrender.com/api/map/districts/";
 
-    const max = Math.max(...districtData.map((d) => d.total_workers || 0), 1);
-    const ratio = count / max;
+const MalawiMap = ({ filters = {}, zoom = "low", selectedDistrict, onDistrictClick }) => {
+  const [mapData, setMapData] = useState(null);
+
+  useEffect(() => {
+    const params = new URLSearchParams({ zoom });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value && value !== "all") params.append(key, value);
+    });
+
+    axios
+      .get(`${MAP_URL}?${params.toString()}`, getAuthConfig())
+      .then((response) => setMapData(response.data))
+      .catch((error) => console.error("Error fetching district map data:", error));
+  }, [zoom, JSON.stringify(filters)]);
+
+  const features = mapData?.features || [];
+  const max = Math.max(...features.map((f) => f.properties.workers || 0), 1);
+
+  const getDistrictColor = (properties) => {
+    const ratio = (properties.workers || 0) / max;
 
     if (ratio > 0.7) return "#DC2626";
     if (ratio > 0.4) return "#F59E0B";
@@ -26,7 +42,7 @@ const MalawiMap = ({ districtData = [], selectedDistrict, onDistrictClick }) =>
         width={400}
         height={500}
       >
-        <Geographies geography={malawiGeo}>
+        <Geographies geography={mapData || { type: "FeatureCollection", features: [] }}>
           {({ geographies }) =>
             geographies.map((geo) => {
               const name = geo.properties.name;
@@ -38,7 +54,7 @@ const MalawiMap = ({ districtData = [], selectedDistrict, onDistrictClick }) =>
                   onClick={() => onDistrictClick(name)}
                   style={{
                     default: {
-                      fill: getDistrictColor(name),
+                      fill: getDistrictColor(geo.properties),
                       stroke: isSelected ? "#7C3AED" : "#374151",
                       strokeWidth: isSelected ? 2 : 0.5,
                       outline: "none",
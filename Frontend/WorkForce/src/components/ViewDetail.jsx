@@ -1,7 +1,42 @@
 
+import React, { useState, useEffect } from 'react';
+import axios from 'axios';
+
+const PROFILE_URL = 'https://mohsystem.onrender.com/api/hcws/';
+
 const ViewDetail = ({ worker, isOpen, onClose }) => {
+  const [profile, setProfile] = useState(null);
+
+  // One request for the worker's trainings, availability and deployments.
+  useEffect(() => {
+    if (!isOpen || !worker?.id) return undefined;
+    const token = localStorage.getItem('token') ||
+                  localStorage.getItem('authToken') ||
+                  localStorage.getItem('access');
+    const controller = new AbortController();
+    setProfile(null);
+    axios.get(`${PROFILE_URL}${worker.id}/profile/`, {
+      headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+      timeout: 10000,
+      signal: controller.signal
+    })
+      .then((res) => setProfile(res.data))
+      .catch((err) => {
+        if (!axios.isCancel(err)) console.error('Failed to load worker profile:', err);
+      });
+    return () => controller.abort();
+  }, [isOpen, worker?.id]);
+
   if (!isOpen || !worker) return null;
 
+  const trainings = profile?.trainings || [];
+  const competencies = profile
+    ? [...new Set(trainings.map((t) => t.competency_name).filter(Boolean))]
+    : worker.competencies;
+  const lastTraining = profile ? trainings[0]?.date_completed : worker.lastTraining;
+  const currentDeployments = profile?.current_deployments || [];
+  const latestAvailability = profile?.recent_availability?.[0];
+
 
   const formatDate = (dateString) => {
     if (!dateString) return 'Not available';
@@ -174,8 +209,8 @@ const ViewDetail = ({ worker, isOpen, onClose }) => {
                   <div className="mb-4">
                     <label className="block text-sm font-medium text-gray-700 mb-3">Skills & Competencies</label>
                     <div className="flex flex-wrap gap-2">
-                      {worker.competencies && worker.competencies.length > 0 ? (
-                        worker.competencies.map((comp, index) => (
+                      {competencies && competencies.length > 0 ? (
+                        competencies.map((comp, index) => (
                           <span
                             key={index}
                             className="inline-flex items-center px-3 py-2 rounded-full text-sm font-medium bg-purple-100 text-purple-800 border border-purple-200/50"
@@ -192,11 +227,51 @@ const ViewDetail = ({ worker, isOpen, onClose }) => {
                   <div>
                     <label className="block text-sm font-medium text-gray-700 mb-1">Last Training Date</label>
                     <p className="text-lg text-gray-900">
-                      {worker.lastTraining ? formatDate(worker.lastTraining) : 'No training records'}
+                      {lastTraining ? formatDate(lastTraining) : 'No training records'}
                     </p>
                   </div>
                 </div>
 
+                {profile && (
+                  <div className="bg-white/60 backdrop-blur-sm border border-gray-300/50 rounded-xl p-6 mb-6 shadow-sm">
+                    <h3 className="text-lg font-semibold text-gray-900 mb-4 flex items-center">
+                      <span className="w-2 h-2 bg-blue-500 rounded-full mr-2"></span>
+                      Deployments & Availability
+                    </h3>
+
+                    <div className="mb-4">
+                      <label className="block text-sm font-medium text-gray-700 mb-1">Latest Availability</label>
+                      {latestAvailability ? (
+                        <p className="text-lg text-gray-900">
+                          <span className={`inline-flex px-3 py-1 text-sm font-semibold rounded-full ${getStatusColor(latestAvailability.status)}`}>
+                            {formatStatus(latestAvailability.status)}
+                          </span>
+                          <span className="ml-2 text-sm text-gray-600">{formatDate(latestAvailability.timestamp)}</span>
+                        </p>
+                      ) : (
+                        <p className="text-gray-500 text-sm">No availability records</p>
+                      )}
+                    </div>
+
+                    <div>
+                      <label className="block text-sm font-medium text-gray-700 mb-1">Current Deployments</label>
+                      {currentDeployments.length > 0 ? (
+                        currentDeployments.map((d) => (
+                          <p key={d.id} className="text-lg text-gray-900">
+                            {d.district_name} ({formatStatus(d.outbreak_type)}) from {formatDate(d.start_date)}
+                            {d.end_date ? ` to ${formatDate(d.end_date)}` : ''}
+                          </p>
+                        ))
+                      ) : (
+                        <p className="text-gray-500 text-sm">Not currently deployed</p>
+                      )}
+                      {profile.past_deployments?.length > 0 && (
+                        <p className="text-sm text-gray-600 mt-1">{profile.past_deployments.length} past deployment(s)</p>
+                      )}
+                    </div>
+                  </div>
+                )}
+
                 {/* Additional Information Card */}
                 <div className="bg-white/60 backdrop-blur-sm border border-gray-300/50 rounded-xl p-6 shadow-sm">
                   <h3 className="text-lg font-semibold text-gray-900 mb-4 flex items-center">
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { ChevronLeft, ChevronRight, ChevronsLeft, ChevronsRight,Eye, Edit, Trash2, MoreVertical } from 'lucide-react';
 import axios from 'axios';
+import { fetchBatch } from '../utils/batch';
 import AddHealthWorker from './AddHealthWorker';
 import ViewDetail from './ViewDetail';
 
@@ -114,20 +115,9 @@ const WorkForce = () => {
 
   useEffect(() => {
     fetchWorkforceData();
-    fetchDistricts();
   }, []);
 
   
-  const fetchDistricts = async () => {
-    try {
-      const config = getAuthConfig();
-      const response = await axios.get('https://mohsystem.onrender.com/api/districts/', config);
-      setDistricts(response.data);
-    } catch (error) {
-      console.error('Error fetching districts:', error);
-    }
-  };
-
  const fetchAllPages = async (url, config) => {
   let results = [];
   let nextUrl = url;
@@ -156,11 +146,25 @@ const fetchWorkforceData = async () => {
       return;
     }
 
-    // Fetch all pages
+    // First pages and districts in one round trip, then any remaining pages
+    const firstPages = await fetchBatch([
+      { id: 'districts', path: '/api/districts/' },
+      { id: 'hcws', path: '/api/hcws/' },
+      { id: 'trainings', path: '/api/trainings/' },
+      { id: 'availability', path: '/api/availability/' },
+    ], config);
+    setDistricts(firstPages.districts);
+
+    const remainingPages = (page) => {
+      const results = page.results || page;
+      return page.next
+        ? fetchAllPages(page.next, config).then(rest => [...results, ...rest])
+        : Promise.resolve(results);
+    };
     const [hcws, trainings, availability] = await Promise.all([
-      fetchAllPages('https://mohsystem.onrender.com/api/hcws/', config),
-      fetchAllPages('https://mohsystem.onrender.com/api/trainings/', config),
-      fetchAllPages('https://mohsystem.onrender.com/api/availability/', config),
+      remainingPages(firstPages.hcws),
+      remainingPages(firstPages.trainings),
+      remainingPages(firstPages.availability),
     ]);
 
     const transformedWorkers = transformApiData(hcws, trainings, availability);
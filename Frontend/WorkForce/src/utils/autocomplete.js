@@ -0,0 +1,14 @@
+import axios from 'axios';
+
+const AUTOCOMPLETE_URL = 'https://mohsystem.onrender.com/api/autocomplete/';
+
+// Top matches for a typeahead, `kind` is facilities, organizations or
+// competencies. Pass an AbortController signal to drop stale keystrokes.
+export const fetchSuggestions = async (kind, query, config, { district, limit = 10, signal } = {}) => {
+  const params = { q: query, limit };
+  if (district) {
+    params.district = district;
+  }
+  const response = await axios.get(`${AUTOCOMPLETE_URL}${kind}/`, { ...config, params, signal });
+  return response.data.results;
+};
@@ -0,0 +1,17 @@
+import axios from 'axios';
+
+const BATCH_URL = 'https://mohsystem.onrender.com/api/batch/';
+
+// Run several GET requests in one round trip. `requests` is a list of
+// { id, path, params }, the result maps each id to its response body.
+export const fetchBatch = async (requests, config, { parallel = true } = {}) => {
+  const response = await axios.post(BATCH_URL, { requests, parallel }, config);
+  const bodies = {};
+  response.data.responses.forEach(({ id, status, body }) => {
+    if (status >= 400) {
+      throw new Error(`Batch request ${id} failed with status ${status}`);
+    }
+    bodies[id] = body;
+  });
+  return bodies;
+};
@@ -0,0 +1,84 @@
+// Server-sent change events from /api/events/ so views can update in place
+// instead of polling. The stream is opened with a single-use ticket, so on
+// every reconnect a new ticket is fetched and the last seen event id sent,
+// the server replays what was missed or sends `resync`.
+const EVENTS_URL = 'https://mohsystem.onrender.com/api/events/';
+const TICKET_URL = 'https://mohsystem.onrender.com/api/events/ticket/';
+const RECONNECT_MS = 5000;
+
+const fetchTicket = async (token) => {
+  const response = await fetch(TICKET_URL, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  if (!response.ok) {
+    throw new Error(`Ticket request failed with ${response.status}`);
+  }
+  return (await response.json()).ticket;
+};
+
+export const subscribeLiveEvents = ({ districts = [], onEvent }) => {
+  const token = localStorage.getItem('token') ||
+                localStorage.getItem('authToken') ||
+                localStorage.getItem('access');
+  if (!token || typeof EventSource === 'undefined') {
+    return () => {};
+  }
+
+  let source = null;
+  let timer = null;
+  let closed = false;
+  let lastEventId = null;
+
+  const handle = (message) => {
+    if (message.lastEventId) {
+      lastEventId = message.lastEventId;
+    }
+    try {
+      onEvent(JSON.parse(message.data));
+    } catch (e) {
+      console.error('Error parsing live event:', e);
+    }
+  };
+
+  const connect = async () => {
+    let ticket;
+    try {
+      ticket = await fetchTicket(token);
+    } catch (e) {
+      console.error('Error opening live events:', e);
+      timer = setTimeout(connect, RECONNECT_MS);
+      return;
+    }
+    if (closed) {
+      return;
+    }
+    const params = new URLSearchParams({ ticket });
+    districts.forEach(district => params.append('district', district));
+    if (lastEventId) {
+      params.set('last_event_id', lastEventId);
+    }
+    source = new EventSource(`${EVENTS_URL}?${params.toString()}`);
+    ['availability', 'deployment', 'worker', 'resync'].forEach(type => {
+      source.addEventListener(type, handle);
+    });
+    // The ticket is spent, so reconnect with a new one instead of letting
+    // EventSource retry the same URL.
+    source.onerror = () => {
+      source.close();
+      if (!closed) {
+        timer = setTimeout(connect, RECONNECT_MS);
+      }
+    };
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    if (source) {
+      source.close();
+    }
+  };
+};